@@ -0,0 +1,11 @@
+"""
+Load-test and benchmark suite for the EventScope API.
+
+Run from the backend directory:
+
+    python -m benchmarks setup --events 100000 --users 200
+    python -m benchmarks run --requests 5000 --output results.json
+    python -m benchmarks compare baseline.json results.json
+
+See benchmarks/README.md for details.
+"""
@@ -0,0 +1,175 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+
+def _setup_django():
+    # Always use the benchmark settings so runs never touch the dev database
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+    import django
+    django.setup()
+
+
+def setup(args):
+    _setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+    from .datasets import generate
+
+    database = Path(settings.DATABASES['default']['NAME'])
+    if database.resolve() == (settings.BASE_DIR / 'db.sqlite3').resolve():
+        sys.exit('Refusing to overwrite the development database; set EVENTSCOPE_BENCH_DB')
+    connections.close_all()
+    for path in (database, Path(f'{database}-wal'), Path(f'{database}-shm')):
+        if path.exists():
+            path.unlink()
+
+    call_command('migrate', verbosity=0)
+    summary = generate(
+        events=args.events,
+        users=args.users,
+        saved_per_user=args.saved_per_user,
+        history_per_user=args.history_per_user,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        processes=args.processes,
+        stdout=sys.stdout,
+    )
+    print(f'Benchmark database ready at {database}: {summary}')
+
+
+def run(args):
+    _setup_django()
+    from . import report, runner
+    from .workloads import parse_mix
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    try:
+        results = runner.run(
+            mix,
+            requests=args.requests,
+            duration=args.duration,
+            concurrency=args.concurrency,
+            warmup=args.warmup,
+            seed=args.seed,
+            base_url=args.url,
+            async_views=args.async_views,
+            stdout=sys.stderr,
+        )
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+    result = report.build_report(results)
+    print(report.format_table(result), file=sys.stderr)
+    if args.output:
+        report.write(result, args.output)
+
+
+def serialize(args):
+    _setup_django()
+    from . import serialization
+
+    try:
+        serialization.run(rows=args.rows, repeat=args.repeat, stdout=sys.stdout)
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+
+def rank(args):
+    _setup_django()
+    from . import ranking
+
+    try:
+        ranking.run(
+            keywords=args.keywords, platform=args.platform, limit=args.limit,
+            repeat=args.repeat, stdout=sys.stdout,
+        )
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+
+def compare(args):
+    from . import report
+
+    baseline = report.load(args.baseline)
+    current = report.load(args.current)
+    lines, regressions = report.compare(baseline, current, threshold=args.threshold)
+    print('\n'.join(lines))
+    if regressions:
+        print(f'\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}')
+        sys.exit(1)
+
+
+def main(argv=None):
+    from .ranking import DEFAULT_KEYWORDS
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='EventScope API benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    setup_parser = commands.add_parser('setup', help='Create and fill the benchmark database')
+    setup_parser.add_argument('--events', type=int, default=10000)
+    setup_parser.add_argument('--users', type=int, default=100)
+    setup_parser.add_argument('--saved-per-user', type=int, default=20)
+    setup_parser.add_argument('--history-per-user', type=int, default=20)
+    setup_parser.add_argument('--seed', type=int, default=42)
+    setup_parser.add_argument('--batch-size', type=int, default=10000)
+    setup_parser.add_argument('--processes', type=int, default=1,
+                              help='Generate event batches in this many processes')
+    setup_parser.set_defaults(handler=setup)
+
+    run_parser = commands.add_parser('run', help='Replay a workload and report latencies')
+    run_parser.add_argument('--requests', type=int, default=1000,
+                            help='Total number of measured requests')
+    run_parser.add_argument('--duration', type=float,
+                            help='Run for this many seconds instead of a fixed number of requests')
+    run_parser.add_argument('--concurrency', type=int, default=1,
+                            help='Number of simulated users, each in its own thread')
+    run_parser.add_argument('--warmup', type=int, default=50,
+                            help='Unmeasured requests per user before the run')
+    run_parser.add_argument('--mix', default='',
+                            help='Operation weights, e.g. "search=60,list=30,saved=10"')
+    run_parser.add_argument('--seed', type=int, default=1)
+    run_parser.add_argument('--url',
+                            help='Base URL of a running server; the test client is used if omitted')
+    run_parser.add_argument('--async-views', action='store_true',
+                            help='Send search, list and results requests to the /api/async/events/ views')
+    run_parser.add_argument('--output', help='Write the JSON report here ("-" for stdout)')
+    run_parser.set_defaults(handler=run)
+
+    serialize_parser = commands.add_parser(
+        'serialize', help='Time event list serialization paths on one page of events'
+    )
+    serialize_parser.add_argument('--rows', type=int, nargs='+', default=[20, 100],
+                                  help='Page sizes to time')
+    serialize_parser.add_argument('--repeat', type=int, default=50)
+    serialize_parser.set_defaults(handler=serialize)
+
+    rank_parser = commands.add_parser(
+        'rank', help='Time relevance-ranked and date-sorted search pages on large match sets'
+    )
+    rank_parser.add_argument('--keywords', nargs='+', default=list(DEFAULT_KEYWORDS),
+                             help='Searches to time, e.g. "ai" "gaming, music"')
+    rank_parser.add_argument('--platform', default='linkedin')
+    rank_parser.add_argument('--limit', type=int, default=20, help='Page size')
+    rank_parser.add_argument('--repeat', type=int, default=5)
+    rank_parser.set_defaults(handler=rank)
+
+    compare_parser = commands.add_parser('compare', help='Compare two JSON reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Relative change that counts as a regression (default 0.10)')
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+from events import synthetic
+
+
+BENCH_PASSWORD = 'benchmark-password'
+BENCH_USER_PREFIX = 'bench_user_'
+
+
+def generate(events=10000, users=100, saved_per_user=20, history_per_user=20,
+             seed=42, batch_size=10000, processes=1, stdout=None):
+    """Fill an empty benchmark database with a deterministic dataset"""
+    event_ids = synthetic.load_events(
+        events, seed=seed, batch_size=batch_size, processes=processes, stdout=stdout
+    )
+    user_ids = synthetic.create_users(users, prefix=BENCH_USER_PREFIX, password=BENCH_PASSWORD)
+    saved, history = synthetic.create_user_activity(
+        user_ids, event_ids, saved_per_user=saved_per_user,
+        history_per_user=history_per_user, seed=seed, batch_size=batch_size,
+    )
+    if stdout:
+        stdout.write(f'users: {len(user_ids)}, saved events: {saved}, search history: {history}\n')
+
+    return {
+        'events': events,
+        'users': len(user_ids),
+        'saved_events': saved,
+        'search_history': history,
+        'seed': seed,
+    }
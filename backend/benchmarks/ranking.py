@@ -0,0 +1,71 @@
+"""
+Search ranking micro-benchmark.
+
+Times the first page of a search, queries included, for keywords with
+small to very large match sets, three ways: by date with KeysetPagination,
+by relevance with RelevancePagination (top-k in SQLite), and by relevance
+with every match scored, fetched and sorted in Python, which is what
+ranking costs without top-k selection. The top-k page must equal the head
+of the full sort.
+"""
+import time
+from datetime import datetime, timezone
+
+# From the most common synthetic topic to rare combinations
+DEFAULT_KEYWORDS = ('ai', 'machine learning', 'python', 'gaming, music')
+
+
+def _criteria(keywords, platform):
+    return {
+        'keywords': keywords,
+        'platforms': [platform],
+        'start_date': datetime(1970, 1, 1, tzinfo=timezone.utc),
+        'end_date': datetime(2100, 1, 1, tzinfo=timezone.utc),
+        'date_mode': 'contained',
+    }
+
+
+def _full_sort(queryset, keywords, limit):
+    from events.search import ranked_matches
+
+    matches = ranked_matches(queryset, keywords, -1)  # LIMIT -1: no limit
+    matches.sort(key=lambda match: (match[1], match[0]), reverse=True)
+    return matches[:limit]
+
+
+def run(keywords=DEFAULT_KEYWORDS, platform='linkedin', limit=20, repeat=5, stdout=None):
+    """Time each path per search. Returns {keywords: {'matches': n, path: mean ms}}"""
+    from events.pagination import KeysetPagination, RelevancePagination
+    from events.views import search_queryset
+
+    paths = {
+        'date': lambda queryset, words: KeysetPagination().paginate(
+            queryset, limit=limit, count='none'
+        ),
+        'relevance': lambda queryset, words: RelevancePagination(words).paginate(
+            queryset, limit=limit, count='none'
+        ),
+        'relevance_full_sort': lambda queryset, words: _full_sort(queryset, words, limit),
+    }
+    results = {}
+    for words in keywords:
+        queryset = search_queryset(_criteria(words, platform), ['id'])
+        timings = {'matches': queryset.count()}
+        for name, path in paths.items():
+            output = path(queryset, words)  # warm up
+            started = time.perf_counter()
+            for _ in range(repeat):
+                path(queryset, words)
+            timings[name] = (time.perf_counter() - started) / repeat * 1000
+            if name == 'relevance':
+                top_k = [(row['id'], row['score']) for row in output]
+            elif name == 'relevance_full_sort' and output != top_k:
+                raise RuntimeError(f'Top-k ranking of {words!r} differs from the full sort')
+        results[words] = timings
+
+    if stdout:
+        stdout.write(f'{"keywords":<18} {"matches":>8} {"path":<20} {"ms/page":>9}\n')
+        for words, timings in results.items():
+            for name in paths:
+                stdout.write(f'{words:<18} {timings["matches"]:>8} {name:<20} {timings[name]:>9.1f}\n')
+    return results
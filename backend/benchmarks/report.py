@@ -0,0 +1,146 @@
+"""Benchmark result files: metadata, text tables and run-to-run comparison"""
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+REPORT_VERSION = 1
+
+# Metrics compared between runs, and whether a higher value is better
+COMPARED_METRICS = [
+    ('throughput_rps', True),
+    ('latency_ms.p50', False),
+    ('latency_ms.p95', False),
+    ('latency_ms.p99', False),
+    ('queries.mean', False),
+]
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    """Where and on what the run happened"""
+    import django
+    import rest_framework
+    from django.db import connection
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'djangorestframework': rest_framework.VERSION,
+        'database_vendor': connection.vendor,
+        'platform': platform.platform(),
+    }
+
+
+def build_report(results):
+    return {'version': REPORT_VERSION, 'environment': environment(), **results}
+
+
+def write(report, path):
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path == '-':
+        sys.stdout.write(text + '\n')
+    else:
+        Path(path).write_text(text + '\n')
+
+
+def load(path):
+    report = json.loads(Path(path).read_text())
+    if report.get('version') != REPORT_VERSION:
+        raise ValueError(f'{path}: unsupported report version {report.get("version")!r}')
+    return report
+
+
+def _metric(stats, name):
+    value = stats
+    for part in name.split('.'):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _fmt(value, digits=1):
+    if value is None:
+        return '-'
+    return f'{value:.{digits}f}'
+
+
+def format_table(report):
+    """Render a report as a fixed-width text table"""
+    dataset = report['dataset']
+    config = report['config']
+    lines = [
+        f"{dataset['events']} events, {dataset['users']} users, "
+        f"{config['concurrency']} concurrent user(s), target {config['target']}, "
+        f"{report['elapsed_seconds']:.1f}s",
+        '',
+        f"{'endpoint':<14}{'requests':>9}{'errors':>8}{'req/s':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'queries':>9}",
+    ]
+    rows = list(report['endpoints'].items()) + [('total', report['total'])]
+    for name, stats in rows:
+        latency = stats['latency_ms']
+        lines.append(
+            f"{name:<14}{stats['requests']:>9}{stats['errors']:>8}"
+            f"{_fmt(stats['throughput_rps']):>9}{_fmt(latency['p50']):>9}"
+            f"{_fmt(latency['p95']):>9}{_fmt(latency['p99']):>9}"
+            f"{_fmt(latency['max']):>9}{_fmt(stats['queries']['mean']):>9}"
+        )
+    cache_stats = report.get('search_cache')
+    if cache_stats:
+        lines.append('')
+        lines.append(
+            f"search cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+            f"({cache_stats['hit_ratio']:.0%})"
+        )
+    return '\n'.join(lines)
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Compare two reports endpoint by endpoint.
+
+    Returns ``(lines, regressions)``; a regression is a metric that got
+    worse by more than ``threshold`` (a fraction).
+    """
+    lines = [f"{'endpoint':<14}{'metric':<16}{'baseline':>11}{'current':>11}{'change':>9}"]
+    regressions = []
+    names = sorted(set(baseline['endpoints']) & set(current['endpoints'])) + ['total']
+    for name in names:
+        before = baseline['total'] if name == 'total' else baseline['endpoints'][name]
+        after = current['total'] if name == 'total' else current['endpoints'][name]
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = _metric(before, metric), _metric(after, metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            worse = -change if higher_is_better else change
+            flag = ''
+            if worse > threshold:
+                flag = '  REGRESSION'
+                regressions.append((name, metric, old, new))
+            lines.append(
+                f'{name:<14}{metric:<16}{_fmt(old, 2):>11}{_fmt(new, 2):>11}{change:>+9.1%}{flag}'
+            )
+
+    if baseline['dataset']['events'] != current['dataset']['events']:
+        lines.append('')
+        lines.append(
+            f"warning: datasets differ ({baseline['dataset']['events']} vs "
+            f"{current['dataset']['events']} events)"
+        )
+    return lines, regressions
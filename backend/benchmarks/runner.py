@@ -0,0 +1,294 @@
+"""Replay a workload against the Django test client or a running server"""
+import base64
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from events import cache as search_cache
+from events.models import Event, SavedEvent
+from .datasets import BENCH_PASSWORD, BENCH_USER_PREFIX
+from .workloads import Session, next_request, record_response, use_async_views
+
+
+class ClientTarget:
+    """
+    Sends requests through ``django.test.Client`` in this process.
+
+    No network or server overhead is measured, and the SQL queries run by
+    each request are counted.
+    """
+
+    def __init__(self, username):
+        self.client = Client()
+        self.client.force_login(User.objects.get(username=username))
+        self.anonymous = Client()
+
+    def send(self, request):
+        client = self.client if request.auth else self.anonymous
+        kwargs = {}
+        if request.body is not None:
+            kwargs = {'data': json.dumps(request.body), 'content_type': 'application/json'}
+        with CaptureQueriesContext(connection) as queries:
+            response = client.generic(request.method, request.path, **kwargs)
+        try:
+            data = json.loads(response.content) if response.content else None
+        except ValueError:
+            data = None
+        return response.status_code, data, len(queries)
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpTarget:
+    """
+    Sends real HTTP requests to a running server, e.g. ``runserver`` or gunicorn.
+
+    Authenticated requests use HTTP basic auth, so no login or CSRF round
+    trips are needed. Query counts are not available.
+    """
+
+    def __init__(self, base_url, username, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        credentials = f'{username}:{BENCH_PASSWORD}'.encode('utf-8')
+        self.authorization = 'Basic ' + base64.b64encode(credentials).decode('ascii')
+
+    def send(self, request):
+        body = json.dumps(request.body).encode('utf-8') if request.body is not None else None
+        http_request = urllib.request.Request(
+            self.base_url + request.path, data=body, method=request.method
+        )
+        http_request.add_header('Accept', 'application/json')
+        if body is not None:
+            http_request.add_header('Content-Type', 'application/json')
+        if request.auth:
+            http_request.add_header('Authorization', self.authorization)
+        try:
+            with urllib.request.urlopen(http_request, timeout=self.timeout) as response:
+                status_code, content = response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            status_code, content = exc.code, exc.read()
+        try:
+            data = json.loads(content) if content else None
+        except ValueError:
+            data = None
+        return status_code, data, None
+
+    def close(self):
+        pass
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency, status and query count samples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def add(self, endpoint, seconds, status_code, query_count):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status_code] += 1
+            if query_count is not None:
+                self.queries[endpoint].append(query_count)
+            if status_code is None or status_code >= 400:
+                self.errors[endpoint] += 1
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(recorder, elapsed):
+    """Turn recorded samples into per-endpoint and overall statistics (milliseconds)"""
+    def describe(latencies, queries, errors, statuses):
+        count = len(latencies)
+        stats = {
+            'requests': count,
+            'errors': errors,
+            'throughput_rps': count / elapsed if elapsed else 0.0,
+            'latency_ms': {
+                'mean': sum(latencies) / count * 1000 if count else None,
+                'p50': _ms(percentile(latencies, 0.50)),
+                'p95': _ms(percentile(latencies, 0.95)),
+                'p99': _ms(percentile(latencies, 0.99)),
+                'max': _ms(max(latencies) if latencies else None),
+            },
+            'queries': {
+                'mean': sum(queries) / len(queries) if queries else None,
+                'max': max(queries) if queries else None,
+            },
+        }
+        if statuses is not None:
+            stats['status_codes'] = {str(code): n for code, n in sorted(statuses.items(), key=str)}
+        return stats
+
+    endpoints = {
+        endpoint: describe(
+            recorder.latencies[endpoint],
+            recorder.queries[endpoint],
+            recorder.errors[endpoint],
+            recorder.statuses[endpoint],
+        )
+        for endpoint in sorted(recorder.latencies)
+    }
+    total = describe(
+        [value for values in recorder.latencies.values() for value in values],
+        [value for values in recorder.queries.values() for value in values],
+        sum(recorder.errors.values()),
+        None,
+    )
+    return endpoints, total
+
+
+def _ms(seconds):
+    return seconds * 1000 if seconds is not None else None
+
+
+def dataset_info():
+    """Describe the benchmark database the run is using"""
+    bounds = Event.objects.aggregate(low=Min('id'), high=Max('id'))
+    return {
+        'database': str(connection.settings_dict['NAME']),
+        'events': Event.objects.count(),
+        'users': User.objects.filter(username__startswith=BENCH_USER_PREFIX).count(),
+        'saved_events': SavedEvent.objects.count(),
+        'event_id_range': [bounds['low'], bounds['high']],
+    }
+
+
+def run(mix, requests=1000, duration=None, concurrency=1, warmup=50, seed=1,
+        base_url=None, async_views=False, stdout=None):
+    """
+    Replay ``mix`` with ``concurrency`` simulated users and return the results.
+
+    Each user runs in its own thread with its own client and benchmark
+    account. The run stops after ``requests`` requests in total, or after
+    ``duration`` seconds when that is given. ``warmup`` requests per user
+    are sent first and not recorded. With ``async_views``, the operations
+    that have an async view are sent to it instead.
+    """
+    usernames = list(
+        User.objects.filter(username__startswith=BENCH_USER_PREFIX)
+        .order_by('id').values_list('username', flat=True)[:concurrency]
+    )
+    if len(usernames) < concurrency:
+        raise RuntimeError(
+            f'Need {concurrency} benchmark users but found {len(usernames)}; '
+            'run "python -m benchmarks setup" with more --users'
+        )
+    dataset = dataset_info()
+    if not dataset['events']:
+        raise RuntimeError('The benchmark database has no events; run "python -m benchmarks setup" first')
+    event_ids = tuple(dataset['event_id_range'])
+
+    recorder = Recorder()
+    budget_lock = threading.Lock()
+    budget = {'remaining': requests}
+    failures = []
+    clock = {}
+
+    def start_clock():
+        # Runs once, when every user has finished its warmup
+        search_cache.reset_stats()
+        clock['started'] = time.perf_counter()
+        clock['deadline'] = clock['started'] + duration if duration else None
+
+    barrier = threading.Barrier(concurrency, action=start_clock)
+
+    def pick_request(session):
+        request = next_request(session, mix)
+        return use_async_views(request) if async_views else request
+
+    def take_request():
+        if clock['deadline'] is not None:
+            return time.perf_counter() < clock['deadline']
+        with budget_lock:
+            if budget['remaining'] <= 0:
+                return False
+            budget['remaining'] -= 1
+            return True
+
+    def worker(index, username):
+        target = None
+        try:
+            target = HttpTarget(base_url, username) if base_url else ClientTarget(username)
+            session = Session(random.Random(seed + index), username, event_ids)
+            for _ in range(warmup):
+                request = pick_request(session)
+                status_code, data, _ = target.send(request)
+                record_response(session, request, status_code, data)
+            barrier.wait()
+
+            while take_request():
+                request = pick_request(session)
+                started = time.perf_counter()
+                try:
+                    status_code, data, query_count = target.send(request)
+                except Exception:
+                    status_code, data, query_count = None, None, None
+                recorder.add(request.endpoint, time.perf_counter() - started, status_code, query_count)
+                record_response(session, request, status_code, data)
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as exc:
+            failures.append(exc)
+            barrier.abort()
+        finally:
+            if target is not None:
+                target.close()
+
+    if stdout:
+        amount = f'for {duration}s' if duration else f'{requests} requests'
+        stdout.write(f'running {amount} with {concurrency} user(s) against {base_url or "the test client"}\n')
+
+    threads = [
+        threading.Thread(target=worker, args=(index, username), daemon=True)
+        for index, username in enumerate(usernames)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise RuntimeError(f'Benchmark user failed: {failures[0]!r}')
+    elapsed = time.perf_counter() - clock['started']
+
+    endpoints, total = summarize(recorder, elapsed)
+    return {
+        'config': {
+            'target': 'http' if base_url else 'client',
+            'base_url': base_url,
+            'requests': requests if not duration else None,
+            'duration': duration,
+            'concurrency': concurrency,
+            'warmup': warmup,
+            'seed': seed,
+            'mix': mix,
+            'async_views': async_views,
+        },
+        'dataset': dataset,
+        'elapsed_seconds': elapsed,
+        'total': total,
+        'endpoints': endpoints,
+        # Only meaningful for the test client, which shares this process's cache
+        'search_cache': search_cache.stats() if not base_url else None,
+    }
@@ -0,0 +1,63 @@
+"""
+Event list serialization micro-benchmark.
+
+Times one page of events through three paths, each including its queries:
+the DRF ModelSerializer path (prefetched instances, EventSerializer,
+JSONRenderer), the ``.values()`` fast path with JSONRenderer, and the fast
+path with FastJSONRenderer. Every path must produce the same bytes.
+"""
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+
+def _serializer_path(queryset, rows):
+    from events.serializers import EventSerializer
+
+    page = list(queryset.prefetch_related('keyword_tags')[:rows])
+    return JSONRenderer().render({'results': EventSerializer(page, many=True).data})
+
+
+def _values_path(renderer):
+    def render(queryset, rows):
+        from events.serializers import event_values, serialize_event_values
+
+        page = list(event_values(queryset)[:rows])
+        return renderer.render({'results': serialize_event_values(page)})
+    return render
+
+
+def run(rows=(20, 100), repeat=50, stdout=None):
+    """Time each path per page size. Returns {rows: {path: mean ms}}"""
+    from events.models import Event
+    from events.renderers import FastJSONRenderer, orjson
+
+    queryset = Event.objects.order_by('-created_at', '-id')
+    paths = {
+        'serializer': _serializer_path,
+        'values': _values_path(JSONRenderer()),
+        'values+fast_renderer': _values_path(FastJSONRenderer()),
+    }
+    results = {}
+    for size in rows:
+        expected = None
+        timings = {}
+        for name, path in paths.items():
+            body = path(queryset, size)  # warm up
+            if expected is None:
+                expected = body
+            elif body != expected:
+                raise RuntimeError(f'{name} output differs from the serializer for {size} rows')
+            started = time.perf_counter()
+            for _ in range(repeat):
+                path(queryset, size)
+            timings[name] = (time.perf_counter() - started) / repeat * 1000
+        results[size] = timings
+
+    if stdout:
+        stdout.write(f'orjson: {"installed" if orjson else "not installed"}\n')
+        stdout.write(f'{"rows":>6} {"path":<22} {"ms/page":>9} {"speedup":>8}\n')
+        for size, timings in results.items():
+            for name, ms in timings.items():
+                stdout.write(f'{size:>6} {name:<22} {ms:>9.2f} {timings["serializer"] / ms:>7.1f}x\n')
+    return results
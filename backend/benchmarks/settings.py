@@ -0,0 +1,16 @@
+"""Django settings for benchmark runs: the project settings on a separate database"""
+import os
+
+from eventscope_backend.settings import *  # noqa: F401,F403
+from eventscope_backend.settings import BASE_DIR, DATABASES, ALLOWED_HOSTS
+
+DEBUG = False
+
+DATABASES['default']['NAME'] = os.environ.get(
+    'EVENTSCOPE_BENCH_DB', str(BASE_DIR / 'benchmarks' / 'bench.sqlite3')
+)
+
+ALLOWED_HOSTS = ALLOWED_HOSTS + ['testserver']
+
+# Benchmark users are created in bulk; hashing cost is not what we measure
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
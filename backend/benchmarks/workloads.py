@@ -0,0 +1,172 @@
+"""Mixed read/write request workloads against the hot API endpoints"""
+from collections import namedtuple
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.utils import timezone
+
+from events.synthetic import PLATFORMS, TOPICS, TOPIC_WEIGHTS
+
+
+Request = namedtuple('Request', ['endpoint', 'method', 'path', 'body', 'auth'])
+
+# Share of each operation in the default mix, in percent
+DEFAULT_MIX = {
+    'search': 40,
+    'list': 20,
+    'list_next': 5,
+    'saved': 15,
+    'save': 8,
+    'unsave': 4,
+    'results': 6,
+    'results_post': 2,
+}
+
+
+def parse_mix(value):
+    """Parse ``search=50,list=30`` into a mix dict; unknown operations are an error"""
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f'Unknown operation {name!r}; choose from {", ".join(OPERATIONS)}')
+        try:
+            mix[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f'Invalid weight for {name!r}: {weight!r}')
+    if not any(mix.values()):
+        raise ValueError('The workload mix needs at least one positive weight')
+    return mix
+
+
+class Session:
+    """
+    State of one simulated user.
+
+    Remembers the events it saved during the run so ``unsave`` only
+    removes those, and the last list cursor so ``list_next`` can page.
+    """
+
+    def __init__(self, rng, username, event_ids):
+        self.rng = rng
+        self.username = username
+        self.event_ids = event_ids
+        self.saved = []
+        self.next_cursor = None
+        # Whole hours, so searches from different users can share cache entries
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def random_event_id(self):
+        low, high = self.event_ids
+        return self.rng.randint(low, high)
+
+    def search_body(self):
+        rng = self.rng
+        # Searches follow the topic popularity curve, so some are repeated
+        keywords = dict.fromkeys(rng.choices(TOPICS, weights=TOPIC_WEIGHTS, k=rng.choice([1, 1, 1, 2])))
+        start = self.now + timedelta(days=rng.choice([-30, -7, 0, 0, 0, 7, 30]))
+        return {
+            'keywords': ', '.join(keywords),
+            'platform': rng.choice(PLATFORMS),
+            'start_date': start.isoformat(),
+            'end_date': (start + timedelta(days=rng.choice([7, 30, 90, 180]))).isoformat(),
+        }
+
+    def extension_payload(self, size=50):
+        rng = self.rng
+        return {
+            'source': 'benchmark',
+            'timestamp': self.now.isoformat(),
+            'data': {
+                'contentType': 'search_results',
+                'searchKeywords': rng.choice(TOPICS),
+                'results': [
+                    {
+                        'id': f'bench-{rng.getrandbits(40):x}',
+                        'name': f'Benchmark Profile {index}',
+                        'profileUrl': f'https://www.linkedin.com/in/bench-{rng.getrandbits(40):x}',
+                        'location': 'Accra',
+                        'description': 'Generated by the benchmark suite',
+                    }
+                    for index in range(size)
+                ],
+            },
+        }
+
+
+def _search(session):
+    return Request('search', 'POST', '/api/events/search/', session.search_body(), session.rng.random() < 0.5)
+
+
+def _list(session):
+    return Request('list', 'GET', '/api/events/?limit=20', None, False)
+
+
+def _list_next(session):
+    if not session.next_cursor:
+        return _list(session)
+    return Request('list_next', 'GET', f'/api/events/?limit=20&cursor={quote(session.next_cursor)}', None, False)
+
+
+def _saved(session):
+    return Request('saved', 'GET', '/api/events/saved/', None, True)
+
+
+def _save(session):
+    return Request('save', 'POST', '/api/events/save/', {'event_id': session.random_event_id()}, True)
+
+
+def _unsave(session):
+    if not session.saved:
+        return _save(session)
+    event_id = session.saved.pop(session.rng.randrange(len(session.saved)))
+    return Request('unsave', 'DELETE', f'/api/events/unsave/{event_id}/', None, True)
+
+
+def _results(session):
+    return Request('results', 'GET', '/api/events/results/get/', None, False)
+
+
+def _results_post(session):
+    return Request('results_post', 'POST', '/api/events/results/', session.extension_payload(), False)
+
+
+OPERATIONS = {
+    'search': _search,
+    'list': _list,
+    'list_next': _list_next,
+    'saved': _saved,
+    'save': _save,
+    'unsave': _unsave,
+    'results': _results,
+    'results_post': _results_post,
+}
+
+
+# Operations with an async view under /api/async/events/ (see events/async_urls.py)
+ASYNC_OPERATIONS = ('search', 'list', 'list_next', 'results')
+
+
+def use_async_views(request):
+    """Send ``request`` to the async view of its endpoint, if it has one"""
+    if request.endpoint not in ASYNC_OPERATIONS:
+        return request
+    return request._replace(path=request.path.replace('/api/events/', '/api/async/events/', 1))
+
+
+def next_request(session, mix):
+    """Pick the next request for ``session`` according to the weighted ``mix``"""
+    names = list(mix)
+    name = session.rng.choices(names, weights=[mix[n] for n in names])[0]
+    return OPERATIONS[name](session)
+
+
+def record_response(session, request, status_code, data):
+    """Update the session from a response so later requests stay realistic"""
+    if request.endpoint == 'save' and status_code == 201:
+        session.saved.append(request.body['event_id'])
+    elif request.endpoint in ('list', 'list_next') and isinstance(data, dict):
+        session.next_cursor = data.get('next_cursor')
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Event, SavedEvent, SearchHistory
+from django.db.models import Count
+from .models import (
+    Event, Keyword, SavedEvent, SearchHistory, SearchTrend, RollupWatermark,
+    ScrapedResult, IngestionJob,
+)
 
 
 @admin.register(Event)
@@ -11,6 +15,13 @@ class EventAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
 
 
+@admin.register(Keyword)
+class KeywordAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+    ordering = ['name']
+
+
 @admin.register(SavedEvent)
 class SavedEventAdmin(admin.ModelAdmin):
     list_display = ['user', 'event', 'saved_at']
@@ -26,3 +37,43 @@ class SearchHistoryAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'keywords']
     date_hierarchy = 'searched_at'
     ordering = ['-searched_at']
+
+
+@admin.register(SearchTrend)
+class SearchTrendAdmin(admin.ModelAdmin):
+    list_display = ['keyword', 'platform', 'granularity', 'bucket', 'count']
+    list_filter = ['granularity', 'platform']
+    search_fields = ['keyword']
+    date_hierarchy = 'bucket'
+    ordering = ['-bucket', '-count']
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_id', 'updated_at']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ScrapedResult)
+class ScrapedResultAdmin(admin.ModelAdmin):
+    list_display = ['external_id', 'result_type', 'name', 'author', 'received_at']
+    list_filter = ['result_type', 'received_at']
+    search_fields = ['external_id', 'name', 'author']
+    ordering = ['-received_at']
+
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    list_display = ['batch_id', 'status', 'source', 'client', 'received_count', 'processed_count', 'pending_chunks', 'created_at', 'finished_at', 'last_accessed_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['batch_id', 'source', 'client']
+    readonly_fields = ['batch_id', 'received_count', 'processed_count', 'pending_chunks']
+    ordering = ['-id']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(pending_chunk_count=Count('chunks'))
+
+    @admin.display(description='Pending chunks', ordering='pending_chunk_count')
+    def pending_chunks(self, job):
+        # Chunks hold the raw payload and are deleted once ingested
+        return job.pending_chunk_count
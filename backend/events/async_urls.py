@@ -0,0 +1,11 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'events_async'
+
+# Async counterparts of the matching routes in urls.py, for ASGI servers
+urlpatterns = [
+    path('', async_views.event_list, name='event-list'),
+    path('search/', async_views.search_events, name='search-events'),
+    path('results/get/', async_views.get_extension_results, name='get-extension-results'),
+]
@@ -0,0 +1,184 @@
+"""
+Async versions of the hottest read endpoints, for ASGI deployments.
+
+Under ASGI a sync DRF view holds a worker thread for the whole request,
+including the time it waits on SQLite. These views await the async ORM
+(``aiterator``, ``acount``, ``afirst``) instead, so one event loop serves
+many concurrent requests. They return the same payloads as their
+counterparts in views.py, which they share the query and payload helpers
+with, and are mounted under ``/api/async/events/`` (see async_urls.py).
+
+DRF's APIView is sync only, so these are plain Django views: the request
+is wrapped in a DRF ``Request`` for parsing and authentication, and
+APIException is turned into the same JSON error response DRF would send.
+Under WSGI they still work, through a per-request event loop.
+"""
+import logging
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from . import cache as search_cache
+from . import result_store
+from . import spelling
+from .conditional import arequest_data_version, conditional_read
+from .models import Event, IngestionJob, ScrapedResult
+from .pagination import ExtensionResultsPagination, KeysetPagination
+from .renderers import FastJSONRenderer
+from .routers import read_from_replica
+from .search import DATE_MODE_OVERLAP, amax_event_duration
+from .serializers import EventSearchSerializer, aserialize_event_values, event_fieldset, event_values
+from .views import (
+    empty_extension_payload, extension_page_payload, sample_search_payload,
+    record_search, search_cache_key, search_count_by, search_page_payload, search_paginator,
+    search_queryset
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status, content_type='application/json'
+    )
+
+
+def api_errors(view):
+    """Send APIException as DRF's JSON error response"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            response = json_response(detail, status=exc.status_code)
+            if getattr(exc, 'wait', None):
+                response['Retry-After'] = str(int(exc.wait))
+            return response
+    return wrapper
+
+
+async def api_request(request):
+    """Wrap ``request`` in a DRF Request and authenticate it off the event loop"""
+    drf_request = Request(
+        request,
+        parsers=[JSONParser()],
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    # Session and basic authentication query the database
+    await sync_to_async(lambda: drf_request.user)()
+    return drf_request
+
+
+@require_http_methods(['GET', 'HEAD'])
+@api_errors
+@read_from_replica
+@conditional_read
+async def event_list(request):
+    """Async EventListCreateView GET: one keyset page of events"""
+    request = await api_request(request)
+    fields = event_fieldset(request.query_params)
+    paginator = KeysetPagination()
+    page = await paginator.apaginate_queryset(event_values(Event.objects.all(), fields), request)
+    return json_response({
+        **paginator.get_page_metadata(),
+        'next': paginator.get_next_link(),
+        'results': await aserialize_event_values(page, fields),
+    })
+
+
+async def apaginate_search(data, fields, longest):
+    """paginate_search() with the async ORM"""
+    paginator = search_paginator(data)
+    page = await paginator.apaginate(
+        search_queryset(data, fields, longest), cursor=data.get('cursor') or '',
+        limit=data.get('limit'), count=data.get('count', 'estimate'),
+        count_by=search_count_by(data)
+    )
+    return paginator, page
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@api_errors
+@read_from_replica
+@conditional_read
+async def search_events(request):
+    """Async search_events: same criteria, cache and payloads"""
+    request = await api_request(request)
+    params = request.query_params if request.method in ('GET', 'HEAD') else request.data
+    serializer = EventSearchSerializer(data=params)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = serializer.validated_data
+    fields = event_fieldset(request.query_params)
+    cursor = data.get('cursor') or ''
+
+    # Record search history (buffered, but a full batch may be written inline)
+    if request.user.is_authenticated:
+        await sync_to_async(record_search)(request.user, data)
+
+    cache_key = search_cache_key(data, fields, await arequest_data_version(request))
+    payload = search_cache.get(cache_key)
+    if payload is not None:
+        return json_response(payload)
+
+    # date_range_filter() cannot run its own query from the event loop
+    longest = await amax_event_duration() if data['date_mode'] == DATE_MODE_OVERLAP else None
+    paginator, page = await apaginate_search(data, fields, longest)
+
+    # Nothing matched: search again with misspelled words corrected
+    corrected = None if page else await sync_to_async(spelling.correct)(data['keywords'])
+    if corrected:
+        paginator, page = await apaginate_search({**data, 'keywords': corrected}, fields, longest)
+
+    if not page and not cursor:
+        payload = sample_search_payload(data, fields)
+    else:
+        payload = search_page_payload(
+            data, paginator, await aserialize_event_values(page, fields),
+            corrected if page else None
+        )
+
+    search_cache.set(cache_key, payload)
+    return json_response(payload)
+
+
+@require_http_methods(['GET', 'HEAD'])
+@api_errors
+async def get_extension_results(request):
+    """Async get_extension_results: a page of the session's latest (or a given own ``batch``) results"""
+    request = await api_request(request)
+    try:
+        try:
+            batch_uuid = await sync_to_async(result_store.readable_batch)(request)
+        except ValueError:
+            return json_response({'error': 'Invalid batch id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = ScrapedResult.objects.filter(batch_id=batch_uuid).order_by('id')
+        paginator = ExtensionResultsPagination()
+        page = await paginator.apaginate_queryset(queryset, request) if batch_uuid else []
+
+        if not page:
+            job_status = await IngestionJob.objects.filter(batch_id=batch_uuid).values_list(
+                'status', flat=True
+            ).afirst() if batch_uuid else None
+            return json_response(empty_extension_payload(batch_uuid, job_status))
+
+        await sync_to_async(result_store.touch)(batch_uuid)
+        return json_response(extension_page_payload(page, batch_uuid, paginator))
+
+    except APIException:
+        raise
+    except Exception as e:
+        logger.exception('Could not retrieve extension results')
+        return json_response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,124 @@
+"""
+Bulk event upserts keyed on (platform, link).
+
+Rows are validated and written ``EVENTSCOPE_EVENT_BULK_BATCH_SIZE`` at a
+time, one transaction per batch: a validation pass with no queries, one
+query for the keys that already exist, one ``INSERT ... ON CONFLICT DO
+UPDATE`` and a refresh of the search index and spelling vocabulary for
+the batch. ``bulk_create`` skips ``post_save``, so the search cache is
+invalidated once at the end.
+"""
+import operator
+from functools import reduce
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from . import cache, search, spelling
+from .models import Event
+from .serializers import EventBulkSerializer
+
+
+# Natural key; a row matching an existing event updates it
+UNIQUE_FIELDS = ['platform', 'link']
+UPSERT_FIELDS = [
+    'name', 'description', 'event_type', 'start_date', 'end_date', 'keywords', 'updated_at',
+]
+
+# Per-row errors returned in the response; every rejected row is still counted
+MAX_REPORTED_ERRORS = 100
+
+
+def _setting(name, default):
+    return getattr(settings, f'EVENTSCOPE_EVENT_BULK_{name}', default)
+
+
+class EventUpsert:
+    """Validates and upserts a stream of event rows, keeping running totals"""
+
+    def __init__(self, batch_size=None, max_rows=None):
+        self.batch_size = batch_size or _setting('BATCH_SIZE', 500)
+        self.max_rows = max_rows or _setting('MAX_ROWS', 50000)
+        self.created = 0
+        self.updated = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors = []
+
+    def run(self, rows):
+        """
+        Upsert every row. Returns the summary.
+
+        Raises ParseError if the body is malformed or too long; the batches
+        before it have already been written.
+        """
+        rows = iter(rows)
+        offset = 0
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                if offset + len(batch) > self.max_rows:
+                    raise ParseError(f'At most {self.max_rows} events can be sent in one request')
+                self._write_batch(batch, offset)
+                offset += len(batch)
+        finally:
+            if self.created or self.updated:
+                cache.invalidate()
+        return self.summary()
+
+    def _write_batch(self, batch, offset):
+        serializer = EventBulkSerializer(data=batch, many=True)
+        # Invalid rows are collected per row instead of failing the batch
+        serializer.is_valid()
+        for index, detail in serializer.row_errors:
+            self.rejected += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({'index': offset + index, 'errors': detail})
+
+        rows = serializer.validated_data
+        if not rows:
+            return
+        # Repeats of a key within the batch apply in order, so the last one wins
+        by_key = {(row['platform'], row['link']): row for row in rows}
+
+        links = {}
+        for platform, link in by_key:
+            links.setdefault(platform, []).append(link)
+        # One (platform = ? AND link IN ...) branch per platform, so each is
+        # a seek on the unique (platform, link) index
+        matches_key = reduce(
+            operator.or_,
+            (Q(platform=platform, link__in=platform_links) for platform, platform_links in links.items()),
+        )
+
+        with transaction.atomic():
+            existing = set(
+                Event.objects.filter(matches_key).order_by().values_list('platform', 'link')
+            )
+            events = [Event(**row) for row in by_key.values()]
+            Event.objects.bulk_create(
+                events,
+                update_conflicts=True,
+                unique_fields=UNIQUE_FIELDS,
+                update_fields=UPSERT_FIELDS,
+            )
+            search.index_events(events)
+            spelling.index_terms(events)
+
+        created = len(by_key.keys() - existing)
+        self.created += created
+        self.updated += len(by_key) - created
+        self.duplicates += len(rows) - len(by_key)
+
+    def summary(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'errors': self.errors,
+        }
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import threading
+import time
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone as django_timezone
+from .models import DataVersion
+
+
+GENERATION_KEY = 'events:generation'
+
+# DataVersion row counting Event writes
+EVENTS_VERSION = 'events'
+NEVER_WRITTEN = (0, datetime.fromtimestamp(0, tz=timezone.utc))
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    """Return the cache backend used for search results"""
+    return caches[getattr(settings, 'EVENTSCOPE_SEARCH_CACHE', 'default')]
+
+
+def current_generation():
+    """
+    Return the current event data generation.
+
+    The generation is a nanosecond timestamp that changes on every Event
+    write. It is part of every search cache key, so bumping it invalidates
+    all cached results at once. If the key is evicted, a fresh timestamp is
+    used, which can only cause misses, never stale hits.
+    """
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY, time.time_ns())
+    return generation
+
+
+def invalidate():
+    """Invalidate all cached search results and count the write in the data version"""
+    cache = get_cache()
+    previous = cache.get(GENERATION_KEY, 0)
+    cache.set(GENERATION_KEY, max(time.time_ns(), previous + 1), timeout=None)
+    bump_data_version()
+
+
+def bump_data_version():
+    """Count an Event write in the database, where every process sees it"""
+    now = django_timezone.now()
+    updated = DataVersion.objects.filter(name=EVENTS_VERSION).update(
+        version=F('version') + 1, changed_at=now
+    )
+    if not updated:
+        DataVersion.objects.get_or_create(
+            name=EVENTS_VERSION, defaults={'version': 1, 'changed_at': now}
+        )
+
+
+def _data_version_query():
+    return DataVersion.objects.filter(name=EVENTS_VERSION).values_list('version', 'changed_at')
+
+
+def data_version():
+    """
+    Return (version, changed_at) of the event data.
+
+    Unlike the generation, which lives in this process's cache unless the
+    backend is shared, it is read from the database, so it reflects writes
+    made by any process: other web workers, management commands and
+    ingestion workers.
+    """
+    return _data_version_query().first() or NEVER_WRITTEN
+
+
+async def adata_version():
+    """data_version() with the async ORM"""
+    return await _data_version_query().afirst() or NEVER_WRITTEN
+
+
+def version_tag(version):
+    """A short string for a ``data_version()`` result, for ETags and cache keys"""
+    version, changed_at = version
+    return f'{version:x}-{int(changed_at.timestamp() * 1_000_000):x}'
+
+
+def make_key(version, keywords, platform, start_date, end_date, *extra):
+    """
+    Build the cache key for a search from the data version and its
+    normalized criteria.
+
+    ``version`` is a ``data_version()`` result. The generation alone only
+    sees this process's writes when the cache backend is per process, so
+    with it a worker would serve results cached before another process
+    wrote; the data version changes with writes made anywhere.
+    """
+    criteria = [
+        ' '.join(keywords.lower().split()),
+        platform,
+        start_date.isoformat(),
+        end_date.isoformat(),
+        *extra,
+    ]
+    digest = hashlib.sha1(json.dumps(criteria).encode('utf-8')).hexdigest()
+    return f'search:{version_tag(version)}:{current_generation()}:{digest}'
+
+
+def get(key):
+    """Return the cached payload for ``key`` or None, counting hits and misses"""
+    payload = get_cache().get(key)
+    with _stats_lock:
+        _stats['hits' if payload is not None else 'misses'] += 1
+    return payload
+
+
+def set(key, payload):
+    get_cache().set(key, payload)
+
+
+def stats():
+    """Return hit/miss counters for this process"""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['hits'] = 0
+        _stats['misses'] = 0
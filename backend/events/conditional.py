@@ -0,0 +1,79 @@
+"""
+Conditional GET for event reads.
+
+The ETag and Last-Modified validators come from the event data version
+(``cache.data_version()``), a database row bumped on every Event write by
+any process, so they cost one primary key lookup. It is read from the same
+database as the view's data, so a view reading from a lagging replica
+does not pair the primary's version with older rows. A matching
+``If-None-Match`` or ``If-Modified-Since`` gets a 304 before the view
+queries or serializes anything. The version is global: any event write
+changes the validators of every event response.
+
+A search answered with a 304 never reaches the view, so it is not
+recorded in the search history.
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from . import cache
+
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def request_data_version(request):
+    """The event data version, read once per request (see arequest_data_version)"""
+    if not hasattr(request, '_events_data_version'):
+        request._events_data_version = cache.data_version()
+    return request._events_data_version
+
+
+async def arequest_data_version(request):
+    """request_data_version() for async views, which must fetch it before sync code reads it"""
+    if not hasattr(request, '_events_data_version'):
+        request._events_data_version = await cache.adata_version()
+    return request._events_data_version
+
+
+def version_etag(request, *args, **kwargs):
+    if request.method not in SAFE_METHODS:
+        return None
+    return f'W/"{cache.version_tag(request_data_version(request))}"'
+
+
+def version_last_modified(request, *args, **kwargs):
+    if request.method not in SAFE_METHODS:
+        return None
+    return request_data_version(request)[1]
+
+
+def conditional_read(view):
+    """
+    Answer GET/HEAD with data version validators and 304s where they match.
+
+    Responses carry ``Cache-Control: no-cache`` so clients revalidate every
+    time instead of guessing a freshness lifetime from Last-Modified.
+    """
+    conditional_view = condition(
+        etag_func=version_etag, last_modified_func=version_last_modified
+    )(view)
+
+    def no_cache(request, response):
+        if request.method in SAFE_METHODS:
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    if iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            # condition() calls the validators synchronously, on the event loop
+            if request.method in SAFE_METHODS:
+                await arequest_data_version(request)
+            return no_cache(request, await conditional_view(request, *args, **kwargs))
+    else:
+        def wrapper(request, *args, **kwargs):
+            return no_cache(request, conditional_view(request, *args, **kwargs))
+
+    return wraps(view)(wrapper)
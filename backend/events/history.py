@@ -0,0 +1,174 @@
+"""
+Buffered search history recording.
+
+``record()`` only appends to an in-process buffer, so searches never wait
+on a database write. A background thread writes the buffer with one
+``bulk_create`` once ``EVENTSCOPE_SEARCH_HISTORY_FLUSH_SIZE`` entries are
+pending or ``EVENTSCOPE_SEARCH_HISTORY_FLUSH_INTERVAL`` seconds have
+passed, and the rest is written at interpreter exit (the test runner
+discards it before destroying the test database, so that write cannot
+land in the real one). With
+``EVENTSCOPE_SEARCH_HISTORY_BACKGROUND = False`` (as under the test
+runner) no thread is started and the search that fills a batch writes it.
+
+At most ``EVENTSCOPE_SEARCH_HISTORY_MAX_PENDING`` entries are held; when
+the buffer is full new entries are dropped and counted. If the process
+is killed, the entries that were pending are lost, which is bounded by
+the same limit (normally about one flush worth).
+"""
+import atexit
+import logging
+import os
+import random
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import SearchHistory
+
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, f'EVENTSCOPE_SEARCH_HISTORY_{name}', default)
+
+
+class HistoryBuffer:
+    """Per-process buffer of unsaved SearchHistory rows with a flusher thread"""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = deque()
+        self._thread = None
+        self._stats = {'recorded': 0, 'sampled_out': 0, 'dropped': 0, 'flushed': 0, 'failed_flushes': 0}
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='search-history-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def record(self, user, keywords, platform, start_date, end_date):
+        """Queue a search for the history table. Returns True if it was kept"""
+        if not _setting('ENABLED', True):
+            return False
+        if random.random() >= _setting('SAMPLE_RATE', 1.0):
+            with self._lock:
+                self._stats['sampled_out'] += 1
+            return False
+
+        entry = SearchHistory(
+            user=user,
+            keywords=keywords,
+            platform=platform,
+            start_date=start_date,
+            end_date=end_date,
+            searched_at=timezone.now(),
+        )
+        # Threads do not survive fork(); start a fresh buffer in each worker
+        if self._pid != os.getpid():
+            self._reset()
+        with self._lock:
+            if _setting('BACKGROUND', True):
+                self._ensure_thread()
+            if len(self._pending) >= _setting('MAX_PENDING', 10000):
+                self._stats['dropped'] += 1
+                return False
+            self._pending.append(entry)
+            self._stats['recorded'] += 1
+            pending = len(self._pending)
+
+        if pending >= _setting('FLUSH_SIZE', 100):
+            if _setting('BACKGROUND', True):
+                self._wakeup.set()
+            else:
+                self.flush()
+        return True
+
+    def flush(self):
+        """Write every pending entry now. Returns the number written"""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+                self._pending.clear()
+            if not batch:
+                return 0
+            try:
+                with transaction.atomic():
+                    SearchHistory.objects.bulk_create(batch)
+            except Exception:
+                with self._lock:
+                    self._stats['failed_flushes'] += 1
+                    # Put the batch back for the next attempt, within the limit
+                    room = max(_setting('MAX_PENDING', 10000) - len(self._pending), 0)
+                    self._pending.extendleft(reversed(batch[-room:] if room else []))
+                    self._stats['dropped'] += len(batch) - min(room, len(batch))
+                logger.exception('Could not write %d search history entries', len(batch))
+                return 0
+            with self._lock:
+                self._stats['flushed'] += len(batch)
+            return len(batch)
+
+    def discard(self):
+        """Drop every pending entry without writing it. Returns the number dropped"""
+        with self._lock:
+            count = len(self._pending)
+            self._pending.clear()
+            return count
+
+    def wait_and_flush(self):
+        """Wait for a full batch or FLUSH_INTERVAL seconds, then flush. Returns the number written"""
+        self._wakeup.wait(_setting('FLUSH_INTERVAL', 5.0))
+        self._wakeup.clear()
+        return self.flush()
+
+    def _run(self):
+        while True:
+            try:
+                self.wait_and_flush()
+            finally:
+                # This thread has its own connection; do not keep it open between flushes
+                connection.close()
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'pending': len(self._pending)}
+
+
+_buffer = HistoryBuffer()
+
+
+def record(user, keywords, platform, start_date, end_date):
+    return _buffer.record(user, keywords, platform, start_date, end_date)
+
+
+def flush():
+    return _buffer.flush()
+
+
+def discard():
+    return _buffer.discard()
+
+
+def stats():
+    """Counters for this process's history buffer"""
+    return _buffer.stats()
+
+
+@atexit.register
+def _flush_at_exit():
+    if _buffer._pid == os.getpid():
+        try:
+            _buffer.flush()
+        except Exception:
+            logger.exception('Could not flush search history at exit')
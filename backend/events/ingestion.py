@@ -0,0 +1,350 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from . import pubsub, result_store
+from .models import IngestionChunk, IngestionJob, ScrapedResult
+
+
+logger = logging.getLogger(__name__)
+
+
+# Failed jobs are retried until they have been attempted this many times
+MAX_ATTEMPTS = 3
+
+# Raw results are stored and ingested in slices of at most this many items
+CHUNK_SIZE = 500
+
+
+# Every column except the conflict key (batch_id, external_id) is refreshed
+# when a batch receives a result again
+UNIQUE_FIELDS = ['batch_id', 'external_id']
+UPSERT_FIELDS = [
+    'result_type', 'result_id', 'name', 'author', 'description',
+    'platform', 'link', 'urn', 'location', 'image_url', 'keywords',
+    'likes', 'comments', 'reposts', 'extracted_at', 'source', 'received_at',
+]
+
+
+def _count(value):
+    try:
+        return max(int(value or 0), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def normalize_result(result, content_type, search_keywords=''):
+    """Turn one raw extension result into ScrapedResult field values"""
+    if content_type == 'feed_posts' and result.get('type') == 'feed_post':
+        # Handle LinkedIn feed posts
+        fields = {
+            'result_type': 'feed_post',
+            'name': 'Feed Post',  # Generic title for posts
+            'author': result.get('author') or 'Unknown',
+            'urn': result.get('urn') or '',
+            'likes': _count(result.get('likes')),
+            'comments': _count(result.get('comments')),
+            'reposts': _count(result.get('reposts')),
+        }
+    else:
+        # Handle LinkedIn profile search results
+        fields = {
+            'result_type': 'profile',
+            'name': result.get('name') or 'Unknown',
+            'link': result.get('profileUrl') or '#',
+            'location': result.get('location') or '',
+            'image_url': result.get('imageUrl') or '',
+            'keywords': search_keywords or '',
+        }
+
+    result_id = str(result.get('id') or '')
+    fields.update({
+        'result_id': result_id,
+        'description': result.get('description') or '',
+        'platform': 'linkedin',
+        'extracted_at': result.get('extractedAt') or '',
+    })
+    fields['external_id'] = (
+        result.get('urn') or result.get('profileUrl') or result_id or
+        f'generated:{uuid.uuid4()}'
+    )
+    return fields
+
+
+def ingest_results(results, content_type, search_keywords='', source='', batch_id=None):
+    """
+    Upsert a batch of raw extension results.
+
+    Results are de-duplicated on their external id within the batch (the
+    last one wins) and written with a single bulk upsert. A result already
+    in another batch is stored again for this one, so expiring either batch
+    leaves the other complete. Returns (batch_id, result_count).
+    """
+    batch_id = batch_id or uuid.uuid4()
+    received_at = timezone.now()
+
+    by_external_id = {}
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        fields = normalize_result(result, content_type, search_keywords)
+        by_external_id[fields['external_id']] = ScrapedResult(
+            batch_id=batch_id,
+            source=source,
+            received_at=received_at,
+            **fields
+        )
+
+    with transaction.atomic():
+        ScrapedResult.objects.bulk_create(
+            by_external_id.values(),
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=UPSERT_FIELDS,
+        )
+    return batch_id, len(by_external_id)
+
+
+def _payload_results(data):
+    """Return an iterator over the raw results of a parsed or streamed payload"""
+    if hasattr(data, 'iter_results'):
+        return data.iter_results()
+    scraped_data = data.get('data') or {}
+    if not isinstance(scraped_data, dict):
+        raise ValueError("'data' must be an object")
+    results = scraped_data.get('results') or []
+    if not isinstance(results, list):
+        raise ValueError("'data.results' must be a list")
+    return iter(results)
+
+
+def _chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def enqueue(data, chunk_size=CHUNK_SIZE, client=''):
+    """
+    Queue an extension payload for ingestion and return the IngestionJob.
+
+    ``data`` is either a parsed dict or a ``StreamedExtensionPayload``.
+    Results are written to IngestionChunk rows of at most ``chunk_size``
+    items as they are read, so memory use does not grow with the payload.
+    Normalization and the upsert are done by ``run_ingest_workers``.
+    ``client`` (see ``result_store.client_key``) is charged for the batch.
+    """
+    job = IngestionJob.objects.create(
+        batch_id=uuid.uuid4(), status=IngestionJob.STATUS_RECEIVING, client=client
+    )
+    try:
+        received_count = 0
+        for index, chunk in enumerate(_chunked(_payload_results(data), chunk_size)):
+            IngestionChunk.objects.create(job=job, index=index, payload=chunk)
+            received_count += len(chunk)
+
+        # The envelope is only complete once the results have been read
+        scraped_data = data.get('data') or {}
+        if not isinstance(scraped_data, dict):
+            raise ValueError("'data' must be an object")
+        job.source = str(data.get('source') or 'unknown')[:100]
+        job.content_type = str(scraped_data.get('contentType') or 'search_results')[:50]
+        job.search_keywords = str(scraped_data.get('searchKeywords') or '')[:500]
+        job.received_count = received_count
+        job.status = IngestionJob.STATUS_QUEUED
+        job.save(update_fields=[
+            'source', 'content_type', 'search_keywords', 'received_count', 'status'
+        ])
+    except Exception:
+        job.delete()
+        raise
+    return job
+
+
+def claim_next_job(worker=''):
+    """
+    Atomically claim the oldest queued job, or return None if the queue is empty.
+
+    The claim is a conditional UPDATE on the job status, so concurrent
+    workers never process the same job twice.
+    """
+    while True:
+        job_id = (
+            IngestionJob.objects.filter(status=IngestionJob.STATUS_QUEUED)
+            .order_by('id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+
+        claimed = IngestionJob.objects.filter(
+            id=job_id, status=IngestionJob.STATUS_QUEUED
+        ).update(
+            status=IngestionJob.STATUS_PROCESSING,
+            started_at=timezone.now(),
+            worker=worker[:100],
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return IngestionJob.objects.get(id=job_id)
+
+
+def process_job(job):
+    """Ingest a claimed job chunk by chunk and record the outcome on it"""
+    try:
+        processed_count = 0
+        chunk_ids = list(job.chunks.order_by('index').values_list('id', flat=True))
+        for chunk_id in chunk_ids:
+            payload = IngestionChunk.objects.values_list('payload', flat=True).get(id=chunk_id)
+            _, count = ingest_results(
+                payload,
+                content_type=job.content_type,
+                search_keywords=job.search_keywords,
+                source=job.source,
+                batch_id=job.batch_id,
+            )
+            processed_count += count
+    except Exception as e:
+        job.error = str(e)
+        if job.attempts < MAX_ATTEMPTS:
+            job.status = IngestionJob.STATUS_QUEUED
+        else:
+            job.status = IngestionJob.STATUS_FAILED
+            job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        if job.status == IngestionJob.STATUS_FAILED:
+            _announce(job)
+        return job
+
+    job.status = IngestionJob.STATUS_DONE
+    job.processed_count = processed_count
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.last_accessed_at = job.finished_at
+    with transaction.atomic():
+        job.save(update_fields=[
+            'status', 'processed_count', 'error', 'finished_at', 'last_accessed_at'
+        ])
+        job.chunks.all().delete()
+    _announce(job)
+    _evict(job)
+    return job
+
+
+def _evict(job):
+    """Keep the result store within its limits; never fails the job"""
+    try:
+        result_store.evict(client=job.client, keep=job.id)
+    except Exception:
+        logger.exception('Could not evict extension results after batch %s', job.batch_id)
+
+
+def _announce(job):
+    """Tell results stream subscribers about a finished job; never fails the job"""
+    try:
+        pubsub.publish(job)
+    except Exception:
+        logger.exception('Could not announce batch %s', job.batch_id)
+
+
+def requeue_stale_jobs(older_than):
+    """
+    Put jobs left in 'processing' by crashed workers back in the queue.
+
+    A stale job that has had MAX_ATTEMPTS already, e.g. because it kills
+    its worker every time, fails instead. Returns (requeued, failed).
+    """
+    now = timezone.now()
+    stale = IngestionJob.objects.filter(
+        status=IngestionJob.STATUS_PROCESSING, started_at__lt=now - older_than
+    )
+    exhausted = list(stale.filter(attempts__gte=MAX_ATTEMPTS).values_list('id', flat=True))
+    failed = stale.filter(id__in=exhausted).update(
+        status=IngestionJob.STATUS_FAILED,
+        error='The worker stopped while processing the job',
+        finished_at=now,
+    )
+    for job in IngestionJob.objects.filter(
+        id__in=exhausted, status=IngestionJob.STATUS_FAILED, finished_at=now
+    ):
+        _announce(job)
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status=IngestionJob.STATUS_QUEUED)
+    return requeued, failed
+
+
+def run_worker(name, poll_interval=1.0, stale_after=timedelta(minutes=5), once=False,
+               stopping=lambda: False):
+    """
+    Claim and process jobs until ``stopping()`` returns True or, with
+    ``once``, the queue is empty. Stale jobs are requeued every half
+    ``stale_after``, so a job whose worker died is picked up again without
+    waiting for a worker to start. Returns the number of jobs processed.
+    """
+    processed = 0
+    next_check = 0.0
+    while not stopping():
+        if time.monotonic() >= next_check:
+            requeue_stale_jobs(stale_after)
+            next_check = time.monotonic() + stale_after.total_seconds() / 2
+        job = claim_next_job(worker=name)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        process_job(job)
+        processed += 1
+    return processed
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def queue_stats(sample_size=200):
+    """Return queue depth and processing latency over the most recent jobs"""
+    now = timezone.now()
+    depth = IngestionJob.objects.filter(status=IngestionJob.STATUS_QUEUED).count()
+    in_progress = IngestionJob.objects.filter(status=IngestionJob.STATUS_PROCESSING).count()
+    oldest = (
+        IngestionJob.objects.filter(status=IngestionJob.STATUS_QUEUED)
+        .order_by('id')
+        .values_list('created_at', flat=True)
+        .first()
+    )
+
+    recent = IngestionJob.objects.filter(
+        status=IngestionJob.STATUS_DONE
+    ).order_by('-finished_at').values_list('created_at', 'started_at', 'finished_at')[:sample_size]
+    wait_times = []
+    total_times = []
+    for created_at, started_at, finished_at in recent:
+        total_times.append((finished_at - created_at).total_seconds())
+        if started_at:
+            wait_times.append((started_at - created_at).total_seconds())
+
+    return {
+        'queue_depth': depth,
+        'in_progress': in_progress,
+        'oldest_queued_age_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+        'latency_seconds': {
+            'sample_size': len(total_times),
+            'wait_p50': _percentile(wait_times, 0.5),
+            'total_p50': _percentile(total_times, 0.5),
+            'total_p95': _percentile(total_times, 0.95),
+            'total_max': max(total_times) if total_times else None,
+        },
+    }
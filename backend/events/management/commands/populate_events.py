@@ -1,15 +1,60 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from datetime import timedelta
+from events import synthetic
 from events.models import Event
 
 
 class Command(BaseCommand):
-    help = 'Populate the database with sample events'
+    help = 'Populate the database with sample events, or --count synthetic ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=0,
+            help='Generate this many synthetic events instead of the samples'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='Random seed; the same seed and batch size give the same data'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Events inserted per transaction'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Generate event batches in this many processes'
+        )
+        parser.add_argument(
+            '--users', type=int, default=0,
+            help=f'Create this many users ({synthetic.USER_PREFIX}<n>, password '
+                 f'"{synthetic.USER_PASSWORD}")'
+        )
+        parser.add_argument(
+            '--saved-per-user', type=int, default=10,
+            help='Saved events per generated user'
+        )
+        parser.add_argument(
+            '--history-per-user', type=int, default=10,
+            help='Search history entries per generated user'
+        )
 
     def handle(self, *args, **options):
+        if options['count'] < 0 or options['users'] < 0:
+            raise CommandError('--count and --users must not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['users'] and not options['count']:
+            raise CommandError('--users requires --count')
+
         # Clear existing events
-        Event.objects.all().delete()
+        synthetic.clear_events()
+        
+        if options['count']:
+            self.populate_synthetic(options)
+            return
         
         sample_events = [
             {
@@ -102,4 +147,36 @@ class Command(BaseCommand):
         
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {len(sample_events)} sample events')
-        )
\ No newline at end of file
+        )
+
+    def populate_synthetic(self, options):
+        started = time.monotonic()
+        event_ids = synthetic.load_events(
+            options['count'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            processes=max(options['processes'], 1),
+            stdout=self.stdout,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {options['count']} events in {time.monotonic() - started:.1f}s"
+            )
+        )
+
+        if options['users']:
+            user_ids = synthetic.create_users(options['users'])
+            saved, history = synthetic.create_user_activity(
+                user_ids,
+                event_ids,
+                saved_per_user=options['saved_per_user'],
+                history_per_user=options['history_per_user'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Created {len(user_ids)} users with {saved} saved events '
+                    f'and {history} searches'
+                )
+            )
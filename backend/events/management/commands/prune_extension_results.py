@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = 'Evict extension result batches beyond the result store TTL, quotas and size cap'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep running and prune again every this many seconds'
+        )
+
+    def handle(self, *args, **options):
+        from events import result_store
+
+        while True:
+            started = time.monotonic()
+            expired = result_store.evict()
+            self.stdout.write(self.style.SUCCESS(
+                f'Expired {expired} batches in {time.monotonic() - started:.2f}s'
+            ))
+            if not options['interval']:
+                break
+            # Do not hold a connection while idle
+            connection.close()
+            time.sleep(options['interval'])
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from events import search, spelling
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index, keyword table and spelling vocabulary for events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of events processed per keyword and vocabulary batch'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            search.rebuild_keywords(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Rebuilt keyword table'))
+
+        with transaction.atomic():
+            terms = spelling.rebuild_terms(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt spelling vocabulary of {terms} terms'))
+
+        if not search.fts_available():
+            self.stdout.write(
+                self.style.WARNING('Full-text index is only available on SQLite, skipping')
+            )
+            return
+
+        with transaction.atomic():
+            count = search.rebuild_index()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {count} events')
+        )
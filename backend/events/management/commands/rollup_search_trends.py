@@ -0,0 +1,53 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Add search history rows newer than the last run to the trending searches rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='History rows folded in per transaction'
+        )
+        parser.add_argument(
+            '--hourly-retention-days', type=int, default=7,
+            help='Delete hourly buckets older than this many days (0 keeps them)'
+        )
+        parser.add_argument(
+            '--daily-retention-days', type=int, default=0,
+            help='Delete daily buckets older than this many days (0 keeps them)'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep running and roll up again every this many seconds'
+        )
+
+    def handle(self, *args, **options):
+        from events import trends
+
+        retention = {
+            trends.HOUR: options['hourly_retention_days'],
+            trends.DAY: options['daily_retention_days'],
+        }
+        while True:
+            started = time.monotonic()
+            processed = trends.rollup(batch_size=max(options['batch_size'], 1))
+            pruned = sum(
+                trends.prune(granularity, timezone.now() - timedelta(days=days))
+                for granularity, days in retention.items()
+                if days > 0
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Rolled up {processed} searches, pruned {pruned} buckets '
+                f'in {time.monotonic() - started:.2f}s'
+            ))
+            if not options['interval']:
+                break
+            # Do not hold a connection while idle
+            connection.close()
+            time.sleep(options['interval'])
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import signal
+import socket
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def run_worker(index, poll_interval, stale_after, once):
+    """Worker process loop: claim and process jobs until stopped"""
+    django.setup()
+    # Never share database connections inherited from the parent process
+    connections.close_all()
+
+    from events import ingestion
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    name = f'{socket.gethostname()}:{os.getpid()}:{index}'
+    ingestion.run_worker(
+        name, poll_interval=poll_interval, stale_after=stale_after, once=once,
+        stopping=lambda: stopping,
+    )
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of worker processes that drain the extension ingestion queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Number of worker processes'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait before polling an empty queue again'
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=300,
+            help="Requeue jobs stuck in 'processing' for this many seconds (checked every half)"
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of polling forever'
+        )
+
+    def handle(self, *args, **options):
+        from events import ingestion
+
+        stale_after = timedelta(seconds=options['stale_after'])
+        requeued, failed = ingestion.requeue_stale_jobs(stale_after)
+        if requeued or failed:
+            self.stdout.write(self.style.WARNING(
+                f'Requeued {requeued} stale jobs, failed {failed} out of attempts'
+            ))
+
+        workers = max(options['workers'], 1)
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(index, options['poll_interval'], stale_after, options['once']),
+                daemon=True,
+            )
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {workers} ingest workers'))
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+
+        self.stdout.write(self.style.SUCCESS('Ingest workers stopped'))
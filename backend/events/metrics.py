@@ -0,0 +1,273 @@
+"""
+Per-request performance metrics.
+
+MetricsMiddleware measures a sample of requests
+(``EVENTSCOPE_METRICS_SAMPLE_RATE``): wall time, SQL query count and time,
+serialization time (building result rows and encoding JSON) and response
+size. A sampled response reports them in a ``Server-Timing`` header, which
+browser dev tools show per request, and they are added to per-view
+histograms served in the Prometheus text format at ``/metrics``.
+
+Queries are timed by an execute wrapper added to every database connection
+as it opens. It only does work while a sampled request is running in the
+current context, which asgiref copies into sync_to_async threads, so the
+queries of async views count too. An unsampled request costs one random
+number.
+
+The histograms are kept in process memory: with several workers, each
+serves its own, and Prometheus tells them apart by instance. ``/metrics``
+answers staff users, clients in ``EVENTSCOPE_METRICS_ALLOWED_IPS`` and
+requests carrying ``Authorization: Bearer <EVENTSCOPE_METRICS_TOKEN>``;
+everyone else gets a 403.
+"""
+import bisect
+import hmac
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current = ContextVar('eventscope_request_metrics', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, f'EVENTSCOPE_METRICS_{name}', default)
+
+
+class RequestMetrics:
+    """Where one sampled request spent its time"""
+    __slots__ = ('started', 'queries', 'query_time', 'serialize_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.serialize_time = 0.0
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.query_time * 1000:.1f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialize_time * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+
+def sql_wrapper(execute, sql, params, many, context):
+    """Execute wrapper counting and timing the queries of the current request"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.query_time += time.perf_counter() - started
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    """connection_created receiver adding sql_wrapper to the new connection"""
+    if sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_wrapper)
+
+
+def timed_serialization(func):
+    """Count the time spent in ``func`` as the current request's serialization time"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.serialize_time += time.perf_counter() - started
+    return wrapper
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """A Prometheus histogram with one series per view"""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}  # view -> [count per bucket, then above the last], sum
+
+    def observe(self, view, value):
+        counts, total = self.series.get(view) or ([0] * (len(self.buckets) + 1), 0)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.series[view] = (counts, total + value)
+
+    def lines(self):
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} histogram'
+        for view, (counts, total) in sorted(self.series.items()):
+            view = _label(view)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{view="{view}",le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{view="{view}"}} {_number(total)}'
+            yield f'{self.name}_count{{view="{view}"}} {cumulative}'
+
+
+class MetricsRegistry:
+    """Per-process aggregates of the sampled requests"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._requests = {}  # (view, method, status) -> count
+        self._duration = Histogram(
+            'eventscope_request_duration_seconds', 'Request wall time.', DURATION_BUCKETS
+        )
+        self._queries = Histogram(
+            'eventscope_request_queries', 'SQL queries per request.', QUERY_BUCKETS
+        )
+        self._query_time = Histogram(
+            'eventscope_request_query_duration_seconds', 'SQL time per request.', DURATION_BUCKETS
+        )
+        self._serialize_time = Histogram(
+            'eventscope_request_serialize_duration_seconds',
+            'Serialization and JSON encoding time per request.', DURATION_BUCKETS,
+        )
+        self._size = Histogram(
+            'eventscope_response_size_bytes', 'Response body size.', SIZE_BUCKETS
+        )
+
+    def record(self, view, method, status, metrics, duration, size):
+        """Add a sampled request; ``size`` is None for streamed responses"""
+        with self._lock:
+            key = (view, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._duration.observe(view, duration)
+            self._queries.observe(view, metrics.queries)
+            self._query_time.observe(view, metrics.query_time)
+            self._serialize_time.observe(view, metrics.serialize_time)
+            if size is not None:
+                self._size.observe(view, size)
+
+    def export(self):
+        """The aggregates in the Prometheus text exposition format"""
+        lines = [
+            '# HELP eventscope_metrics_sample_rate Fraction of requests measured.',
+            '# TYPE eventscope_metrics_sample_rate gauge',
+            f"eventscope_metrics_sample_rate {_number(float(_setting('SAMPLE_RATE', 1.0)))}",
+            '# HELP eventscope_requests_total Sampled requests.',
+            '# TYPE eventscope_requests_total counter',
+        ]
+        with self._lock:
+            for (view, method, status), count in sorted(self._requests.items()):
+                lines.append(
+                    f'eventscope_requests_total{{view="{_label(view)}",method="{_label(method)}",'
+                    f'status="{status}"}} {count}'
+                )
+            for histogram in (
+                self._duration, self._queries, self._query_time, self._serialize_time, self._size
+            ):
+                lines.extend(histogram.lines())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def _sample():
+    """A RequestMetrics for this request, or None if it is not measured"""
+    if not _setting('ENABLED', True):
+        return None
+    rate = _setting('SAMPLE_RATE', 1.0)
+    if rate < 1 and random.random() >= rate:
+        return None
+    return RequestMetrics()
+
+
+def _finish(request, response, metrics):
+    duration = time.perf_counter() - metrics.started
+    match = request.resolver_match
+    view = match.view_name if match is not None else 'unmatched'
+    size = None if response.streaming else len(response.content)
+    registry.record(view, request.method, response.status_code, metrics, duration, size)
+    response.headers['Server-Timing'] = metrics.server_timing(duration)
+    return response
+
+
+class MetricsMiddleware:
+    """Measure a sample of requests; see the module docstring"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = _sample()
+        if metrics is None:
+            return self.get_response(request)
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = _sample()
+        if metrics is None:
+            return await self.get_response(request)
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return _finish(request, response, metrics)
+
+
+def _may_scrape(request):
+    token = _setting('TOKEN', '')
+    if token:
+        scheme, _, credentials = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode()):
+            return True
+    if request.META.get('REMOTE_ADDR') in _setting('ALLOWED_IPS', ('127.0.0.1', '::1')):
+        return True
+    return request.user.is_staff
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    if not _setting('ENABLED', True):
+        raise Http404
+    if not _may_scrape(request):
+        raise PermissionDenied
+    return HttpResponse(registry.export(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0002_event_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Keyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EventKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_keywords', to='events.event')),
+                ('keyword', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_keywords', to='events.keyword')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='keyword_tags',
+            field=models.ManyToManyField(blank=True, related_name='events', through='events.EventKeyword', to='events.keyword'),
+        ),
+        migrations.AddIndex(
+            model_name='eventkeyword',
+            index=models.Index(fields=['keyword', 'event'], name='events_even_keyword_2dab5a_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='eventkeyword',
+            unique_together={('event', 'keyword')},
+        ),
+    ]
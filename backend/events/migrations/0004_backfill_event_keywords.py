@@ -0,0 +1,69 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def parse_keywords(value):
+    # Mirrors events.search.parse_keywords at the time of this migration
+    seen = []
+    for part in (value or '').split(','):
+        name = ' '.join(part.split()).lower()[:100]
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def backfill_event_keywords(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Keyword = apps.get_model('events', 'Keyword')
+    EventKeyword = apps.get_model('events', 'EventKeyword')
+    db_alias = schema_editor.connection.alias
+
+    keyword_ids = dict(Keyword.objects.using(db_alias).values_list('name', 'id'))
+    last_id = 0
+
+    while True:
+        batch = list(
+            Event.objects.using(db_alias)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'keywords')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        parsed = [(event_id, parse_keywords(keywords)) for event_id, keywords in batch]
+
+        new_names = {
+            name for _, names in parsed for name in names if name not in keyword_ids
+        }
+        if new_names:
+            Keyword.objects.using(db_alias).bulk_create(
+                [Keyword(name=name) for name in new_names], ignore_conflicts=True
+            )
+            keyword_ids.update(
+                Keyword.objects.using(db_alias)
+                .filter(name__in=new_names)
+                .values_list('name', 'id')
+            )
+
+        EventKeyword.objects.using(db_alias).bulk_create(
+            [
+                EventKeyword(event_id=event_id, keyword_id=keyword_ids[name])
+                for event_id, names in parsed
+                for name in names
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_keywords'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_event_keywords, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_backfill_event_keywords'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapedResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('external_id', models.CharField(max_length=500, unique=True)),
+                ('batch_id', models.UUIDField()),
+                ('result_type', models.CharField(choices=[('profile', 'Profile'), ('feed_post', 'Feed Post')], max_length=20)),
+                ('result_id', models.CharField(blank=True, max_length=255)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('author', models.CharField(blank=True, max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('platform', models.CharField(choices=[('linkedin', 'LinkedIn'), ('twitter', 'Twitter/X'), ('facebook', 'Facebook'), ('instagram', 'Instagram')], default='linkedin', max_length=20)),
+                ('link', models.CharField(blank=True, max_length=500)),
+                ('urn', models.CharField(blank=True, max_length=255)),
+                ('location', models.CharField(blank=True, max_length=255)),
+                ('image_url', models.CharField(blank=True, max_length=1000)),
+                ('keywords', models.CharField(blank=True, max_length=500)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('comments', models.PositiveIntegerField(default=0)),
+                ('reposts', models.PositiveIntegerField(default=0)),
+                ('extracted_at', models.CharField(blank=True, max_length=64)),
+                ('source', models.CharField(blank=True, max_length=100)),
+                ('received_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['batch_id', 'id'],
+                'indexes': [models.Index(fields=['batch_id', 'id'], name='events_scra_batch_i_bfb50d_idx'), models.Index(fields=['-received_at'], name='events_scra_receive_5ea85f_idx')],
+            },
+        ),
+    ]
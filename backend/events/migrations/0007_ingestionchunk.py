@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_payloads_to_chunks(apps, schema_editor):
+    IngestionJob = apps.get_model('events', 'IngestionJob')
+    IngestionChunk = apps.get_model('events', 'IngestionChunk')
+    db_alias = schema_editor.connection.alias
+
+    pending = IngestionJob.objects.using(db_alias).filter(status__in=['queued', 'processing'])
+    for job in pending.iterator():
+        IngestionChunk.objects.using(db_alias).create(job=job, index=0, payload=job.payload)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0006_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='status',
+            field=models.CharField(choices=[('receiving', 'Receiving'), ('queued', 'Queued'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='IngestionChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('payload', models.JSONField(default=list)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='events.ingestionjob')),
+            ],
+            options={
+                'ordering': ['job', 'index'],
+                'unique_together': {('job', 'index')},
+            },
+        ),
+        migrations.RunPython(move_payloads_to_chunks, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='ingestionjob',
+            name='payload',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0008_event_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventkeyword',
+            name='event',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='event_keywords', to='events.event'),
+        ),
+        migrations.AlterField(
+            model_name='eventkeyword',
+            name='keyword',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='event_keywords', to='events.keyword'),
+        ),
+    ]
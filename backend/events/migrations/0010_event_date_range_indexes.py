@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:03
+
+from django.db import migrations, models
+
+
+# Must match search.DURATION_SQL exactly, or SQLite will not use the index
+DURATION_INDEX_SQL = (
+    "CREATE INDEX events_event_duration_idx ON events_event "
+    "((julianday(end_date) - julianday(start_date)))"
+)
+
+
+def create_duration_index(apps, schema_editor):
+    # Expression index answering MAX(duration) without a table scan (SQLite only)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(DURATION_INDEX_SQL)
+
+
+def drop_duration_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS events_event_duration_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0009_eventkeyword_drop_redundant_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='event',
+            name='events_even_start_d_d4b514_idx',
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['start_date', 'end_date'], name='events_even_start_d_7e0d92_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['platform', 'start_date', 'end_date'], name='events_even_platfor_c5b717_idx'),
+        ),
+        migrations.RunPython(create_duration_index, drop_duration_index),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:10
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_events(apps, schema_editor):
+    """
+    Keep the oldest event for each (platform, link) and delete the rest.
+
+    Saves of a deleted duplicate move to the kept event unless the user
+    already saved it.
+    """
+    Event = apps.get_model('events', 'Event')
+    SavedEvent = apps.get_model('events', 'SavedEvent')
+    groups = (
+        Event.objects.values('platform', 'link')
+        .annotate(keep_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for group in list(groups):
+        keep_id = group['keep_id']
+        duplicate_ids = list(
+            Event.objects.filter(platform=group['platform'], link=group['link'])
+            .exclude(id=keep_id)
+            .values_list('id', flat=True)
+        )
+        savers = set(SavedEvent.objects.filter(event_id=keep_id).values_list('user_id', flat=True))
+        for saved in SavedEvent.objects.filter(event_id__in=duplicate_ids).order_by('saved_at'):
+            if saved.user_id not in savers:
+                savers.add(saved.user_id)
+                SavedEvent.objects.filter(pk=saved.pk).update(event_id=keep_id)
+        if schema_editor.connection.vendor == 'sqlite':
+            # The full-text index is keyed by event id (see search.py)
+            for event_id in duplicate_ids:
+                schema_editor.execute('DELETE FROM events_event_fts WHERE rowid = %s', [event_id])
+        Event.objects.filter(id__in=duplicate_ids).delete()
+
+
+def restore_duration_index(apps, schema_editor):
+    # Adding or removing the constraint rebuilds events_event on SQLite,
+    # which drops the raw expression index from 0010; recreate it
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS events_event_duration_idx ON events_event "
+        "((julianday(end_date) - julianday(start_date)))"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0013_savedevent_user_saved_at_index'),
+    ]
+
+    operations = [
+        # Also restores the index when the constraint is removed again
+        migrations.RunPython(migrations.RunPython.noop, restore_duration_index),
+        migrations.RunPython(merge_duplicate_events, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('platform', 'link'), name='events_event_unique_platform_link'),
+        ),
+        migrations.RunPython(restore_duration_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:30
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_access_clock(apps, schema_editor):
+    # Existing batches count as last read when they finished
+    IngestionJob = apps.get_model('events', 'IngestionJob')
+    IngestionJob.objects.filter(status='done').update(last_accessed_at=F('finished_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_event_unique_platform_link'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='client',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='ingestionjob',
+            name='last_accessed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_access_clock, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='status',
+            field=models.CharField(choices=[('receiving', 'Receiving'), ('queued', 'Queued'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed'), ('expired', 'Expired')], default='queued', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='ingestionjob',
+            index=models.Index(fields=['status', 'last_accessed_at'], name='events_inge_status_9bb7e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingestionjob',
+            index=models.Index(fields=['client', 'status', 'last_accessed_at'], name='events_inge_client_5f7d34_idx'),
+        ),
+    ]
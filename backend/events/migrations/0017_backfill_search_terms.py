@@ -0,0 +1,72 @@
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def event_terms(rows):
+    # Mirrors events.spelling.event_terms at the time of this migration
+    terms = set()
+    for name, keywords in rows:
+        for word in TOKEN_RE.findall(f'{name} {keywords}'.lower()):
+            if 3 <= len(word) <= 40 and not word.isdigit():
+                terms.add(word)
+    return terms
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def backfill_search_terms(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    SearchTerm = apps.get_model('events', 'SearchTerm')
+    SearchTermTrigram = apps.get_model('events', 'SearchTermTrigram')
+    db_alias = schema_editor.connection.alias
+
+    known = set(SearchTerm.objects.using(db_alias).values_list('term', flat=True))
+    last_id = 0
+
+    while True:
+        batch = list(
+            Event.objects.using(db_alias)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'name', 'keywords')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        missing = event_terms((name, keywords) for _, name, keywords in batch) - known
+        if not missing:
+            continue
+        SearchTerm.objects.using(db_alias).bulk_create(
+            [SearchTerm(term=term) for term in missing], ignore_conflicts=True
+        )
+        SearchTermTrigram.objects.using(db_alias).bulk_create(
+            [
+                SearchTermTrigram(term_id=term_id, trigram=trigram)
+                for term_id, term in SearchTerm.objects.using(db_alias)
+                .filter(term__in=missing)
+                .values_list('id', 'term')
+                for trigram in trigrams(term)
+            ],
+            ignore_conflicts=True,
+        )
+        known |= missing
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0016_search_terms'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_terms, migrations.RunPython.noop),
+    ]
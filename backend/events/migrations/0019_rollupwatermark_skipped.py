@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0018_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='skipped',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
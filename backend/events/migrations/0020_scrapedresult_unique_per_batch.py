@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0019_rollupwatermark_skipped'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='scrapedresult',
+            name='external_id',
+            field=models.CharField(max_length=500),
+        ),
+        migrations.AddConstraint(
+            model_name='scrapedresult',
+            constraint=models.UniqueConstraint(fields=('batch_id', 'external_id'), name='events_scrapedresult_unique_batch_result'),
+        ),
+    ]
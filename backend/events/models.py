@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Event(models.Model):
@@ -23,6 +24,9 @@ class Event(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     keywords = models.CharField(max_length=500, help_text="Comma-separated keywords")
+    keyword_tags = models.ManyToManyField(
+        'Keyword', through='EventKeyword', related_name='events', blank=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -31,21 +35,92 @@ class Event(models.Model):
         indexes = [
             models.Index(fields=['platform']),
             models.Index(fields=['event_type']),
-            models.Index(fields=['start_date']),
+            # Date-range searches, see search.date_range_filter
+            models.Index(fields=['start_date', 'end_date']),
+            models.Index(fields=['platform', 'start_date', 'end_date']),
+            # Keyset pagination on (-created_at, -id), overall and per platform
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['platform', '-created_at', '-id']),
+        ]
+        constraints = [
+            # Natural key for bulk upserts from crawlers
+            models.UniqueConstraint(fields=['platform', 'link'], name='events_event_unique_platform_link'),
         ]
     
     def __str__(self):
         return f"{self.name} ({self.platform})"
 
 
+class Keyword(models.Model):
+    """A normalized (lowercased, trimmed) keyword shared between events"""
+    name = models.CharField(max_length=100, unique=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class EventKeyword(models.Model):
+    # Both lookups are served by the composite indexes below, so the
+    # foreign keys get no single-column indexes of their own
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name='event_keywords', db_index=False
+    )
+    keyword = models.ForeignKey(
+        Keyword, on_delete=models.CASCADE, related_name='event_keywords', db_index=False
+    )
+    
+    class Meta:
+        unique_together = ('event', 'keyword')
+        indexes = [
+            models.Index(fields=['keyword', 'event']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_id} -> {self.keyword_id}"
+
+
+class SearchTerm(models.Model):
+    """A word from event names and keywords, the vocabulary for spelling correction"""
+    term = models.CharField(max_length=100, unique=True)
+    
+    def __str__(self):
+        return self.term
+
+
+class SearchTermTrigram(models.Model):
+    """One trigram of a SearchTerm; see events/spelling.py"""
+    # Candidate lookups go through the (trigram, term) index below
+    term = models.ForeignKey(
+        SearchTerm, on_delete=models.CASCADE, related_name='trigrams', db_index=False
+    )
+    trigram = models.CharField(max_length=3)
+    
+    class Meta:
+        unique_together = ('term', 'trigram')
+        indexes = [
+            models.Index(fields=['trigram', 'term']),
+        ]
+    
+    def __str__(self):
+        return f"{self.trigram!r} -> {self.term_id}"
+
+
 class SavedEvent(models.Model):
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_events')
+    # Lookups by user are covered by the indexes below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_events', db_index=False)
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='saved_by')
     saved_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         unique_together = ('user', 'event')
         ordering = ['-saved_at']
+        indexes = [
+            # A user's saved list, newest first, without a sort step
+            models.Index(fields=['user', '-saved_at']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} saved {self.event.name}"
@@ -57,10 +132,173 @@ class SearchHistory(models.Model):
     platform = models.CharField(max_length=20, choices=Event.PLATFORM_CHOICES)
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
-    searched_at = models.DateTimeField(auto_now_add=True)
+    # Set when the search runs, not when the buffered entry is written
+    searched_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['-searched_at']
     
     def __str__(self):
         return f"Search: {self.keywords} on {self.platform}"
+
+
+class SearchTrend(models.Model):
+    """Searches per normalized keyword, platform and hour or day, from SearchHistory"""
+    GRANULARITY_HOUR = 'hour'
+    GRANULARITY_DAY = 'day'
+    GRANULARITY_CHOICES = [
+        (GRANULARITY_HOUR, 'Hour'),
+        (GRANULARITY_DAY, 'Day'),
+    ]
+    
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    platform = models.CharField(max_length=20, choices=Event.PLATFORM_CHOICES)
+    # Start of the hour or day (UTC)
+    bucket = models.DateTimeField()
+    keyword = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-bucket', '-count']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'platform', 'bucket', 'keyword'],
+                name='events_searchtrend_unique_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket']),
+        ]
+    
+    def __str__(self):
+        return f"{self.keyword} on {self.platform} ({self.granularity} {self.bucket:%Y-%m-%d %H:%M})"
+
+
+class RollupWatermark(models.Model):
+    """The last source row id an incremental rollup has processed"""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    # Ids below last_id that were missing when it passed them: {id: when}
+    skipped = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+class DataVersion(models.Model):
+    """A counter bumped on every write to some data, shared by all processes"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class IngestionJob(models.Model):
+    """A queued Chrome extension payload waiting to be ingested"""
+    STATUS_RECEIVING = 'receiving'
+    STATUS_QUEUED = 'queued'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    # Done, but its results were evicted from the result store
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_RECEIVING, 'Receiving'),
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+    
+    batch_id = models.UUIDField(unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    source = models.CharField(max_length=100, blank=True)
+    content_type = models.CharField(max_length=50, blank=True)
+    search_keywords = models.CharField(max_length=500, blank=True)
+    received_count = models.PositiveIntegerField(default=0)
+    processed_count = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    # Who pushed the batch, for the per-client result quota
+    client = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # When the results were last read; the result store evicts the least recent
+    last_accessed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['-finished_at']),
+            models.Index(fields=['status', 'last_accessed_at']),
+            models.Index(fields=['client', 'status', 'last_accessed_at']),
+        ]
+    
+    def __str__(self):
+        return f"Ingestion {self.batch_id} ({self.status})"
+
+
+class IngestionChunk(models.Model):
+    """A bounded slice of a job's raw ``data.results``, deleted once ingested"""
+    job = models.ForeignKey(IngestionJob, on_delete=models.CASCADE, related_name='chunks')
+    index = models.PositiveIntegerField()
+    payload = models.JSONField(default=list)
+    
+    class Meta:
+        ordering = ['job', 'index']
+        unique_together = ('job', 'index')
+    
+    def __str__(self):
+        return f"Chunk {self.index} of {self.job_id}"
+
+
+class ScrapedResult(models.Model):
+    """A LinkedIn profile or feed post pushed by the Chrome extension"""
+    RESULT_TYPE_CHOICES = [
+        ('profile', 'Profile'),
+        ('feed_post', 'Feed Post'),
+    ]
+    
+    # LinkedIn urn, profile URL or extension-provided id, in that order;
+    # unique within a batch, so every batch keeps its own copy of a result
+    external_id = models.CharField(max_length=500)
+    batch_id = models.UUIDField()
+    result_type = models.CharField(max_length=20, choices=RESULT_TYPE_CHOICES)
+    result_id = models.CharField(max_length=255, blank=True)
+    name = models.CharField(max_length=255, blank=True)
+    author = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    platform = models.CharField(max_length=20, choices=Event.PLATFORM_CHOICES, default='linkedin')
+    link = models.CharField(max_length=500, blank=True)
+    urn = models.CharField(max_length=255, blank=True)
+    location = models.CharField(max_length=255, blank=True)
+    image_url = models.CharField(max_length=1000, blank=True)
+    keywords = models.CharField(max_length=500, blank=True)
+    likes = models.PositiveIntegerField(default=0)
+    comments = models.PositiveIntegerField(default=0)
+    reposts = models.PositiveIntegerField(default=0)
+    extracted_at = models.CharField(max_length=64, blank=True)
+    source = models.CharField(max_length=100, blank=True)
+    received_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['batch_id', 'id']
+        indexes = [
+            models.Index(fields=['batch_id', 'id']),
+            models.Index(fields=['-received_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['batch_id', 'external_id'], name='events_scrapedresult_unique_batch_result'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.result_type}: {self.name or self.author}"
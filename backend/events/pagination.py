@@ -0,0 +1,369 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Count, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .cache import current_generation, get_cache
+from .search import RELEVANCE_ORDERING, ranked_matches
+
+
+class ExtensionResultsPagination(PageNumberPagination):
+    """Pages through one batch of Chrome extension results"""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() with the async ORM: one acount() and one page query"""
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property; fill it so nothing queries synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        bottom = (number - 1) * paginator.per_page
+        rows = [row async for row in queryset[bottom:bottom + paginator.per_page]]
+        self.page = paginator._get_page(rows, number, paginator)
+        return rows
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the ordering columns instead of using OFFSET.
+
+    The cursor holds the ordering values of the last row on the page, and
+    the next page is fetched with a ``WHERE (a, b) < (x, y)`` style filter
+    that an index on the ordering can answer directly. Every page costs
+    the same no matter how deep it is. The ordering must end with a
+    unique column; numeric annotations, like a search score, can be
+    ordered on too.
+
+    ``count`` can be ``estimate`` (default, cached per data generation),
+    ``exact`` or ``none``.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    count_query_param = 'count'
+    default_limit = 20
+    max_limit = 100
+    count_cache_timeout = 60
+    count_modes = ('estimate', 'exact', 'none')
+
+    def get_ordering(self, view=None):
+        return getattr(view, 'keyset_ordering', self.ordering)
+
+    def get_limit(self, value):
+        if value in (None, ''):
+            return self.default_limit
+        try:
+            limit = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError({self.limit_query_param: 'A valid integer is required.'})
+        if limit < 1:
+            raise ValidationError({self.limit_query_param: 'Ensure this value is greater than or equal to 1.'})
+        return min(limit, self.max_limit)
+
+    def get_count_mode(self, value):
+        mode = value or self.count_modes[0]
+        if mode not in self.count_modes:
+            raise ValidationError({self.count_query_param: f'Must be one of: {", ".join(self.count_modes)}.'})
+        return mode
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor, ordering, model):
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError
+            return [
+                self.cursor_value(model, name.lstrip('-'), value)
+                for name, value in zip(ordering, values)
+            ]
+        except (ValueError, TypeError, binascii.Error, DjangoValidationError):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor.'})
+
+    def cursor_value(self, model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations, like search relevance scores, are plain numbers
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(name)
+            return value
+        return field.to_python(value)
+
+    def position_of(self, row, ordering):
+        values = []
+        for name in ordering:
+            # Model instances or .values() dicts
+            field = name.lstrip('-')
+            value = row[field] if isinstance(row, dict) else getattr(row, field)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def keyset_filter(self, ordering, position):
+        """Build the 'rows after ``position``' condition for ``ordering``"""
+        condition = Q()
+        for index, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            step = Q(**{f'{field}__{lookup}': position[index]})
+            for previous_name, previous_value in zip(ordering[:index], position[:index]):
+                step &= Q(**{previous_name.lstrip('-'): previous_value})
+            condition |= step
+
+        # Redundant bound on the leading column so the index gets a range seek
+        # rather than a scan from the start
+        leading = ordering[0]
+        bound = 'lte' if leading.startswith('-') else 'gte'
+        return Q(**{f'{leading.lstrip("-")}__{bound}': position[0]}) & condition
+
+    def _count_key(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.sha1(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+        return f'keyset-count:{current_generation()}:{digest}'
+
+    def get_count(self, queryset, mode):
+        if mode == 'none':
+            return None
+        if mode == 'exact':
+            return queryset.count()
+
+        key = self._count_key(queryset)
+        cache = get_cache()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    async def aget_count(self, queryset, mode):
+        if mode == 'none':
+            return None
+        if mode == 'exact':
+            return await queryset.acount()
+
+        key = self._count_key(queryset)
+        cache = get_cache()
+        count = cache.get(key)
+        if count is None:
+            count = await queryset.acount()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    def get_counts(self, queryset, mode, field):
+        """Row counts per value of ``field`` from one GROUP BY query, cached like get_count()"""
+        if mode == 'none':
+            return None
+        counts_query = queryset.values_list(field).annotate(rows=Count('*')).order_by()
+        if mode == 'exact':
+            return dict(counts_query)
+
+        key = f'{self._count_key(queryset)}:{field}'
+        cache = get_cache()
+        counts = cache.get(key)
+        if counts is None:
+            counts = dict(counts_query)
+            cache.set(key, counts, self.count_cache_timeout)
+        return counts
+
+    async def aget_counts(self, queryset, mode, field):
+        if mode == 'none':
+            return None
+        counts_query = queryset.values_list(field).annotate(rows=Count('*')).order_by()
+        if mode == 'exact':
+            return {value: rows async for value, rows in counts_query}
+
+        key = f'{self._count_key(queryset)}:{field}'
+        cache = get_cache()
+        counts = cache.get(key)
+        if counts is None:
+            counts = {value: rows async for value, rows in counts_query}
+            cache.set(key, counts, self.count_cache_timeout)
+        return counts
+
+    def _count(self, queryset, count_by):
+        """Set ``count``, and ``counts`` per ``count_by`` value if given, for the whole result"""
+        queryset = queryset.order_by()
+        if count_by is None:
+            self.counts = None
+            self.count = self.get_count(queryset, self.count_mode)
+            return
+        self.counts = self.get_counts(queryset, self.count_mode, count_by)
+        self.count = sum(self.counts.values()) if self.counts is not None else None
+
+    async def _acount(self, queryset, count_by):
+        queryset = queryset.order_by()
+        if count_by is None:
+            self.counts = None
+            self.count = await self.aget_count(queryset, self.count_mode)
+            return
+        self.counts = await self.aget_counts(queryset, self.count_mode, count_by)
+        self.count = sum(self.counts.values()) if self.counts is not None else None
+
+    def _start(self, queryset, cursor, limit, count, ordering):
+        """Validate the parameters and return the cursor position, or None"""
+        ordering = tuple(ordering or self.ordering)
+        self.ordering_used = ordering
+        self.limit = self.get_limit(limit)
+        self.count_mode = self.get_count_mode(count)
+        return self.decode_cursor(cursor, ordering, queryset.model)
+
+    def _page_queryset(self, queryset, cursor, limit, count, ordering):
+        """Validate the parameters and return the query for one page plus one row"""
+        position = self._start(queryset, cursor, limit, count, ordering)
+        ordering = self.ordering_used
+        page = queryset.order_by(*ordering)
+        if position is not None:
+            page = page.filter(self.keyset_filter(ordering, position))
+        return page[:self.limit + 1]
+
+    def _finish_page(self, rows):
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_cursor = (
+            self.encode_cursor(self.position_of(rows[-1], self.ordering_used))
+            if self.has_next else None
+        )
+        return rows
+
+    def paginate(self, queryset, cursor=None, limit=None, count=None, ordering=None, count_by=None):
+        """
+        Return one page of ``queryset`` and remember where it ended. With
+        ``count_by``, ``counts`` also holds the row count per value of that field.
+        """
+        page = self._page_queryset(queryset, cursor, limit, count, ordering)
+        self._count(queryset, count_by)
+        return self._finish_page(list(page))
+
+    async def apaginate(self, queryset, cursor=None, limit=None, count=None, ordering=None,
+                        count_by=None):
+        """paginate() with the async ORM"""
+        page = self._page_queryset(queryset, cursor, limit, count, ordering)
+        await self._acount(queryset, count_by)
+        return self._finish_page([row async for row in page.aiterator()])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        params = request.query_params
+        return self.paginate(
+            queryset,
+            cursor=params.get(self.cursor_query_param),
+            limit=params.get(self.limit_query_param),
+            count=params.get(self.count_query_param),
+            ordering=self.get_ordering(view),
+        )
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() with the async ORM"""
+        self.request = request
+        params = request.query_params
+        return await self.apaginate(
+            queryset,
+            cursor=params.get(self.cursor_query_param),
+            limit=params.get(self.limit_query_param),
+            count=params.get(self.count_query_param),
+            ordering=self.get_ordering(view),
+        )
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_page_metadata(self):
+        metadata = {'next_cursor': self.next_cursor, 'limit': self.limit}
+        if self.count is not None:
+            metadata['count'] = self.count
+            metadata['count_is_estimate'] = self.count_mode == 'estimate'
+        return metadata
+
+    def get_paginated_response(self, data):
+        return Response({
+            **self.get_page_metadata(),
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'count_is_estimate': {'type': 'boolean'},
+                'limit': {'type': 'integer'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class RelevancePagination(KeysetPagination):
+    """
+    KeysetPagination over the full-text matches of ``keywords``, best BM25
+    score first. search.ranked_matches() picks the ids of each page, then
+    the page's ``.values()`` rows are fetched by id and given their
+    ``score``. The cursor holds the last row's (score, id).
+    """
+    ordering = RELEVANCE_ORDERING
+
+    def __init__(self, keywords):
+        self.keywords = keywords
+
+    def _rows_by_id(self, queryset, ranked):
+        # The ranked ids already passed the search filters; running them
+        # again would rescan every match
+        return queryset.model._default_manager.filter(
+            pk__in=[pk for pk, _ in ranked]
+        ).order_by().values(*queryset.query.values_select)
+
+    def _ranked_rows(self, ranked, rows):
+        by_id = {row['id']: row for row in rows}
+        # An event deleted in between is skipped
+        return [{**by_id[pk], 'score': score} for pk, score in ranked if pk in by_id]
+
+    def paginate(self, queryset, cursor=None, limit=None, count=None, ordering=None, count_by=None):
+        position = self._start(queryset, cursor, limit, count, self.ordering)
+        ranked = ranked_matches(queryset, self.keywords, self.limit + 1, position)
+        rows = self._rows_by_id(queryset, ranked)
+        self._count(queryset, count_by)
+        return self._finish_page(self._ranked_rows(ranked, rows))
+
+    async def apaginate(self, queryset, cursor=None, limit=None, count=None, ordering=None,
+                        count_by=None):
+        position = self._start(queryset, cursor, limit, count, self.ordering)
+        ranked = await sync_to_async(ranked_matches)(
+            queryset, self.keywords, self.limit + 1, position
+        )
+        rows = self._rows_by_id(queryset, ranked)
+        await self._acount(queryset, count_by)
+        return self._finish_page(self._ranked_rows(ranked, [row async for row in rows.aiterator()]))
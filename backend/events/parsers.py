@@ -0,0 +1,271 @@
+import codecs
+import json
+import zlib
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+READ_SIZE = 64 * 1024
+WHITESPACE = ' \t\r\n'
+# Characters that can continue a JSON number
+NUMBER_CHARS = '0123456789+-.eE'
+
+
+def decompressed_chunks(stream, content_encoding='', read_size=READ_SIZE):
+    """
+    Yield decoded text chunks from ``stream``.
+
+    Supports ``gzip`` and ``deflate`` (zlib-wrapped or raw) content
+    encodings; only one compressed and one decompressed chunk are held in
+    memory at a time.
+    """
+    encoding = (content_encoding or 'identity').strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif encoding == 'deflate':
+        decompressor = None  # picked from the first byte below
+    elif encoding == 'identity':
+        decompressor = False
+    else:
+        raise ParseError(f'Unsupported Content-Encoding: {content_encoding}')
+
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = b''
+    try:
+        while True:
+            raw = stream.read(read_size) if stream is not None else b''
+            if not raw:
+                break
+            if decompressor is None:
+                # The zlib header check below needs the first two bytes
+                pending += raw
+                if len(pending) < 2:
+                    continue
+                raw, pending = pending, b''
+                # zlib streams start with a 2-byte header: CM=8 and a multiple of 31
+                is_zlib = len(raw) > 1 and (raw[0] & 0x0F) == 8 and (raw[0] * 256 + raw[1]) % 31 == 0
+                wbits = zlib.MAX_WBITS if is_zlib else -zlib.MAX_WBITS
+                decompressor = zlib.decompressobj(wbits)
+            if decompressor:
+                raw = decompressor.decompress(raw)
+            if raw:
+                yield text_decoder.decode(raw)
+        if decompressor is None and pending:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            yield text_decoder.decode(decompressor.decompress(pending))
+        if decompressor:
+            yield text_decoder.decode(decompressor.flush(), final=True)
+            if not decompressor.eof:
+                raise ParseError('Could not decode request body: compressed data is truncated')
+        else:
+            yield text_decoder.decode(b'', final=True)
+    except (zlib.error, UnicodeDecodeError) as exc:
+        raise ParseError(f'Could not decode request body: {exc}')
+
+
+class JSONScanner:
+    """Pulls complete JSON values out of a stream of text chunks"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                self.buffer = self.buffer[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Return the next non-whitespace character, or '' at the end"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ParseError(f'JSON parse error - expected {char!r}, found {found or "end of data"!r}')
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as exc:
+                if self._fill():
+                    continue
+                raise ParseError(f'JSON parse error - {exc}')
+            # A number at the end of the buffer may continue in the next
+            # chunk, even past a partial fraction or exponent ("-0.", "1e")
+            if (
+                not self.buffer[end:].lstrip(NUMBER_CHARS)
+                and (end == len(self.buffer) or isinstance(value, (int, float)))
+                and self._fill()
+            ):
+                continue
+            self.pos = end
+            return value
+
+    def object_keys(self):
+        """Yield the keys of an object; the caller must consume each value"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if not isinstance(key, str):
+                raise ParseError('JSON parse error - object keys must be strings')
+            self.expect(':')
+            yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ParseError("JSON parse error - expected ',' or '}'")
+
+    def array_items(self):
+        """Yield the decoded items of an array one at a time"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ParseError("JSON parse error - expected ',' or ']'")
+
+
+class StreamedExtensionPayload:
+    """
+    Lazily parsed Chrome extension payload.
+
+    ``iter_results()`` walks ``data.results`` one item at a time. Every
+    other key is collected as it is passed, so ``get()`` only returns
+    the complete envelope once the results have been consumed.
+    """
+
+    def __init__(self, chunks):
+        self._scanner = JSONScanner(chunks)
+        self._consumed = False
+        self.meta = {}
+
+    def get(self, key, default=None):
+        return self.meta.get(key, default)
+
+    def iter_results(self):
+        if self._consumed:
+            raise RuntimeError('Extension payload results can only be read once')
+        self._consumed = True
+
+        scanner = self._scanner
+        if scanner.peek() == '':
+            return
+        for key in scanner.object_keys():
+            if key == 'data' and scanner.peek() == '{':
+                data_meta = self.meta['data'] = {}
+                for data_key in scanner.object_keys():
+                    if data_key != 'results':
+                        data_meta[data_key] = scanner.value()
+                    elif scanner.peek() == '[':
+                        yield from scanner.array_items()
+                    else:
+                        raise ParseError("'data.results' must be a list")
+            else:
+                self.meta[key] = scanner.value()
+        if scanner.peek() != '':
+            raise ParseError('JSON parse error - extra data after payload')
+
+
+class StreamingExtensionParser(BaseParser):
+    """
+    JSON parser for large extension payloads.
+
+    Accepts gzip/deflate ``Content-Encoding`` and returns a
+    ``StreamedExtensionPayload`` instead of building the whole object tree.
+    """
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        content_encoding = request.META.get('HTTP_CONTENT_ENCODING', '') if request else ''
+        return StreamedExtensionPayload(decompressed_chunks(stream, content_encoding))
+
+
+def iter_ndjson(chunks):
+    """Yield one decoded JSON value per non-blank line"""
+    pending = ''
+    line_number = 0
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _decode_line(line, line_number)
+    if pending.strip():
+        yield _decode_line(pending, line_number + 1)
+
+
+def _decode_line(line, line_number):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ParseError(f'NDJSON parse error on line {line_number} - {exc}')
+
+
+def iter_json_array(chunks):
+    """Yield the items of a top-level JSON array one at a time"""
+    scanner = JSONScanner(chunks)
+    if scanner.peek() != '[':
+        raise ParseError('Expected a JSON array')
+    yield from scanner.array_items()
+    if scanner.peek() != '':
+        raise ParseError('JSON parse error - extra data after array')
+
+
+class StreamingJSONArrayParser(BaseParser):
+    """
+    JSON array parser for bulk uploads.
+
+    Returns an iterator over the array items, so rows can be processed in
+    batches while the body is still being read. Accepts gzip/deflate
+    ``Content-Encoding``.
+    """
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        content_encoding = request.META.get('HTTP_CONTENT_ENCODING', '') if request else ''
+        return iter_json_array(decompressed_chunks(stream, content_encoding))
+
+
+class NDJSONParser(BaseParser):
+    """Newline-delimited JSON, one value per line, returned as an iterator"""
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        content_encoding = request.META.get('HTTP_CONTENT_ENCODING', '') if request else ''
+        return iter_ndjson(decompressed_chunks(stream, content_encoding))
@@ -0,0 +1,319 @@
+"""
+Publish/subscribe for finished extension ingestion batches.
+
+``process_job()`` publishes every IngestionJob it finishes and the
+``results/stream/`` endpoint relays each one, as a Server-Sent Event, to
+the subscribers of the client that pushed it (``IngestionJob.client``)
+only. The broker is chosen with ``EVENTSCOPE_RESULTS_BROKER``:
+
+- ``InProcessBroker`` delivers to subscribers in this process only, which
+  is enough when jobs are processed where the stream is served.
+- ``DatabaseBroker`` (default) also picks up batches finished by
+  ``run_ingest_workers`` or another web worker: one thread per process polls
+  IngestionJob every ``EVENTSCOPE_RESULTS_STREAM_POLL_INTERVAL`` seconds
+  while anyone is subscribed, however many clients are connected.
+
+Any class with the same ``subscribe()`` and ``publish()`` methods, e.g. one
+backed by Redis pub/sub, can replace them.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import IngestionJob, ScrapedResult
+from .pagination import ExtensionResultsPagination
+from .serializers import ScrapedResultSerializer
+
+
+FINISHED = (IngestionJob.STATUS_DONE, IngestionJob.STATUS_FAILED)
+
+# Jobs are stamped before they commit, so a poll also looks this far back
+# for jobs that committed after a later one
+COMMIT_LAG = timedelta(seconds=5)
+
+# Most missed batches replayed to a client resuming with Last-Event-ID
+MAX_REPLAY = 50
+
+
+def _setting(name, default):
+    return getattr(settings, f'EVENTSCOPE_RESULTS_{name}', default)
+
+
+class BatchEvent(namedtuple('BatchEvent', ['job_id', 'finished_at', 'client', 'data'])):
+    """A finished batch of ``client``. ``id`` orders events by (finished_at, job id)"""
+
+    @property
+    def id(self):
+        micros = int(self.finished_at.timestamp() * 1_000_000)
+        return f'{micros}-{self.job_id}'
+
+
+def parse_event_id(value):
+    """Return the (finished_at, job id) position of an event id, or None"""
+    try:
+        micros, job_id = (int(part) for part in str(value).split('-'))
+    except (TypeError, ValueError):
+        return None
+    finished_at = datetime.fromtimestamp(0, tz=dt_timezone.utc) + timedelta(microseconds=micros)
+    return finished_at, job_id
+
+
+def batch_event(job):
+    """Build the event for a finished job, with the first page of its results"""
+    data = {
+        'batch_id': str(job.batch_id),
+        'status': job.status,
+        'source': job.source,
+        'content_type': job.content_type,
+        'search_keywords': job.search_keywords,
+        'finished_at': job.finished_at.isoformat(),
+    }
+    if job.status == IngestionJob.STATUS_FAILED:
+        return BatchEvent(job.id, job.finished_at, job.client, {**data, 'error': job.error})
+
+    page_size = ExtensionResultsPagination.page_size
+    results = ScrapedResult.objects.filter(batch_id=job.batch_id).order_by('id')
+    page = list(results[:page_size])
+    count = len(page) if len(page) < page_size else results.count()
+    next_url = None
+    if count > page_size:
+        next_url = f"{reverse('events:get-extension-results')}?batch={job.batch_id}&page=2"
+    return BatchEvent(job.id, job.finished_at, job.client, {
+        **data,
+        'results': ScrapedResultSerializer(page, many=True).data,
+        'timestamp': page[0].received_at.isoformat() if page else data['finished_at'],
+        'count': count,
+        'next': next_url,
+    })
+
+
+def events_after(event_id, client):
+    """Events for ``client``'s batches finished after ``event_id``, oldest first"""
+    position = parse_event_id(event_id)
+    if position is None or not client:
+        return []
+    finished_at, job_id = position
+    jobs = IngestionJob.objects.filter(
+        Q(finished_at__gt=finished_at) | Q(finished_at=finished_at, id__gt=job_id),
+        status__in=FINISHED, client=client,
+    ).order_by('-finished_at', '-id')[:MAX_REPLAY]
+    return [batch_event(job) for job in reversed(jobs)]
+
+
+def latest_event(client):
+    """Event for ``client``'s most recently finished batch with results, or None"""
+    if not client:
+        return None
+    job = IngestionJob.objects.filter(
+        status=IngestionJob.STATUS_DONE, client=client
+    ).order_by('-finished_at', '-id').first()
+    return batch_event(job) if job else None
+
+
+class Subscription:
+    """Queue of ``client``'s events for one blocking (WSGI) subscriber"""
+
+    def __init__(self, broker, client):
+        self.broker = broker
+        self.client = client
+        self._queue = queue.SimpleQueue()
+
+    def put(self, event):
+        self._queue.put(event)
+
+    def get(self, timeout):
+        """Wait up to ``timeout`` seconds for the next event; None if there was none"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class AsyncSubscription(Subscription):
+    """Queue of ``client``'s events for one subscriber on an event loop; put() is thread-safe"""
+
+    def __init__(self, broker, client):
+        self.broker = broker
+        self.client = client
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+    def put(self, event):
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        except RuntimeError:
+            # The loop is closed; the subscriber is gone
+            self.close()
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    """Fans published events out to the subscribers in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self, client, asynchronous=False):
+        """Return a new subscription to ``client``'s batches; call its ``close()`` when done"""
+        subscription = (AsyncSubscription if asynchronous else Subscription)(self, client)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def has_subscribers(self, client=None):
+        """Whether anyone, or anyone following ``client``, is subscribed"""
+        with self._lock:
+            if client is None:
+                return bool(self._subscribers)
+            return any(subscription.client == client for subscription in self._subscribers)
+
+    def publish(self, job):
+        """Send the event for a finished ``job`` to its client's subscribers"""
+        if job.client and self.has_subscribers(job.client):
+            self.deliver(batch_event(job))
+
+    def deliver(self, event):
+        with self._lock:
+            subscribers = [
+                subscription for subscription in self._subscribers
+                if subscription.client == event.client
+            ]
+        for subscription in subscribers:
+            subscription.put(event)
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    InProcessBroker that also polls IngestionJob for batches finished
+    elsewhere. Each job is delivered once per process, whoever finished it.
+    """
+
+    def __init__(self, poll_interval=None):
+        super().__init__()
+        self.poll_interval = poll_interval or _setting('STREAM_POLL_INTERVAL', 1.0)
+        self._thread = None
+        self._delivered = {}  # job id -> finished_at, within the commit lag
+        self._since = None
+
+    def subscribe(self, client, asynchronous=False):
+        subscription = super().subscribe(client, asynchronous)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='results-stream-poller', daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def publish(self, job):
+        if (
+            job.client and self.has_subscribers(job.client)
+            and self._claim(job.id, job.finished_at)
+        ):
+            self.deliver(batch_event(job))
+
+    def _claim(self, job_id, finished_at):
+        """Return True the first time a job is seen"""
+        with self._lock:
+            if job_id in self._delivered:
+                return False
+            self._delivered[job_id] = finished_at
+            return True
+
+    def _run(self):
+        try:
+            # Only batches finished from now on are news to this process
+            self._since = timezone.now()
+            for job_id, finished_at in self._finished_jobs(self._since - COMMIT_LAG).values_list(
+                'id', 'finished_at'
+            ):
+                self._claim(job_id, finished_at)
+
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        # The next subscribe() starts a new poller
+                        self._thread = None
+                        return
+                self.poll()
+                # This thread has its own connection; do not keep it open between polls
+                connection.close()
+                time.sleep(self.poll_interval)
+        except Exception:
+            with self._lock:
+                self._thread = None
+            raise
+        finally:
+            connection.close()
+
+    def _finished_jobs(self, since):
+        return IngestionJob.objects.filter(
+            status__in=FINISHED, finished_at__gte=since
+        ).order_by('finished_at', 'id')
+
+    def poll(self):
+        """Deliver every batch finished since the last poll. Returns how many"""
+        window = self._since - COMMIT_LAG
+        delivered = 0
+        for job in self._finished_jobs(window):
+            self._since = max(self._since, job.finished_at)
+            claimed = self._claim(job.id, job.finished_at)
+            if claimed and job.client and self.has_subscribers(job.client):
+                self.deliver(batch_event(job))
+                delivered += 1
+        with self._lock:
+            self._delivered = {
+                job_id: finished_at for job_id, finished_at in self._delivered.items()
+                if finished_at >= window
+            }
+        return delivered
+
+
+_broker = None
+_broker_pid = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return this process's broker, built from EVENTSCOPE_RESULTS_BROKER"""
+    global _broker, _broker_pid
+    with _broker_lock:
+        # Threads do not survive fork(); build a fresh broker in each worker
+        if _broker is None or _broker_pid != os.getpid():
+            _broker = import_string(_setting('BROKER', 'events.pubsub.DatabaseBroker'))()
+            _broker_pid = os.getpid()
+        return _broker
+
+
+def reset_broker():
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def publish(job):
+    """Announce a finished ingestion job to the results stream subscribers"""
+    get_broker().publish(job)
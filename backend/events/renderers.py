@@ -0,0 +1,47 @@
+from rest_framework.renderers import JSONRenderer
+from .metrics import timed_serialization
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    The output is byte-for-byte what JSONRenderer produces: compact
+    separators, UTF-8 rather than ``\\u`` escapes, and datetimes, decimals
+    and other non-JSON types are still converted by DRF's encoder (orjson
+    hands them over through ``default``). Anything orjson cannot produce in
+    the same form, such as indented output, ASCII-only output or integers
+    beyond 64 bits, goes through JSONRenderer instead. The one difference
+    is floats in exponent form (below 1e-4 or from 1e16), written as
+    ``1e-7`` instead of ``1e-07``; they decode to the same value.
+    """
+
+    @timed_serialization
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like JSONRenderer, escape the two line separators JavaScript rejects
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
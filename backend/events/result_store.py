@@ -0,0 +1,155 @@
+"""
+Bounded storage for Chrome extension results.
+
+Results are stored per batch as normalized ScrapedResult rows, and every
+batch's IngestionJob records who pushed it (``client``: the user, or the
+session of an anonymous client) and when its results were last read
+(``last_accessed_at``). ``evict()`` keeps the store within three limits,
+evicting the least recently read batches first:
+
+- ``EVENTSCOPE_RESULTS_TTL_DAYS`` (7): batches unread for this long go.
+- ``EVENTSCOPE_RESULTS_MAX_BATCHES_PER_CLIENT`` (20): a client's older
+  batches go once it has more.
+- ``EVENTSCOPE_RESULTS_MAX_STORED`` (200000): the oldest batches go until
+  the result rows fit.
+
+An evicted batch's rows are deleted and its job is marked ``expired``, so
+readers can tell it apart from a batch that never existed. Eviction runs
+after every ingested batch and from ``prune_extension_results``.
+"""
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import IngestionJob, ScrapedResult
+
+
+# Reads of one batch within this long update last_accessed_at only once
+TOUCH_INTERVAL = timedelta(minutes=1)
+
+_touch_lock = threading.Lock()
+_touched = {}  # batch id -> when this process last recorded a read
+
+
+def _setting(name, default):
+    return getattr(settings, f'EVENTSCOPE_RESULTS_{name}', default)
+
+
+def client_key(request, create=False):
+    """
+    Identify who pushed or reads a batch: the user if signed in, else the
+    session. Anonymous clients behind one proxy share an address, so it
+    cannot tell them apart. Returns None for a request without a session,
+    unless ``create`` starts one.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    session = getattr(request, 'session', None)
+    if session is None:
+        return None
+    if session.session_key is None:
+        if not create:
+            return None
+        session.save()
+    return f'session:{session.session_key}'
+
+
+def readable_batch(request):
+    """
+    The batch ``request`` may read, as a UUID: ``?batch=`` if its client
+    pushed it, else the session's latest push. None if there is neither;
+    a batch of another client is treated as missing. Raises ValueError for
+    a malformed batch id.
+    """
+    session_batch = request.session.get('extension_batch_id')
+    batch_id = request.query_params.get('batch') or session_batch
+    if not batch_id:
+        return None
+    batch_uuid = uuid.UUID(str(batch_id))
+    if str(batch_uuid) == session_batch:
+        return batch_uuid
+    client = client_key(request)
+    if client and IngestionJob.objects.filter(batch_id=batch_uuid, client=client).exists():
+        return batch_uuid
+    return None
+
+
+def touch(batch_id):
+    """Record a read of ``batch_id`` for LRU eviction, at most once per TOUCH_INTERVAL"""
+    now = timezone.now()
+    with _touch_lock:
+        last = _touched.get(batch_id)
+        if last is not None and now - last < TOUCH_INTERVAL:
+            return False
+        if len(_touched) >= 10000:
+            _touched.clear()
+        _touched[batch_id] = now
+    IngestionJob.objects.filter(
+        batch_id=batch_id, status=IngestionJob.STATUS_DONE
+    ).update(last_accessed_at=now)
+    return True
+
+
+def expire(job_ids):
+    """Delete the results of the given done jobs and mark them expired"""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return 0
+    with transaction.atomic():
+        batch_ids = list(
+            IngestionJob.objects.filter(id__in=job_ids, status=IngestionJob.STATUS_DONE)
+            .values_list('batch_id', flat=True)
+        )
+        ScrapedResult.objects.filter(batch_id__in=batch_ids).delete()
+        IngestionJob.objects.filter(
+            id__in=job_ids, status=IngestionJob.STATUS_DONE
+        ).update(status=IngestionJob.STATUS_EXPIRED)
+    return len(batch_ids)
+
+
+def evict(client=None, keep=None, now=None):
+    """
+    Expire batches beyond the TTL, ``client``'s quota (every client's if
+    None) and the global cap, never the job ``keep``. Returns the number of
+    batches expired.
+    """
+    now = now or timezone.now()
+    done = IngestionJob.objects.filter(status=IngestionJob.STATUS_DONE).exclude(id=keep)
+    expired = 0
+
+    ttl_days = _setting('TTL_DAYS', 7)
+    if ttl_days:
+        stale = done.filter(last_accessed_at__lt=now - timedelta(days=ttl_days))
+        expired += expire(stale.values_list('id', flat=True))
+
+    quota = _setting('MAX_BATCHES_PER_CLIENT', 20)
+    if quota:
+        if client is None:
+            clients = list(
+                done.exclude(client='').order_by().values_list('client', flat=True).distinct()
+            )
+        else:
+            clients = [client] if client else []
+        for name in clients:
+            # ``keep`` is excluded above but still counts against its client
+            newest = done.filter(client=name).order_by('-last_accessed_at', '-id')
+            allowed = quota - 1 if keep is not None else quota
+            expired += expire(newest.values_list('id', flat=True)[allowed:])
+
+    cap = _setting('MAX_STORED', 200000)
+    if cap:
+        excess = ScrapedResult.objects.count() - cap
+        if excess > 0:
+            victims = []
+            least_recent = done.order_by('last_accessed_at', 'id')
+            for job_id, count in least_recent.values_list('id', 'processed_count').iterator():
+                victims.append(job_id)
+                excess -= count
+                if excess <= 0:
+                    break
+            expired += expire(victims)
+    return expired
@@ -0,0 +1,74 @@
+"""
+Read replica routing.
+
+Reads of events app models go to the ``replica`` database alias while
+``replica_reads()`` is active, e.g. inside a view decorated with
+``read_from_replica``. Everything else goes to ``default``: writes,
+reads outside those views, and auth and session reads, so a user who
+just signed in is never looked up on a lagging copy. Without a
+``replica`` alias in DATABASES every query uses ``default``.
+
+The replica is a copy of the primary kept up to date outside Django
+(litestream, ``sqlite3 .backup`` on a timer, or a server replica), so it
+lags behind by however long that takes. Only views that tolerate that,
+like search and list pages, should read from it.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+
+REPLICA = 'replica'
+PRIMARY = 'default'
+
+# asgiref copies the context into sync_to_async threads, so async views'
+# ORM calls see it too
+_replica_reads = ContextVar('eventscope_replica_reads', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Send events app reads in this block to the replica"""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def read_from_replica(view):
+    """Run ``view`` (sync or async) with ``replica_reads()`` active"""
+    if iscoroutinefunction(view):
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+    else:
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                return view(*args, **kwargs)
+    return wraps(view)(wrapper)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            _replica_reads.get()
+            and model._meta.app_label == 'events'
+            and REPLICA in settings.DATABASES
+        ):
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, schema included
+        return db == PRIMARY
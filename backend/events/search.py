@@ -0,0 +1,322 @@
+import re
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import Event, Keyword, EventKeyword
+
+
+# SQLite FTS5 virtual table mirroring the searchable Event columns.
+# Its rowid is the Event primary key.
+FTS_TABLE = 'events_event_fts'
+FTS_COLUMNS = ('name', 'keywords', 'description')
+
+# Full-text matching on free-text columns; keywords are matched exactly
+# through the EventKeyword join table instead.
+FTS_TEXT_COLUMNS = ('name', 'description')
+
+# Relevance ranking weights of a match in each FTS column, overridden
+# per column by EVENTSCOPE_SEARCH_FIELD_WEIGHTS
+DEFAULT_FIELD_WEIGHTS = {'name': 3.0, 'keywords': 2.0, 'description': 1.0}
+
+# Search result orders: best BM25 score first, or newest first
+SORT_RELEVANCE = 'relevance'
+SORT_DATE = 'date'
+SORT_ORDERS = (SORT_RELEVANCE, SORT_DATE)
+RELEVANCE_ORDERING = ('-score', '-id')
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+KEYWORD_MAX_LENGTH = 100
+
+# Date-range search modes: events inside the window, or running at any
+# point during it
+DATE_MODE_CONTAINED = 'contained'
+DATE_MODE_OVERLAP = 'overlap'
+DATE_MODES = (DATE_MODE_CONTAINED, DATE_MODE_OVERLAP)
+
+# Event duration in days. Migration 0010 indexes this exact expression on
+# SQLite, so MAX() over it is a single index lookup.
+DURATION_SQL = 'julianday(end_date) - julianday(start_date)'
+
+# Covers float rounding in the julianday arithmetic
+DURATION_MARGIN = timedelta(seconds=1)
+
+# date_range_filter() default: query the longest duration itself
+LOOK_UP = object()
+
+
+def fts_available():
+    """Return True if the full-text index can be used on this database"""
+    return connection.vendor == 'sqlite'
+
+
+def tokenize(text):
+    """Split free text into lowercase search tokens"""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def parse_keywords(value):
+    """
+    Split a comma-separated keyword string into normalized keyword names.
+
+    Names are lowercased with whitespace collapsed, and duplicates are
+    dropped while keeping the original order.
+    """
+    names = []
+    for part in (value or '').split(','):
+        name = ' '.join(part.split()).lower()[:KEYWORD_MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def build_match_query(keywords):
+    """
+    Build an FTS5 MATCH expression from user input.
+
+    Every token becomes a quoted prefix term, so "tech innov" matches
+    "Tech Innovation Summit". Terms are ANDed together and only matched
+    against the name and description columns.
+    Returns None if the input has no searchable tokens.
+    """
+    tokens = tokenize(keywords)
+    if not tokens:
+        return None
+    terms = ' '.join(f'"{token}"*' for token in tokens)
+    return f"{{{' '.join(FTS_TEXT_COLUMNS)}}} : ({terms})"
+
+
+def build_rank_query(keywords):
+    """
+    Build the FTS5 MATCH expression used to score matches of ``keywords``.
+
+    Tokens are ORed prefix terms over every column, so each event found
+    by keyword_filter() also matches it (its keywords are in the
+    ``keywords`` column) and events matching more of the tokens score
+    higher. Returns None if the input has no searchable tokens.
+    """
+    tokens = tokenize(keywords)
+    if not tokens:
+        return None
+    return ' OR '.join(f'"{token}"*' for token in dict.fromkeys(tokens))
+
+
+def field_weights():
+    """BM25 weights for the FTS columns, in FTS_COLUMNS order"""
+    weights = {**DEFAULT_FIELD_WEIGHTS, **getattr(settings, 'EVENTSCOPE_SEARCH_FIELD_WEIGHTS', {})}
+    return [float(weights[column]) for column in FTS_COLUMNS]
+
+
+def ranked_matches(queryset, keywords, limit, after=None):
+    """
+    Return ``(event id, score)`` pairs for the ``limit`` events of Event
+    ``queryset`` that best match ``keywords`` by BM25, best first, in
+    RELEVANCE_ORDERING. ``after`` is the (score, id) position to continue
+    from. Higher scores are better matches.
+
+    Each match is scored once, with the index as the outer loop and
+    ``queryset`` as a membership test; SQLite keeps only the best
+    ``limit`` rows while sorting, however many events match.
+    """
+    db = queryset.db
+    sql, params = queryset.order_by().values('id').query.get_compiler(db).as_sql()
+    ranked = (
+        f"SELECT rowid AS id, -bm25({FTS_TABLE}, %s, %s, %s) AS score FROM {FTS_TABLE} "
+        # The unary + stops SQLite from running one index query per event id
+        f"WHERE {FTS_TABLE} MATCH %s AND +rowid IN ({sql})"
+    )
+    params = [*field_weights(), build_rank_query(keywords), *params]
+    condition = ''
+    if after is not None:
+        score, last_id = after
+        condition = 'WHERE score < %s OR (score = %s AND id < %s)'
+        params += [score, score, last_id]
+    with connections[db].cursor() as cursor:
+        cursor.execute(
+            f"SELECT id, score FROM ({ranked}) {condition} "
+            "ORDER BY score DESC, id DESC LIMIT %s",
+            [*params, limit]
+        )
+        return cursor.fetchall()
+
+
+def can_rank(keywords):
+    """Return True if matches of ``keywords`` can be ranked by relevance"""
+    return fts_available() and build_rank_query(keywords) is not None
+
+
+def keyword_filter(keywords):
+    """
+    Return a Q object matching events for the search string ``keywords``.
+
+    An event matches if its name or description matches the full-text
+    query, or if one of its normalized keywords equals one of the
+    comma-separated search terms.
+    """
+    keyword_match = Q(pk__in=EventKeyword.objects.filter(
+        keyword__name__in=parse_keywords(keywords)
+    ).values('event_id'))
+
+    if not fts_available():
+        return (
+            keyword_match |
+            Q(name__icontains=keywords) |
+            Q(description__icontains=keywords)
+        )
+
+    match_query = build_match_query(keywords)
+    if match_query is None:
+        return keyword_match
+
+    return keyword_match | Q(pk__in=RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+        [match_query]
+    ))
+
+
+def max_event_duration():
+    """
+    Return the longest event duration (plus a small margin), or None.
+
+    Only available on SQLite, where it is a single lookup in the
+    duration expression index.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MAX({DURATION_SQL}) FROM {Event._meta.db_table}")
+        days = cursor.fetchone()[0]
+    if days is None:
+        return None
+    return timedelta(days=max(days, 0)) + DURATION_MARGIN
+
+
+async def amax_event_duration():
+    """max_event_duration() for async views"""
+    return await sync_to_async(max_event_duration)()
+
+
+def date_range_filter(start_date, end_date, mode=DATE_MODE_CONTAINED, longest=LOOK_UP):
+    """
+    Return a Q object matching events in the window ``start_date``-``end_date``.
+
+    ``contained`` matches events that start and end inside the window,
+    ``overlap`` events that are running at any point during it. Both add
+    bounds implied by ``start_date <= end_date`` on every event, so the
+    (platform,) start_date, end_date indexes are range-scanned on
+    ``start_date`` from both sides instead of from one side only.
+
+    Overlap searches query max_event_duration() unless its result is
+    passed as ``longest``, which async callers must do.
+    """
+    if mode == DATE_MODE_CONTAINED:
+        return Q(start_date__gte=start_date, start_date__lte=end_date, end_date__lte=end_date)
+
+    if mode != DATE_MODE_OVERLAP:
+        raise ValueError(f'Unknown date mode: {mode}')
+
+    overlap = Q(start_date__lte=end_date, end_date__gte=start_date)
+    if longest is LOOK_UP:
+        longest = max_event_duration()
+    if longest is not None:
+        # No event that overlaps the window can start more than the longest
+        # event duration before it
+        overlap &= Q(start_date__gte=start_date - longest)
+    return overlap
+
+
+def sync_keywords(events):
+    """Rebuild the EventKeyword rows for the given events"""
+    parsed = [(event.pk, parse_keywords(event.keywords)) for event in events]
+    if not parsed:
+        return
+
+    names = {name for _, event_names in parsed for name in event_names}
+    keyword_ids = dict(Keyword.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - keyword_ids.keys()
+    if missing:
+        Keyword.objects.bulk_create(
+            [Keyword(name=name) for name in missing], ignore_conflicts=True
+        )
+        keyword_ids.update(
+            Keyword.objects.filter(name__in=missing).values_list('name', 'id')
+        )
+
+    EventKeyword.objects.filter(event_id__in=[pk for pk, _ in parsed]).delete()
+    EventKeyword.objects.bulk_create([
+        EventKeyword(event_id=pk, keyword_id=keyword_ids[name])
+        for pk, event_names in parsed
+        for name in event_names
+    ])
+
+
+def index_events(events):
+    """Insert or refresh the search index rows for the given events"""
+    events = list(events)
+    sync_keywords(events)
+    if not fts_available():
+        return
+    rows = [
+        (event.pk, event.name, event.keywords, event.description)
+        for event in events
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+            [(row[0],) for row in rows]
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+            "VALUES (%s, %s, %s, %s)",
+            rows
+        )
+
+
+def unindex_events(event_ids):
+    """Remove the index rows for the given event ids"""
+    if not fts_available():
+        return
+    event_ids = list(event_ids)
+    if not event_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+            [(event_id,) for event_id in event_ids]
+        )
+
+
+def rebuild_keywords(batch_size=1000):
+    """Rebuild the keyword join table from Event.keywords in batches"""
+    EventKeyword.objects.all().delete()
+    last_id = 0
+    while True:
+        batch = list(
+            Event.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'keywords')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        sync_keywords(batch)
+
+
+def rebuild_index():
+    """Rebuild the full-text index from the events table. Returns the row count"""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+            f"SELECT id, {', '.join(FTS_COLUMNS)} FROM events_event"
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+        return cursor.fetchone()[0]
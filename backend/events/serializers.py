@@ -1,17 +1,183 @@
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.utils import html
+from rest_framework.settings import api_settings
 from django.contrib.auth.models import User
-from .models import Event, SavedEvent, SearchHistory
+from django.utils import timezone
+from .models import Event, EventKeyword, SavedEvent, SearchHistory, ScrapedResult
+from .metrics import timed_serialization
+from .pagination import KeysetPagination
+from .search import DATE_MODE_CONTAINED, DATE_MODES, SORT_ORDERS, SORT_RELEVANCE
+from .trends import DEFAULT_WINDOW, WINDOWS
 
 
 class EventSerializer(serializers.ModelSerializer):
+    # Normalized keywords from the join table; prefetch 'keyword_tags' when listing
+    keyword_tags = serializers.SlugRelatedField(
+        many=True, read_only=True, slug_field='name'
+    )
+    
     class Meta:
         model = Event
         fields = [
             'id', 'name', 'description', 'event_type', 'platform', 
-            'link', 'start_date', 'end_date', 'keywords', 
+            'link', 'start_date', 'end_date', 'keywords', 'keyword_tags',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'keyword_tags', 'created_at', 'updated_at']
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        # Render only ``fields`` (see event_fieldset); None renders all of them
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def _field_names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def event_fieldset(params):
+    """
+    The EventSerializer fields picked by the comma-separated ``fields`` and
+    ``exclude`` query parameters, in serializer order, or None for all.
+    """
+    available = EventSerializer.Meta.fields
+    fields = _field_names(params.get('fields'))
+    exclude = _field_names(params.get('exclude'))
+    if not fields and not exclude:
+        return None
+    unknown = [name for name in fields + exclude if name not in available]
+    if unknown:
+        raise serializers.ValidationError({
+            'fields': f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(available)}.'
+        })
+    selected = [
+        name for name in available
+        if (not fields or name in fields) and name not in exclude
+    ]
+    if not selected:
+        raise serializers.ValidationError({'fields': 'At least one field must be selected.'})
+    return selected
+
+
+def event_columns(fields):
+    """The Event columns needed to render ``fields``, for .only() and .values()"""
+    return [name for name in fields if name != 'keyword_tags']
+
+
+class EventBulkListSerializer(serializers.ListSerializer):
+    """Validates each row on its own, keeping valid rows and collecting errors"""
+    
+    def to_internal_value(self, data):
+        self.row_errors = []
+        rows = []
+        for index, item in enumerate(data):
+            try:
+                rows.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                self.row_errors.append((index, exc.detail))
+        return rows
+
+
+class EventBulkSerializer(serializers.ModelSerializer):
+    """One row of a bulk event upload, validated without database queries"""
+    
+    class Meta:
+        model = Event
+        fields = [
+            'name', 'description', 'event_type', 'platform', 'link',
+            'start_date', 'end_date', 'keywords',
+        ]
+        list_serializer_class = EventBulkListSerializer
+        # (platform, link) conflicts are upserts, not errors, so skip the
+        # per-row uniqueness query
+        validators = []
+    
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("Start date must be before end date")
+        return data
+
+
+# Read-only fast path for event lists: the same output as
+# EventSerializer(many=True), built from .values() rows instead of model
+# instances and per-field serializer calls.
+EVENT_DATETIME_FIELDS = ('start_date', 'end_date', 'created_at', 'updated_at')
+# Always fetched: the keyword tag lookup and keyset cursors need them
+EVENT_KEY_COLUMNS = ('id', 'created_at')
+
+
+def event_values(queryset, fields=None):
+    """``queryset`` as dicts of the columns needed to render ``fields`` (default all)"""
+    columns = event_columns(fields or EventSerializer.Meta.fields)
+    columns += [name for name in EVENT_KEY_COLUMNS if name not in columns]
+    return queryset.prefetch_related(None).values(*columns)
+
+
+def _datetime_formatter():
+    """Return a function rendering datetimes exactly like serializers.DateTimeField"""
+    if api_settings.DATETIME_FORMAT is None:
+        return lambda value: value
+    if api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+        return serializers.DateTimeField().to_representation
+    tz = timezone.get_current_timezone()
+    
+    def iso(value):
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return iso
+
+
+def _keyword_tag_pairs(event_ids):
+    # Keyword names in Keyword's default ordering, like the prefetch
+    return (
+        EventKeyword.objects.filter(event_id__in=event_ids)
+        .order_by('keyword__name')
+        .values_list('event_id', 'keyword__name')
+    )
+
+
+@timed_serialization
+def _render_event_values(rows, fields, pairs):
+    if 'keyword_tags' in fields:
+        tags = {row['id']: [] for row in rows}
+        for event_id, name in pairs:
+            tags[event_id].append(name)
+        for row in rows:
+            row['keyword_tags'] = tags[row['id']]
+    
+    render_datetime = _datetime_formatter()
+    datetime_fields = [name for name in EVENT_DATETIME_FIELDS if name in fields]
+    for row in rows:
+        for name in datetime_fields:
+            row[name] = render_datetime(row[name])
+    # Relevance-ranked search rows also carry their score
+    if rows and 'score' in rows[0]:
+        fields = [*fields, 'score']
+    return [{name: row[name] for name in fields} for row in rows]
+
+
+def serialize_event_values(rows, fields=None):
+    """Render ``event_values()`` rows like ``EventSerializer(rows, many=True, fields=fields).data``"""
+    fields = fields or EventSerializer.Meta.fields
+    rows = list(rows)
+    pairs = []
+    if rows and 'keyword_tags' in fields:
+        pairs = _keyword_tag_pairs([row['id'] for row in rows])
+    return _render_event_values(rows, fields, pairs)
+
+
+async def aserialize_event_values(rows, fields=None):
+    """serialize_event_values() with the async ORM"""
+    fields = fields or EventSerializer.Meta.fields
+    rows = list(rows)
+    pairs = []
+    if rows and 'keyword_tags' in fields:
+        pairs = [pair async for pair in _keyword_tag_pairs([row['id'] for row in rows])]
+    return _render_event_values(rows, fields, pairs)
 
 
 class SavedEventSerializer(serializers.ModelSerializer):
@@ -22,6 +188,19 @@ class SavedEventSerializer(serializers.ModelSerializer):
         model = SavedEvent
         fields = ['id', 'event', 'event_id', 'saved_at']
         read_only_fields = ['id', 'saved_at']
+    
+    def __init__(self, *args, event_fields=None, **kwargs):
+        # Narrow the nested event to ``event_fields`` (see event_fieldset)
+        super().__init__(*args, **kwargs)
+        if event_fields is not None:
+            self.fields['event'] = EventSerializer(read_only=True, fields=event_fields)
+
+
+class SavedEventBulkSerializer(serializers.Serializer):
+    """A list of event ids to save or unsave in one request"""
+    event_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500
+    )
 
 
 class SearchHistorySerializer(serializers.ModelSerializer):
@@ -34,14 +213,104 @@ class SearchHistorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'searched_at']
 
 
+class PlatformsField(serializers.Field):
+    """
+    One platform, several (a list, a comma-separated string or a repeated
+    query parameter) or "all", as a list in Event.PLATFORM_CHOICES order
+    """
+    ALL = 'all'
+    default_error_messages = {
+        'invalid': 'Expected a platform, a list of platforms or "all".',
+        'invalid_choice': '"{input}" is not a valid choice.',
+        'empty': 'Select at least one platform.',
+    }
+
+    def get_value(self, dictionary):
+        if html.is_html_input(dictionary) and self.field_name in dictionary:
+            return dictionary.getlist(self.field_name)
+        return super().get_value(dictionary)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [data]
+        if not isinstance(data, list) or not all(isinstance(item, str) for item in data):
+            self.fail('invalid')
+        names = {name.strip() for item in data for name in item.split(',') if name.strip()}
+        platforms = [platform for platform, _ in Event.PLATFORM_CHOICES]
+        if self.ALL in names:
+            return platforms
+        for name in sorted(names - set(platforms)):
+            self.fail('invalid_choice', input=name)
+        if not names:
+            self.fail('empty')
+        return [platform for platform in platforms if platform in names]
+
+    def to_representation(self, value):
+        return value
+
+
 class EventSearchSerializer(serializers.Serializer):
     """Serializer for event search requests"""
     keywords = serializers.CharField(max_length=500)
-    platform = serializers.ChoiceField(choices=Event.PLATFORM_CHOICES)
+    # Validated as ``platforms``, a list
+    platform = PlatformsField(source='platforms')
     start_date = serializers.DateTimeField()
     end_date = serializers.DateTimeField()
+    # 'contained': events inside the window, 'overlap': events running during it
+    date_mode = serializers.ChoiceField(choices=DATE_MODES, default=DATE_MODE_CONTAINED)
+    # Keyset pagination, see KeysetPagination
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(required=False, min_value=1)
+    count = serializers.ChoiceField(choices=KeysetPagination.count_modes, required=False)
+    # 'relevance': best BM25 match first, 'date': newest first
+    sort = serializers.ChoiceField(choices=SORT_ORDERS, default=SORT_RELEVANCE)
     
     def validate(self, data):
         if data['start_date'] > data['end_date']:
             raise serializers.ValidationError("Start date must be before end date")
-        return data
\ No newline at end of file
+        return data
+
+
+class TrendingSearchSerializer(serializers.Serializer):
+    """Query parameters for the trending searches endpoint"""
+    platform = serializers.ChoiceField(choices=Event.PLATFORM_CHOICES, required=False)
+    window = serializers.ChoiceField(choices=list(WINDOWS), default=DEFAULT_WINDOW)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class ScrapedResultSerializer(serializers.ModelSerializer):
+    """Renders stored extension results in the format the frontend expects"""
+    class Meta:
+        model = ScrapedResult
+        fields = '__all__'
+    
+    def to_representation(self, instance):
+        if instance.result_type == 'feed_post':
+            return {
+                'id': instance.result_id or None,
+                'type': 'feed_post',
+                'name': instance.name,
+                'author': instance.author,
+                'description': instance.description,
+                'event_type': 'feed_post',
+                'platform': instance.platform,
+                'urn': instance.urn,
+                'likes': instance.likes,
+                'comments': instance.comments,
+                'reposts': instance.reposts,
+                'extractedAt': instance.extracted_at or None,
+                'source': 'chrome_extension'
+            }
+        return {
+            'id': instance.result_id or None,
+            'name': instance.name,
+            'description': instance.description,
+            'event_type': 'profile',
+            'platform': instance.platform,
+            'link': instance.link,
+            'location': instance.location,
+            'image_url': instance.image_url,
+            'extractedAt': instance.extracted_at or None,
+            'keywords': instance.keywords,
+            'source': 'chrome_extension'
+        }
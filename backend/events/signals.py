@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Event
+from . import cache, search, spelling
+
+
+@receiver(post_save, sender=Event)
+def index_saved_event(sender, instance, **kwargs):
+    """Keep the full-text index, keyword table and vocabulary in sync when an event is saved"""
+    search.index_events([instance])
+    spelling.index_terms([instance])
+    cache.invalidate()
+
+
+@receiver(post_delete, sender=Event)
+def unindex_deleted_event(sender, instance, **kwargs):
+    """Drop the full-text index row when an event is deleted"""
+    search.unindex_events([instance.pk])
+    cache.invalidate()
@@ -0,0 +1,219 @@
+"""
+Spelling correction for search keywords.
+
+Every word of an event's name and keywords is kept in SearchTerm, and
+each term's trigrams in SearchTermTrigram, indexed by trigram. Both are
+added to by index_terms() whenever events are saved; terms of deleted
+events stay until ``rebuild_search_index``.
+
+correct() replaces each search word that is neither a term nor the
+prefix of one with the closest term:
+
+- Candidates are the terms sharing enough trigrams with the word to reach
+  SIMILARITY, and no more than max_edits() longer or shorter, counted
+  with one indexed query per word, so the work does not grow with the
+  number of events.
+- The most similar candidates (trigram Jaccard similarity, computed in
+  the query so long terms sharing many trigrams do not crowd out short
+  ones) are ranked by edit distance, and the best within max_edits() of
+  the word replaces it.
+
+Correction stops when ``EVENTSCOPE_SEARCH_SPELLING_BUDGET_MS`` runs out,
+between or within words, keeping the words corrected so far.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast, Length
+from .models import Event, SearchTerm, SearchTermTrigram
+from .search import TOKEN_RE, tokenize
+
+
+# Shortest word indexed, and shortest search word corrected
+MIN_TERM_LENGTH = 3
+MIN_WORD_LENGTH = 4
+MAX_TERM_LENGTH = 40
+
+# Least trigram similarity of a candidate, like pg_trgm's default
+SIMILARITY = 0.3
+
+# Candidates per word whose edit distance is computed
+MAX_CANDIDATES = 20
+
+# Words corrected per search
+MAX_WORDS = 8
+
+
+def _setting(name, default):
+    return getattr(settings, f'EVENTSCOPE_SEARCH_SPELLING_{name}', default)
+
+
+def trigrams(word):
+    """The trigrams of ``word``, padded like pg_trgm: "  w", " wo", ..., "d " """
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(word_trigrams, term_trigrams):
+    shared = len(word_trigrams & term_trigrams)
+    return shared / (len(word_trigrams) + len(term_trigrams) - shared)
+
+
+def max_edits(word):
+    """Edits allowed to correct ``word``: 1 up to 7 letters, then one more per 4 letters"""
+    return max(1, len(word) // 4)
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            ))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def text_terms(text):
+    """The indexable words of ``text``"""
+    return {
+        word for word in tokenize(text)
+        if MIN_TERM_LENGTH <= len(word) <= MAX_TERM_LENGTH and not word.isdigit()
+    }
+
+
+def event_terms(events):
+    """The indexable words of the given events' names and keywords"""
+    terms = set()
+    for event in events:
+        terms |= text_terms(f'{event.name} {event.keywords}')
+    return terms
+
+
+def add_terms(terms):
+    """Add the terms not in the vocabulary yet, with their trigrams"""
+    terms = set(terms)
+    if not terms:
+        return
+    missing = terms - set(SearchTerm.objects.filter(term__in=terms).values_list('term', flat=True))
+    if not missing:
+        return
+    SearchTerm.objects.bulk_create(
+        [SearchTerm(term=term) for term in missing], ignore_conflicts=True
+    )
+    SearchTermTrigram.objects.bulk_create([
+        SearchTermTrigram(term_id=term_id, trigram=trigram)
+        for term_id, term in SearchTerm.objects.filter(term__in=missing).values_list('id', 'term')
+        for trigram in trigrams(term)
+    ], ignore_conflicts=True)
+
+
+def index_terms(events):
+    """Add the words of the given events to the vocabulary"""
+    add_terms(event_terms(events))
+
+
+def rebuild_terms(batch_size=1000):
+    """Rebuild the vocabulary from every event in batches. Returns the term count"""
+    SearchTerm.objects.all().delete()
+    last_id = 0
+    while True:
+        batch = list(
+            Event.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'name', 'keywords')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        index_terms(batch)
+    return SearchTerm.objects.count()
+
+
+def _known(words):
+    """The words that are terms or prefixes of terms, which search already finds"""
+    known = set(SearchTerm.objects.filter(term__in=words).values_list('term', flat=True))
+    for word in words:
+        if word in known:
+            continue
+        if SearchTerm.objects.filter(term__gt=word, term__lt=word + '\uffff').exists():
+            known.add(word)
+    return known
+
+
+def best_term(word, deadline=None):
+    """
+    The closest term to ``word`` within its edit allowance, or None, also
+    when the ``time.monotonic()`` deadline passes before every candidate
+    is compared.
+    """
+    word_trigrams = trigrams(word)
+    # A term with similarity >= SIMILARITY shares at least this many trigrams
+    shared = math.ceil(SIMILARITY * len(word_trigrams))
+    limit = max_edits(word)
+    candidates = (
+        SearchTermTrigram.objects.filter(trigram__in=word_trigrams)
+        # Each edit changes the length by at most one
+        .alias(length=Length('term__term'))
+        .filter(length__gte=len(word) - limit, length__lte=len(word) + limit)
+        .values('term_id')
+        .annotate(shared=Count('id'))
+        .filter(shared__gte=shared)
+        # Jaccard similarity, taking a term's trigram count to be its length + 1
+        .annotate(similarity=Cast('shared', FloatField()) / (
+            len(word_trigrams) + Length('term__term') + 1 - F('shared')
+        ))
+        .order_by('-similarity', 'term_id')
+        .values_list('term__term', flat=True)[:MAX_CANDIDATES]
+    )
+    scored = []
+    for term in candidates:
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+        score = similarity(word_trigrams, trigrams(term))
+        if score < SIMILARITY:
+            continue
+        distance = edit_distance(word, term, limit)
+        if distance <= limit:
+            scored.append((distance, -score, term))
+    return min(scored)[2] if scored else None
+
+
+def correct(keywords, budget_ms=None):
+    """
+    Return ``keywords`` with misspelled words replaced by the closest
+    known terms, or None if no word was corrected.
+    """
+    if budget_ms is None:
+        budget_ms = _setting('BUDGET_MS', 50)
+    deadline = time.monotonic() + budget_ms / 1000
+    words = [
+        word for word in dict.fromkeys(tokenize(keywords))
+        if len(word) >= MIN_WORD_LENGTH and not word.isdigit()
+    ][:MAX_WORDS]
+    if not words or time.monotonic() >= deadline:
+        return None
+
+    corrections = {}
+    known = _known(words)
+    for word in (word for word in words if word not in known):
+        if time.monotonic() >= deadline:
+            break
+        term = best_term(word, deadline)
+        if term is not None:
+            corrections[word] = term
+    if not corrections:
+        return None
+    lowered = (keywords or '').lower()
+    return TOKEN_RE.sub(lambda match: corrections.get(match.group(), match.group()), lowered)
@@ -0,0 +1,143 @@
+"""
+Server-Sent Events stream of finished extension ingestion batches.
+
+``GET /api/events/results/stream/`` replaces polling ``results/get/``:
+each batch finished by the ingestion workers is pushed once, as a ``batch``
+event carrying its first page of results (the same fields as
+``results/get/``), as soon as the broker (see pubsub.py) hears of it.
+A stream only carries the batches its own client pushed (the user, or the
+session of an anonymous client; see ``result_store.client_key``).
+
+- A new connection first gets the client's latest finished batch, so the
+  page has something to show without a separate request.
+- Every event has an id; a reconnecting ``EventSource`` sends the last
+  one back in ``Last-Event-ID`` (or ``?last_event_id=``) and gets the
+  batches it missed instead.
+- A comment line is sent every ``EVENTSCOPE_RESULTS_STREAM_HEARTBEAT``
+  seconds so proxies keep the connection open, and the server ends the
+  stream after ``EVENTSCOPE_RESULTS_STREAM_MAX_AGE`` seconds; clients
+  reconnect after the ``retry`` delay and resume where they stopped.
+
+Under ASGI a stream costs a subscription on the event loop. Under WSGI it
+holds a worker thread until the client leaves or the stream ends.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from . import pubsub, result_store
+from .renderers import FastJSONRenderer
+
+
+def _setting(name, default):
+    return getattr(settings, f'EVENTSCOPE_RESULTS_STREAM_{name}', default)
+
+
+HEARTBEAT_FRAME = b': heartbeat\n\n'
+
+
+def event_frame(event):
+    # Compact JSON never contains a raw newline, so one data line is enough
+    return b'id: %s\nevent: batch\ndata: %s\n\n' % (
+        event.id.encode('ascii'), FastJSONRenderer().render(event.data)
+    )
+
+
+def backlog(last_event_id, client):
+    """Events to send before live ones: ``client``'s missed batches, or its latest one"""
+    if last_event_id:
+        return pubsub.events_after(last_event_id, client)
+    latest = pubsub.latest_event(client)
+    return [latest] if latest else []
+
+
+class Stream:
+    """The frames of one client's stream, from a broker subscription"""
+
+    def __init__(self, subscription, backlog):
+        self.subscription = subscription
+        self.backlog = backlog
+        # Live copies of replayed batches are skipped
+        self.sent = {event.job_id for event in backlog}
+        self.heartbeat = _setting('HEARTBEAT', 15.0)
+        self.deadline = time.monotonic() + _setting('MAX_AGE', 300.0)
+
+    def opening(self):
+        yield b'retry: %d\n\n' % _setting('RETRY', 3000)
+        for event in self.backlog:
+            yield event_frame(event)
+
+    def wait(self):
+        """Seconds to wait for the next event, or None once the stream has ended"""
+        remaining = self.deadline - time.monotonic()
+        return min(self.heartbeat, remaining) if remaining > 0 else None
+
+    def frame(self, event):
+        if event is None:
+            return HEARTBEAT_FRAME
+        if event.job_id in self.sent:
+            return None
+        self.sent.add(event.job_id)
+        return event_frame(event)
+
+    def __iter__(self):
+        try:
+            yield from self.opening()
+            while (timeout := self.wait()) is not None:
+                frame = self.frame(self.subscription.get(timeout))
+                if frame:
+                    yield frame
+        finally:
+            self.subscription.close()
+
+    async def __aiter__(self):
+        try:
+            for frame in self.opening():
+                yield frame
+            while (timeout := self.wait()) is not None:
+                frame = self.frame(await self.subscription.get(timeout))
+                if frame:
+                    yield frame
+        finally:
+            self.subscription.close()
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """Streams ``stream`` and unsubscribes when the server closes the response"""
+
+    def __init__(self, stream, asynchronous):
+        # A WSGI server cannot consume an async iterator without buffering all of it
+        super().__init__(
+            stream.__aiter__() if asynchronous else iter(stream),
+            content_type='text/event-stream',
+        )
+        self.stream = stream
+        self['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        self['X-Accel-Buffering'] = 'no'
+
+    def close(self):
+        # Also covers a client that left before the first frame
+        self.stream.subscription.close()
+        super().close()
+
+
+@require_GET
+async def extension_results_stream(request):
+    """Push finished extension batches as Server-Sent Events"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    asynchronous = isinstance(request, ASGIRequest)
+    # Reading the user and session queries the database
+    client = await sync_to_async(result_store.client_key)(request)
+    # Subscribe before reading the backlog so nothing finishes in between unseen
+    subscription = pubsub.get_broker().subscribe(client, asynchronous=asynchronous)
+    try:
+        events = await sync_to_async(backlog)(last_event_id, client)
+    except Exception:
+        subscription.close()
+        raise
+
+    return EventStreamResponse(Stream(subscription, events), asynchronous)
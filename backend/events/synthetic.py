@@ -0,0 +1,337 @@
+"""
+Deterministic synthetic data for load testing.
+
+Used by ``populate_events --count`` and the benchmark suite. Every batch
+of events is generated from its own seeded random stream, so the data
+only depends on ``seed`` and ``batch_size``, not on how many processes
+generated it.
+"""
+import multiprocessing
+import random
+from bisect import bisect
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+from itertools import accumulate
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from . import cache as search_cache
+from . import search, spelling
+from .models import Event, EventKeyword, Keyword, SavedEvent, SearchHistory, SearchTerm
+
+
+USER_PREFIX = 'synthetic_user_'
+USER_PASSWORD = 'synthetic-password'
+
+PLATFORM_WEIGHTS = [('linkedin', 45), ('twitter', 25), ('facebook', 18), ('instagram', 12)]
+PLATFORMS = [name for name, _ in PLATFORM_WEIGHTS]
+
+TOPICS = [
+    'ai', 'machine learning', 'blockchain', 'startup', 'marketing', 'design',
+    'photography', 'web development', 'data science', 'cloud', 'security',
+    'devops', 'product management', 'fintech', 'healthcare', 'sustainability',
+    'networking', 'career', 'leadership', 'python', 'javascript', 'mobile',
+    'gaming', 'music', 'education', 'research', 'investment', 'ecommerce',
+]
+# Some topics are far more common than others (Zipf-like)
+TOPIC_WEIGHTS = [1 / rank for rank in range(1, len(TOPICS) + 1)]
+_TOPIC_CUMULATIVE = list(accumulate(TOPIC_WEIGHTS))
+
+EVENT_KINDS = ['Summit', 'Conference', 'Meetup', 'Workshop', 'Bootcamp', 'Webinar', 'Forum', 'Hackathon']
+CITIES = ['Accra', 'Lagos', 'Nairobi', 'London', 'Berlin', 'New York', 'Toronto', 'Singapore']
+DURATIONS = [timedelta(hours=hours) for hours in (1, 2, 3, 4, 6, 8, 24, 48, 72)]
+
+# Event columns written by the loader, in row order
+EVENT_COLUMNS = [
+    'id', 'name', 'description', 'event_type', 'platform', 'link',
+    'start_date', 'end_date', 'keywords', 'created_at', 'updated_at',
+]
+
+# Generated events were "created" over this period before now
+CREATED_SPAN = timedelta(days=365)
+
+
+def pick_topics(rng, count):
+    """Pick ``count`` distinct topics, favouring the popular ones"""
+    total = _TOPIC_CUMULATIVE[-1]
+    topics = []
+    while len(topics) < count:
+        topic = TOPICS[bisect(_TOPIC_CUMULATIVE, rng.random() * total)]
+        if topic not in topics:
+            topics.append(topic)
+    return topics
+
+
+def generate_batch(seed, position, size, first_id, total, now):
+    """
+    Generate ``size`` events starting at offset ``position`` as database rows.
+
+    Returns ``(event_rows, keyword_rows)``: tuples in ``EVENT_COLUMNS``
+    order and ``(event_id, topic)`` pairs for the keyword join table.
+    Ids are assigned from ``first_id`` here, so batches can be generated
+    in any order.
+    """
+    rng = random.Random(f'{seed}:{position}')
+    platforms = rng.choices(PLATFORMS, weights=[weight for _, weight in PLATFORM_WEIGHTS], k=size)
+    step = CREATED_SPAN / max(total, 1)
+    start_of_history = now - CREATED_SPAN
+    today = now.replace(hour=0, minute=0, second=0)
+
+    random_float = rng.random
+    event_rows = []
+    keyword_rows = []
+    for offset, platform in enumerate(platforms):
+        event_id = first_id + position + offset
+        topics = pick_topics(rng, 2 + int(random_float() * 4))
+        kind = EVENT_KINDS[int(random_float() * len(EVENT_KINDS))]
+        city = CITIES[int(random_float() * len(CITIES))]
+        title = f'{topics[0].title()} {kind} {city}'
+        # Most events are in the next three months, a few further out or in the past,
+        # starting at a whole hour of the working day
+        start = today + timedelta(
+            days=int(rng.triangular(-30, 180, 20)), hours=8 + int(random_float() * 11)
+        )
+        created = start_of_history + step * (position + offset)
+        event_rows.append((
+            event_id,
+            title,
+            f'Join the {title} to explore {", ".join(topics)}. '
+            f'Talks, workshops and networking with practitioners from {city} and beyond.',
+            'online' if random_float() < 0.55 else 'onsite',
+            platform,
+            f'https://events.example.com/{platform}/{event_id}',
+            start,
+            start + DURATIONS[int(random_float() * len(DURATIONS))],
+            ', '.join(topics),
+            created,
+            created,
+        ))
+        keyword_rows.extend((event_id, topic) for topic in topics)
+    return event_rows, keyword_rows
+
+
+def _generate_batch(args):
+    return generate_batch(*args)
+
+
+def _insert(model, columns, rows):
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _link_keywords(first_id, last_id):
+    """
+    Insert the join rows of events ``first_id``..``last_id`` in one
+    statement, splitting their ``keywords`` column with SQLite's
+    ``json_each()``. Generated keywords are distinct topic names joined by
+    ", ", so these are the rows ``generate_batch()`` returns, without
+    binding each one from Python.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO events_eventkeyword (event_id, keyword_id) '
+            'SELECT event.id, keyword.id FROM events_event AS event, '
+            """json_each('["' || replace(event.keywords, ', ', '","') || '"]') AS topic, """
+            'events_keyword AS keyword '
+            'WHERE event.id BETWEEN %s AND %s AND keyword.name = topic.value',
+            [first_id, last_id],
+        )
+
+
+def _database_now():
+    """Now, in the form the database driver expects datetime parameters"""
+    now = timezone.now().replace(microsecond=0)
+    if not connection.features.supports_timezones:
+        now = timezone.make_naive(now, connection.timezone)
+    return now
+
+
+@contextmanager
+def _bulk_load(models):
+    """
+    Load into the empty tables of ``models`` quickly on SQLite.
+
+    Their indexes are dropped and built again at the end, which sorts each
+    once instead of updating it row by row, and outside a transaction
+    commits skip the fsync (``synchronous = OFF``). A power loss during the
+    load can corrupt the database, which is acceptable for data that is
+    generated again.
+    """
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    tables = [model._meta.db_table for model in models]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+            f"AND tbl_name IN ({', '.join(['%s'] * len(tables))})",
+            tables,
+        )
+        indexes = cursor.fetchall()
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        # The safety level cannot change inside a transaction
+        relaxed = not connection.in_atomic_block
+        if relaxed:
+            cursor.execute('PRAGMA synchronous = OFF')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for _, sql in indexes:
+                cursor.execute(sql)
+            if relaxed:
+                cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+
+
+def clear_events():
+    """
+    Delete every event with its keywords, saves, index entries and
+    spelling vocabulary.
+
+    Uses plain DELETE statements: ``Event.objects.all().delete()`` would
+    load every event to send ``post_delete`` signals.
+    """
+    with transaction.atomic():
+        SavedEvent.objects.all().delete()
+        EventKeyword.objects.all().delete()
+        SearchTerm.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(Event._meta.db_table)}')
+        search.rebuild_index()
+    search_cache.invalidate()
+
+
+def load_events(count, seed=42, batch_size=10000, processes=1, stdout=None):
+    """
+    Generate and insert ``count`` events in batches. Returns the id range.
+
+    Rows are prepared once and written with ``executemany`` in one
+    transaction per batch; the model's per-field value preparation in
+    ``bulk_create`` costs several times more than the insert itself.
+    With ``processes`` > 1 batches are generated in a process pool while
+    this process inserts them. Into an empty table, the inserts run under
+    ``_bulk_load()``. The keyword table, full-text index, spelling
+    vocabulary and search cache are updated at the end, since no signals
+    are sent.
+    """
+    Keyword.objects.bulk_create([Keyword(name=topic) for topic in TOPICS], ignore_conflicts=True)
+    keyword_ids = dict(Keyword.objects.filter(name__in=TOPICS).values_list('name', 'id'))
+
+    first_id = (Event.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+    now = _database_now()
+    tasks = [
+        (seed, position, min(batch_size, count - position), first_id, count, now)
+        for position in range(0, count, batch_size)
+    ]
+
+    pool = None
+    if processes > 1:
+        connection.close()
+        pool = multiprocessing.Pool(processes, initializer=django.setup)
+        batches = pool.imap(_generate_batch, tasks)
+    else:
+        batches = map(_generate_batch, tasks)
+
+    name_at = EVENT_COLUMNS.index('name')
+    # Names and keywords are built from a small vocabulary: collect the
+    # distinct names and topics, then split those into spelling terms
+    names, topics = set(), set()
+    link_in_sql = connection.vendor == 'sqlite' and connection.features.supports_json_field
+    loading = _bulk_load([Event, EventKeyword]) if first_id == 1 else nullcontext()
+    try:
+        created = 0
+        with loading:
+            for event_rows, keyword_rows in batches:
+                with transaction.atomic():
+                    _insert(Event, EVENT_COLUMNS, event_rows)
+                    if link_in_sql:
+                        _link_keywords(event_rows[0][0], event_rows[-1][0])
+                    else:
+                        _insert(
+                            EventKeyword, ['event_id', 'keyword_id'],
+                            [(event_id, keyword_ids[topic]) for event_id, topic in keyword_rows],
+                        )
+                names.update(row[name_at] for row in event_rows)
+                topics.update(topic for _, topic in keyword_rows)
+                created += len(event_rows)
+                if stdout:
+                    stdout.write(f'events: {created}/{count}\n')
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    terms = set()
+    for text in names | topics:
+        terms |= spelling.text_terms(text)
+
+    # Explicit ids leave sequences behind on backends that have them
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Event]):
+            cursor.execute(sql)
+
+    with transaction.atomic():
+        indexed = search.rebuild_index()
+        spelling.add_terms(terms)
+    search_cache.invalidate()
+    if stdout and search.fts_available():
+        stdout.write(f'search index: {indexed} events\n')
+    return first_id, first_id + count - 1
+
+
+def create_users(count, prefix=USER_PREFIX, password=USER_PASSWORD):
+    """Replace the synthetic users with ``count`` new ones. Returns their ids"""
+    User.objects.filter(username__startswith=prefix).delete()
+    hashed = make_password(password)
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(username=f'{prefix}{index}', password=hashed) for index in range(count)
+        ])
+    return list(
+        User.objects.filter(username__startswith=prefix).order_by('id').values_list('id', flat=True)
+    )
+
+
+def create_user_activity(user_ids, event_ids, saved_per_user=10, history_per_user=10,
+                         seed=42, batch_size=10000):
+    """
+    Give each user saved events and search history.
+
+    ``event_ids`` is a ``(first, last)`` id range. Returns
+    ``(saved_count, history_count)``.
+    """
+    rng = random.Random(f'{seed}:users')
+    first, last = event_ids
+    candidates = range(first, last + 1)
+    now = timezone.now().replace(microsecond=0)
+
+    saved = []
+    history = []
+    for user_id in user_ids:
+        for event_id in rng.sample(candidates, min(saved_per_user, len(candidates))):
+            saved.append(SavedEvent(user_id=user_id, event_id=event_id))
+        for _ in range(history_per_user):
+            start = now + timedelta(days=rng.randint(-10, 60))
+            history.append(SearchHistory(
+                user_id=user_id,
+                keywords=', '.join(pick_topics(rng, rng.choice([1, 1, 2]))),
+                platform=rng.choices(PLATFORMS, weights=[weight for _, weight in PLATFORM_WEIGHTS])[0],
+                start_date=start,
+                end_date=start + timedelta(days=rng.randint(1, 90)),
+            ))
+    with transaction.atomic():
+        SavedEvent.objects.bulk_create(saved, batch_size=batch_size)
+        SearchHistory.objects.bulk_create(history, batch_size=batch_size)
+    return len(saved), len(history)
@@ -0,0 +1,32 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from . import history
+
+
+class TestRunner(DiscoverRunner):
+    """
+    DiscoverRunner that writes search history in the recording thread,
+    one entry at a time, so no flusher thread writes to the test database
+    and every entry is rolled back with its test. Entries still pending
+    when the tests end are discarded, not flushed at exit.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._history_settings = override_settings(
+            EVENTSCOPE_SEARCH_HISTORY_BACKGROUND=False,
+            EVENTSCOPE_SEARCH_HISTORY_FLUSH_SIZE=1,
+        )
+        self._history_settings.enable()
+
+    def teardown_databases(self, old_config, **kwargs):
+        # Entries a failed write put back would otherwise be flushed at exit,
+        # into the real database once the test database is gone
+        history.discard()
+        super().teardown_databases(old_config, **kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        history.discard()
+        self._history_settings.disable()
+        super().teardown_test_environment(**kwargs)
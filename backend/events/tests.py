@@ -1,3 +1,1673 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import json
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.query import QuerySet
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import cache as search_cache
+from . import history as search_history
+from . import ingestion, metrics, pubsub, result_store, spelling, synthetic, trends
+from .parsers import StreamedExtensionPayload, decompressed_chunks, iter_json_array, iter_ndjson
+from .models import (
+    Event, EventKeyword, IngestionJob, RollupWatermark, SavedEvent, ScrapedResult, SearchHistory, SearchTerm,
+)
+from .routers import ReplicaRouter, read_from_replica, replica_reads
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .search import (
+    DURATION_SQL, build_match_query, date_range_filter, keyword_filter, max_event_duration,
+)
+from .serializers import EventSerializer, event_values, serialize_event_values
+from .test_runner import TestRunner
+
+
+def index_name(*fields):
+    return next(index.name for index in Event._meta.indexes if list(index.fields) == list(fields))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class DateRangeSearchTests(TestCase):
+    """Containment and overlap searches must range-scan the date indexes"""
+
+    window_start = datetime(2030, 6, 10, tzinfo=timezone.utc)
+    window_end = datetime(2030, 6, 20, tzinfo=timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        def event(name, start, hours):
+            return Event.objects.create(
+                name=name, description=name, event_type='online', platform='linkedin',
+                link=f'https://example.com/{name}', keywords='python',
+                start_date=start, end_date=start + timedelta(hours=hours),
+            )
+
+        cls.inside = event('inside', datetime(2030, 6, 12, tzinfo=timezone.utc), 4)
+        cls.starts_before = event('starts-before', datetime(2030, 6, 9, tzinfo=timezone.utc), 48)
+        cls.ends_after = event('ends-after', datetime(2030, 6, 19, tzinfo=timezone.utc), 72)
+        cls.before = event('before', datetime(2030, 6, 1, tzinfo=timezone.utc), 2)
+        cls.after = event('after', datetime(2030, 7, 1, tzinfo=timezone.utc), 2)
+
+    def search(self, mode):
+        return Event.objects.filter(
+            date_range_filter(self.window_start, self.window_end, mode), platform='linkedin'
+        )
+
+    def assertRangeScan(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index} (platform=? AND start_date>? AND start_date<?)', plan)
+
+    def test_contained_matches_events_inside_the_window(self):
+        self.assertEqual(set(self.search('contained')), {self.inside})
+
+    def test_overlap_matches_events_running_during_the_window(self):
+        self.assertEqual(
+            set(self.search('overlap')), {self.inside, self.starts_before, self.ends_after}
+        )
+
+    def test_contained_plan_scans_a_bounded_start_date_range(self):
+        self.assertRangeScan(
+            self.search('contained'), index_name('platform', 'start_date', 'end_date')
+        )
+
+    def test_overlap_plan_scans_a_bounded_start_date_range(self):
+        self.assertRangeScan(
+            self.search('overlap'), index_name('platform', 'start_date', 'end_date')
+        )
+
+    def test_paginated_search_keeps_the_range_scan(self):
+        queryset = self.search('overlap').order_by('-created_at', '-id')[:21]
+        self.assertRangeScan(queryset, index_name('platform', 'start_date', 'end_date'))
+
+    def test_max_duration_is_read_from_the_expression_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN SELECT MAX({DURATION_SQL}) FROM events_event')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('USING INDEX events_event_duration_idx', plan)
+        self.assertGreaterEqual(max_event_duration(), timedelta(hours=72))
+
+    def test_search_endpoint_accepts_date_mode(self):
+        client = APIClient()
+        body = {
+            'keywords': 'python',
+            'platform': 'linkedin',
+            'start_date': self.window_start.isoformat(),
+            'end_date': self.window_end.isoformat(),
+        }
+        contained = client.post('/api/events/search/', body, format='json').json()
+        overlap = client.post(
+            '/api/events/search/', {**body, 'date_mode': 'overlap'}, format='json'
+        ).json()
+        self.assertEqual({event['name'] for event in contained['results']}, {'inside'})
+        self.assertEqual(
+            {event['name'] for event in overlap['results']},
+            {'inside', 'starts-before', 'ends-after'},
+        )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Prefix matching uses the SQLite full-text index')
+class FullTextSearchTests(TestCase):
+    """Search terms are word prefixes matched through the FTS5 index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.summit = Event.objects.create(
+            name='Tech Innovation Summit', description='Talks about the Café scene',
+            event_type='online', platform='linkedin', link='https://example.com/summit',
+            keywords='conference', start_date=datetime(2030, 4, 1, tzinfo=timezone.utc),
+            end_date=datetime(2030, 4, 2, tzinfo=timezone.utc),
+        )
+
+    def matches(self, keywords):
+        return list(Event.objects.filter(keyword_filter(keywords)))
+
+    def test_every_token_is_a_prefix_and_all_must_match(self):
+        self.assertEqual(self.matches('tech innov'), [self.summit])
+        self.assertEqual(self.matches('INNOVATION'), [self.summit])
+        self.assertEqual(self.matches('cafe'), [self.summit])  # diacritics removed
+        self.assertEqual(self.matches('tech cooking'), [])
+        self.assertEqual(self.matches('novation'), [])  # prefixes, not substrings
+        self.assertEqual(
+            build_match_query('Tech, "innov"'), '{name description} : ("tech"* "innov"*)'
+        )
+        self.assertIsNone(build_match_query(' ,;'))
+
+    def test_index_follows_saves_and_deletes(self):
+        self.summit.name = 'Robotics Expo'
+        self.summit.save()
+        self.assertEqual(self.matches('tech'), [])
+        self.assertEqual(self.matches('robot'), [self.summit])
+        self.summit.delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM events_event_fts')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+class KeywordMatchTests(TestCase):
+    """Search terms equal to an event's normalized keyword match it, and only those"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def event(name, keywords):
+            return Event.objects.create(
+                name=name, description='', event_type='online', platform='linkedin',
+                link=f'https://example.com/{name}', keywords=keywords,
+                start_date=datetime(2030, 5, 1, tzinfo=timezone.utc),
+                end_date=datetime(2030, 5, 2, tzinfo=timezone.utc),
+            )
+
+        cls.ops = event('Ops Night', 'maintain, Uptime')
+        cls.ml = event('Data Day', ' AI ,Machine  Learning, ai')
+
+    def matches(self, keywords):
+        return set(Event.objects.filter(keyword_filter(keywords)))
+
+    def keyword_names(self, event):
+        return sorted(event.event_keywords.values_list('keyword__name', flat=True))
+
+    def test_keywords_match_exactly(self):
+        self.assertEqual(self.matches('AI'), {self.ml})
+        self.assertEqual(self.matches('machine learning, uptime'), {self.ml, self.ops})
+        self.assertEqual(self.matches('machine'), set())
+        self.assertEqual(self.matches('main'), set())
+
+    def test_keyword_rows_follow_saves(self):
+        self.assertEqual(self.keyword_names(self.ml), ['ai', 'machine learning'])
+        self.ml.keywords = 'AI, robotics'
+        self.ml.save()
+        self.assertEqual(self.keyword_names(self.ml), ['ai', 'robotics'])
+        self.assertEqual(self.matches('machine learning'), set())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Relevance ranking uses the SQLite full-text index')
+class RelevanceSearchTests(TestCase):
+    """Searches are ranked by BM25 over name, keywords and description unless sort=date"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def event(name, description, keywords, day):
+            return Event.objects.create(
+                name=name, description=description, event_type='online', platform='linkedin',
+                link=f'https://example.com/{name}', keywords=keywords,
+                start_date=datetime(2030, 3, day, tzinfo=timezone.utc),
+                end_date=datetime(2030, 3, day, 2, tzinfo=timezone.utc),
+            )
+
+        cls.in_name = event('Rust Summit', 'A summit', 'rust', 1)
+        cls.in_keywords = event('Systems Day', 'Talks', 'rust, go', 2)
+        cls.in_description = event('Backend Meetup', 'Some rust and some go', 'go', 3)
+        cls.unrelated = event('Design Day', 'Colour theory', 'design', 4)
+
+    def search(self, **params):
+        search_cache.get_cache().clear()
+        return APIClient().get('/api/events/search/', {
+            'keywords': 'rust', 'platform': 'linkedin',
+            'start_date': '2030-03-01T00:00:00Z', 'end_date': '2030-03-31T00:00:00Z',
+            **params,
+        })
+
+    def ids(self, body):
+        return [event['id'] for event in body['results']]
+
+    def test_relevance_is_the_default_and_exposes_scores(self):
+        body = self.search().json()
+        self.assertEqual(
+            self.ids(body), [self.in_name.pk, self.in_keywords.pk, self.in_description.pk]
+        )
+        scores = [event['score'] for event in body['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertGreater(scores[0], scores[-1])
+
+    def test_date_sort_has_no_scores(self):
+        body = self.search(sort='date').json()
+        self.assertEqual(
+            self.ids(body), [self.in_description.pk, self.in_keywords.pk, self.in_name.pk]
+        )
+        self.assertNotIn('score', body['results'][0])
+        self.assertEqual(self.search(sort='popularity').status_code, 400)
+
+    def test_cursor_pages_through_every_match_once(self):
+        seen = []
+        cursor = ''
+        while True:
+            body = self.search(keywords='rust, go', limit=1, cursor=cursor).json()
+            seen += self.ids(body)
+            cursor = body['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), [self.in_name.pk, self.in_keywords.pk, self.in_description.pk])
+        self.assertEqual(body['count'], 3)
+        # A date cursor does not hold a score
+        date_cursor = self.search(sort='date', limit=1).json()['next_cursor']
+        self.assertEqual(self.search(cursor=date_cursor).status_code, 400)
+
+    def test_field_weights_are_configurable(self):
+        weights = {'name': 1.0, 'keywords': 1.0, 'description': 20.0}
+        with self.settings(EVENTSCOPE_SEARCH_FIELD_WEIGHTS=weights):
+            body = self.search().json()
+        self.assertEqual(self.ids(body)[0], self.in_description.pk)
+
+
+class MultiPlatformSearchTests(TestCase):
+    """One search covers several platforms, with a count per platform"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for index, platform in enumerate(['linkedin', 'twitter', 'twitter', 'facebook']):
+            Event.objects.create(
+                name=f'Rust {index}', description='', event_type='online', platform=platform,
+                link=f'https://example.com/rust-{index}', keywords='rust',
+                start_date=datetime(2030, 8, 1, tzinfo=timezone.utc),
+                end_date=datetime(2030, 8, 2, tzinfo=timezone.utc),
+            )
+
+    def search(self, method='get', **params):
+        search_cache.get_cache().clear()
+        body = {
+            'keywords': 'rust', 'start_date': '2030-07-01T00:00:00Z',
+            'end_date': '2030-09-01T00:00:00Z', **params,
+        }
+        if method == 'post':
+            return APIClient().post('/api/events/search/', body, format='json')
+        return APIClient().get('/api/events/search/', body)
+
+    def test_all_platforms(self):
+        body = self.search(platform='all').json()
+        self.assertEqual(len(body['results']), 4)
+        self.assertEqual(body['count'], 4)
+        self.assertEqual(
+            body['platform_counts'], {'linkedin': 1, 'facebook': 1, 'twitter': 2, 'instagram': 0}
+        )
+
+    def test_platform_lists(self):
+        for response in (
+            self.search('post', platform=['twitter', 'facebook']),
+            self.search(platform='twitter,facebook'),
+            self.search(platform=['twitter', 'facebook']),  # ?platform=twitter&platform=facebook
+        ):
+            body = response.json()
+            self.assertEqual({event['platform'] for event in body['results']}, {'twitter', 'facebook'})
+            self.assertEqual(body['platform_counts'], {'facebook': 1, 'twitter': 2})
+
+    def test_single_platform_and_errors(self):
+        body = self.search(platform='twitter').json()
+        self.assertEqual(body['count'], 2)
+        self.assertNotIn('platform_counts', body)
+        self.assertEqual(self.search(platform='twitter,myspace').status_code, 400)
+        self.assertEqual(self.search('post', platform=[]).status_code, 400)
+
+
+class DataMigrationTests(TransactionTestCase):
+    """Data migrations fill in rows for events that existed before them"""
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('events', target)])
+        return executor.loader.project_state(('events', target)).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def old_event(self, apps, name, **fields):
+        return apps.get_model('events', 'Event').objects.create(
+            name=name, description='', event_type='online', platform='linkedin',
+            link=f'https://example.com/{name}',
+            start_date=datetime(2030, 1, 1, tzinfo=timezone.utc),
+            end_date=datetime(2030, 1, 2, tzinfo=timezone.utc), **fields,
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'The search index is SQLite only')
+    def test_search_index_backfill(self):
+        apps = self.migrate('0001_initial')
+        event = self.old_event(apps, 'Existing Summit', keywords='python')
+        self.migrate('0002_event_search_index')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid, name, keywords FROM events_event_fts '
+                "WHERE events_event_fts MATCH 'exist*'"
+            )
+            self.assertEqual(cursor.fetchall(), [(event.id, 'Existing Summit', 'python')])
+
+    def test_event_keywords_backfill(self):
+        apps = self.migrate('0003_event_keywords')
+        event = self.old_event(apps, 'Existing Meetup', keywords=' AI ,Machine  Learning, ai')
+        other = self.old_event(apps, 'Existing Talk', keywords='ai')
+        self.migrate('0004_backfill_event_keywords')
+        EventKeyword = apps.get_model('events', 'EventKeyword')
+        self.assertEqual(
+            sorted(EventKeyword.objects.values_list('event_id', 'keyword__name')),
+            [(event.id, 'ai'), (event.id, 'machine learning'), (other.id, 'ai')],
+        )
+
+
+class SearchCacheTests(TestCase):
+    """Searches are served from the cache until an Event is saved or deleted"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.event = cls.create('Cache Conf')
+
+    @staticmethod
+    def create(name):
+        return Event.objects.create(
+            name=name, description='', event_type='online', platform='linkedin',
+            link=f'https://example.com/{name}', keywords='caching',
+            start_date=datetime(2030, 10, 1, tzinfo=timezone.utc),
+            end_date=datetime(2030, 10, 2, tzinfo=timezone.utc),
+        )
+
+    def setUp(self):
+        search_cache.get_cache().clear()
+        search_cache.reset_stats()
+
+    def search(self):
+        body = APIClient().get('/api/events/search/', {
+            'keywords': 'caching', 'platform': 'linkedin',
+            'start_date': '2030-10-01T00:00:00Z', 'end_date': '2030-10-31T00:00:00Z',
+        }).json()
+        return sorted(event['name'] for event in body['results'])
+
+    def test_hits_and_misses(self):
+        self.assertEqual(self.search(), ['Cache Conf'])
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.search(), ['Cache Conf'])
+        # Only the data version behind the conditional GET validators
+        self.assertEqual(len(captured), 1)
+        self.assertIn('events_dataversion', captured[0]['sql'])
+        self.assertEqual(search_cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+        staff = User.objects.create_user('cachier', is_staff=True)
+        client = APIClient()
+        self.assertEqual(client.get('/api/events/search/cache-stats/').status_code, 403)
+        client.force_authenticate(staff)
+        self.assertEqual(client.get('/api/events/search/cache-stats/').json()['hits'], 1)
+
+    def test_event_save_and_delete_invalidate(self):
+        self.assertEqual(self.search(), ['Cache Conf'])
+        added = self.create('Cache Camp')
+        self.assertEqual(self.search(), ['Cache Camp', 'Cache Conf'])
+        self.event.name = 'Cache Congress'
+        self.event.save()
+        self.assertEqual(self.search(), ['Cache Camp', 'Cache Congress'])
+        added.delete()
+        self.assertEqual(self.search(), ['Cache Congress'])
+        self.assertEqual(search_cache.stats()['hits'], 0)
+
+    def test_writes_by_other_processes_invalidate(self):
+        self.assertEqual(self.search(), ['Cache Conf'])
+        # Another worker saves an event: its generation bump stays in its own
+        # cache, only the data version in the database is shared
+        generation = search_cache.current_generation()
+        Event.objects.filter(pk=self.event.pk).update(name='Cache Summit')
+        search_cache.bump_data_version()
+        self.assertEqual(search_cache.current_generation(), generation)
+        self.assertEqual(self.search(), ['Cache Summit'])
+        self.assertEqual(search_cache.stats()['hits'], 0)
+
+
+class SpellingCorrectionTests(TestCase):
+    """Searches that match nothing are retried with words corrected from the vocabulary"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def event(name, keywords):
+            return Event.objects.create(
+                name=name, description='', event_type='online', platform='linkedin',
+                link=f'https://example.com/{name}', keywords=keywords,
+                start_date=datetime(2030, 5, 1, tzinfo=timezone.utc),
+                end_date=datetime(2030, 5, 2, tzinfo=timezone.utc),
+            )
+
+        cls.machine_learning = event('Machine Learning Summit', 'machine learning, ai')
+        cls.blockchain = event('Blockchain Forum', 'blockchain')
+
+    def test_vocabulary_follows_saves(self):
+        self.assertTrue(SearchTerm.objects.filter(term='summit').exists())
+        self.assertTrue(SearchTerm.objects.get(term='blockchain').trigrams.filter(trigram='  b').exists())
+        self.blockchain.name = 'Blockchain Hackathon'
+        self.blockchain.save()
+        self.assertTrue(SearchTerm.objects.filter(term='hackathon').exists())
+
+    def test_correct(self):
+        self.assertEqual(spelling.correct('macine learning'), 'machine learning')
+        self.assertEqual(spelling.correct('Blokchain, startup'), 'blockchain, startup')
+        # Known words and prefixes of known words are left alone
+        self.assertIsNone(spelling.correct('machine'))
+        self.assertIsNone(spelling.correct('block'))
+        self.assertIsNone(spelling.correct('blokchain', budget_ms=0))
+
+    def test_short_terms_are_not_crowded_out_by_long_ones(self):
+        # Earlier, longer terms share as many trigrams with "pythn" as "python" does
+        spelling.add_terms(
+            f'pythonic{chr(97 + index // 26)}{chr(97 + index % 26)}'
+            for index in range(spelling.MAX_CANDIDATES + 10)
+        )
+        spelling.add_terms(['python'])
+        self.assertEqual(spelling.best_term('pythn'), 'python')
+
+    def test_budget_is_checked_within_a_word(self):
+        self.assertEqual(spelling.best_term('blokchain'), 'blockchain')
+        self.assertIsNone(spelling.best_term('blokchain', deadline=time.monotonic()))
+
+    def test_candidates_come_from_the_trigram_index(self):
+        with CaptureQueriesContext(connection) as captured:
+            spelling.correct('macine lerning')
+        # Known words, then a prefix check and a candidate query per misspelled word
+        self.assertEqual(len(captured), 5)
+        for query in captured:
+            self.assertNotIn('FROM "events_event" ', query['sql'])
+
+    def test_search_uses_the_correction_before_sample_data(self):
+        body = APIClient().get('/api/events/search/', {
+            'keywords': 'blokchain', 'platform': 'linkedin',
+            'start_date': '2030-04-01T00:00:00Z', 'end_date': '2030-06-01T00:00:00Z',
+        }).json()
+        self.assertEqual([event['id'] for event in body['results']], [self.blockchain.pk])
+        self.assertEqual(body['corrected_keywords'], 'blockchain')
+        self.assertNotIn('message', body)
+
+
+@override_settings(
+    EVENTSCOPE_SEARCH_HISTORY_FLUSH_SIZE=3,
+    EVENTSCOPE_SEARCH_HISTORY_FLUSH_INTERVAL=60,
+    EVENTSCOPE_SEARCH_HISTORY_MAX_PENDING=5,
+)
+class SearchHistoryBufferTests(TestCase):
+    """Search history is buffered and written in batches by size or interval"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('historian')
+
+    def setUp(self):
+        self.buffer = search_history.HistoryBuffer()
+        # Never start the flusher thread; the tests flush themselves
+        patcher = mock.patch.object(self.buffer, '_ensure_thread')
+        self.thread = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, count=1):
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        return [
+            self.buffer.record(self.user, f'search {index}', 'linkedin', start, start)
+            for index in range(count)
+        ]
+
+    def test_flush_when_a_batch_is_full(self):
+        self.record(2)
+        self.assertEqual(SearchHistory.objects.count(), 0)
+        self.record()  # fills the batch; no thread, so this search writes it
+        self.assertEqual(SearchHistory.objects.count(), 3)
+        self.assertFalse(self.thread.called)
+        self.assertEqual(self.buffer.stats(), {
+            'recorded': 3, 'sampled_out': 0, 'dropped': 0, 'flushed': 3, 'failed_flushes': 0,
+            'pending': 0,
+        })
+
+    @override_settings(EVENTSCOPE_SEARCH_HISTORY_BACKGROUND=True)
+    def test_background_flush_by_size_or_interval(self):
+        self.record(3)
+        self.assertTrue(self.thread.called)
+        self.assertEqual(SearchHistory.objects.count(), 0)
+        started = time.monotonic()
+        self.assertEqual(self.buffer.wait_and_flush(), 3)  # woken by the full batch
+        self.assertLess(time.monotonic() - started, 1)
+
+        self.record()
+        with self.settings(EVENTSCOPE_SEARCH_HISTORY_FLUSH_INTERVAL=0.05):
+            started = time.monotonic()
+            self.assertEqual(self.buffer.wait_and_flush(), 1)
+            self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(SearchHistory.objects.count(), 4)
+
+    @override_settings(EVENTSCOPE_SEARCH_HISTORY_BACKGROUND=True)
+    def test_full_buffer_drops_and_failed_flushes_keep_entries(self):
+        self.assertEqual(self.record(7), [True] * 5 + [False] * 2)
+        with mock.patch.object(SearchHistory.objects, 'bulk_create', side_effect=RuntimeError('down')):
+            with self.assertLogs('events.history', 'ERROR'):
+                self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.stats()['pending'], 5)
+        self.assertEqual(self.buffer.flush(), 5)
+        stats = self.buffer.stats()
+        self.assertEqual((stats['dropped'], stats['failed_flushes'], stats['flushed']), (2, 1, 5))
+
+    def test_sampling_and_disabling(self):
+        with self.settings(EVENTSCOPE_SEARCH_HISTORY_SAMPLE_RATE=0):
+            self.assertEqual(self.record(2), [False, False])
+        with self.settings(EVENTSCOPE_SEARCH_HISTORY_ENABLED=False):
+            self.assertEqual(self.record(), [False])
+        self.assertEqual(self.buffer.stats()['sampled_out'], 2)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    @override_settings(EVENTSCOPE_SEARCH_HISTORY_BACKGROUND=True)
+    def test_runner_discards_entries_left_when_the_databases_go(self):
+        with mock.patch.object(search_history._buffer, '_ensure_thread'):
+            search_history.record(self.user, 'left over', 'linkedin', None, None)
+        self.assertEqual(search_history.stats()['pending'], 1)
+        with mock.patch.object(DiscoverRunner, 'teardown_databases') as teardown:
+            TestRunner().teardown_databases([])
+        teardown.assert_called_once()
+        self.assertEqual(search_history.stats()['pending'], 0)
+        search_history._flush_at_exit()
+        self.assertFalse(SearchHistory.objects.exists())
+
+    @override_settings(EVENTSCOPE_SEARCH_HISTORY_FLUSH_SIZE=1)
+    def test_searches_are_recorded_per_platform(self):
+        # As under the test runner: no thread, each entry written as it is recorded
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get('/api/events/search/', {
+            'keywords': 'python', 'platform': 'twitter,facebook',
+            'start_date': '2030-01-01T00:00:00Z', 'end_date': '2030-02-01T00:00:00Z',
+        })
+        self.assertEqual(
+            sorted(SearchHistory.objects.filter(user=self.user).values_list('platform', flat=True)),
+            ['facebook', 'twitter'],
+        )
+
+
+class SearchTrendTests(TestCase):
+    """The trend rollup counts every history row once, including late commits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('trendsetter')
+
+    def search(self, keywords, at, platform='linkedin', **fields):
+        return SearchHistory.objects.create(
+            user=self.user, keywords=keywords, platform=platform,
+            start_date=at, end_date=at, searched_at=at, **fields,
+        )
+
+    def top(self, window, now, platform=None):
+        return {
+            row['keyword']: row['searches']
+            for row in trends.top_keywords(window, platform=platform, now=now)
+        }
+
+    def test_rerunning_the_rollup_counts_nothing_twice(self):
+        self.search('python, AI', datetime(2030, 1, 1, 10, 15, tzinfo=timezone.utc))
+        self.search('python', datetime(2030, 1, 1, 10, 45, tzinfo=timezone.utc), platform='twitter')
+        self.search('Python', datetime(2030, 1, 1, 11, 5, tzinfo=timezone.utc))
+        now = datetime(2030, 1, 1, 12, tzinfo=timezone.utc)
+
+        self.assertEqual(trends.rollup(batch_size=2), 3)
+        self.assertEqual(trends.rollup(batch_size=2), 0)
+        self.assertEqual(trends.rollup_batch(), 0)
+        self.assertEqual(self.top('24h', now), {'python': 3, 'ai': 1})
+        self.assertEqual(self.top('7d', now, platform='linkedin'), {'python': 2, 'ai': 1})
+
+    def test_window_boundaries(self):
+        now = datetime(2030, 1, 8, 10, 30, tzinfo=timezone.utc)
+        self.search('before hour', datetime(2030, 1, 8, 9, 59, 59, tzinfo=timezone.utc))
+        self.search('this hour', datetime(2030, 1, 8, 10, tzinfo=timezone.utc))
+        self.search('before day', datetime(2030, 1, 7, 10, 59, 59, tzinfo=timezone.utc))
+        self.search('this day', datetime(2030, 1, 7, 11, tzinfo=timezone.utc))
+        self.search('before week', datetime(2029, 12, 31, 23, 59, 59, tzinfo=timezone.utc))
+        self.search('this week', datetime(2030, 1, 2, tzinfo=timezone.utc))
+        trends.rollup()
+
+        self.assertEqual(trends.window_start('1h', now), datetime(2030, 1, 8, 10, tzinfo=timezone.utc))
+        self.assertEqual(trends.window_start('7d', now), datetime(2030, 1, 2, tzinfo=timezone.utc))
+        self.assertEqual(self.top('1h', now), {'this hour': 1})
+        self.assertEqual(
+            self.top('24h', now), {'before hour': 1, 'this hour': 1, 'this day': 1}
+        )
+        self.assertEqual(set(self.top('7d', now)), {
+            'before hour', 'this hour', 'before day', 'this day', 'this week',
+        })
+        self.assertEqual(len(self.top('30d', now)), 6)
+
+    def test_rows_committed_behind_the_watermark_are_counted(self):
+        at = datetime(2030, 1, 1, 10, tzinfo=timezone.utc)
+        self.search('python', at)
+        late = self.search('django', at).id
+        self.search('python', at)
+        SearchHistory.objects.filter(id=late).delete()  # not committed yet when the rollup runs
+        self.assertEqual(trends.rollup(), 2)
+        self.assertEqual(RollupWatermark.objects.get().skipped.keys(), {str(late)})
+
+        self.search('django', at, id=late)
+        self.assertEqual(trends.rollup(), 1)
+        self.assertEqual(trends.rollup(), 0)
+        self.assertEqual(self.top('24h', at), {'python': 2, 'django': 1})
+        self.assertEqual(RollupWatermark.objects.get().skipped, {})
+
+        # A skipped id that never shows up is given up on after the window
+        gone = self.search('rolled back', at).id
+        self.search('python', at)
+        SearchHistory.objects.filter(id=gone).delete()
+        now = datetime.now(timezone.utc)
+        trends.rollup(now=now)
+        self.assertEqual(trends.rollup(now=now + trends.LATE_ROW_WINDOW), 0)
+        self.assertEqual(RollupWatermark.objects.get().skipped, {})
+        self.search('rolled back', at, id=gone)
+        self.assertEqual(trends.rollup(), 0)
+        self.assertEqual(self.top('24h', at), {'python': 3, 'django': 1})
+
+
+class KeysetPaginationTests(TestCase):
+    """The event list pages on (created_at, id) cursors, with a choice of counts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        start = datetime(2030, 2, 1, tzinfo=timezone.utc)
+        for index in range(5):
+            Event.objects.create(
+                name=f'Paged {index}', description='', event_type='online', platform='linkedin',
+                link=f'https://example.com/paged/{index}', keywords='paging',
+                start_date=start, end_date=start + timedelta(hours=1),
+            )
+        # Ties on created_at are broken by id
+        Event.objects.update(created_at=start)
+        cls.ids = sorted(Event.objects.values_list('id', flat=True), reverse=True)
+
+    def setUp(self):
+        search_cache.get_cache().clear()
+
+    def get(self, **params):
+        return APIClient().get('/api/events/', params)
+
+    def cursor(self, values):
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+    def test_pages_cover_every_event_once(self):
+        seen = []
+        params = {'limit': 2}
+        while True:
+            body = self.get(**params).json()
+            seen += [event['id'] for event in body['results']]
+            if not body['next_cursor']:
+                break
+            self.assertIn(f"cursor={body['next_cursor']}", body['next'])
+            params['cursor'] = body['next_cursor']
+        self.assertEqual(seen, self.ids)
+
+    def test_invalid_or_tampered_cursors_are_rejected(self):
+        for cursor in [
+            'not base64!', self.cursor({'id': 1}), self.cursor(['2030-02-01T00:00:00Z']),
+            self.cursor(['yesterday', 1]), self.cursor(['2030-02-01T00:00:00Z', 'one']),
+        ]:
+            with self.subTest(cursor=cursor):
+                response = self.get(cursor=cursor)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'cursor': 'Invalid cursor.'})
+
+    def test_limit_is_validated_and_capped(self):
+        self.assertEqual(self.get().json()['limit'], 20)
+        self.assertEqual(self.get(limit=1000).json()['limit'], KeysetPagination.max_limit)
+        for limit in ['0', '-1', 'ten']:
+            with self.subTest(limit=limit):
+                self.assertEqual(self.get(limit=limit).status_code, 400)
+
+    def test_count_modes(self):
+        body = self.get(limit=1).json()
+        self.assertEqual((body['count'], body['count_is_estimate']), (5, True))
+        with CaptureQueriesContext(connection) as captured:
+            self.get(limit=1)
+        self.assertFalse([query for query in captured if 'COUNT(' in query['sql']])
+
+        body = self.get(limit=1, count='exact').json()
+        self.assertEqual((body['count'], body['count_is_estimate']), (5, False))
+        self.assertNotIn('count', self.get(count='none').json())
+        self.assertEqual(self.get(count='approximate').status_code, 400)
+
+
+class SavedEventTests(TestCase):
+    """Saved-event listing runs a fixed number of queries; bulk endpoints report per id"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('saver', password='password')
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        cls.events = [
+            Event.objects.create(
+                name=f'event {index}', description='', event_type='online', platform='linkedin',
+                link=f'https://example.com/{index}', keywords='python, ai',
+                start_date=start, end_date=start + timedelta(hours=1),
+            )
+            for index in range(10)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_listing_query_count_does_not_grow_with_the_page(self):
+        SavedEvent.objects.create(user=self.user, event=self.events[0])
+        with self.assertNumQueries(3):
+            self.client.get('/api/events/saved/')
+        SavedEvent.objects.bulk_create(
+            SavedEvent(user=self.user, event=event) for event in self.events[1:]
+        )
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/events/saved/')
+        self.assertEqual(len(response.json()['results']), 10)
+        self.assertEqual(response.json()['results'][0]['event']['keyword_tags'], ['ai', 'python'])
+
+    def test_saved_list_reads_the_primary(self):
+        # A replica would hide the event saved just before
+        route = ReplicaRouter.db_for_read
+        routed = []
+
+        def db_for_read(router, model, **hints):
+            routed.append((model, route(router, model, **hints)))
+            return 'default'
+
+        databases = {**settings.DATABASES, 'replica': settings.DATABASES['default']}
+        with self.settings(DATABASES=databases), mock.patch.object(
+            ReplicaRouter, 'db_for_read', autospec=True, side_effect=db_for_read
+        ):
+            self.client.post('/api/events/save/', {'event_id': self.events[0].id}, format='json')
+            response = self.client.get('/api/events/saved/')
+            self.assertEqual(len(response.json()['results']), 1)
+            self.assertEqual({database for _, database in routed}, {'default'})
+            self.client.get('/api/events/')
+        self.assertIn((Event, 'replica'), routed)
+
+    def test_bulk_save_reports_each_id(self):
+        SavedEvent.objects.create(user=self.user, event=self.events[0])
+        ids = [self.events[0].id, self.events[1].id, 999999, self.events[1].id]
+        response = self.client.post('/api/events/save/bulk/', {'event_ids': ids}, format='json')
+        self.assertEqual(response.json()['results'], [
+            {'event_id': self.events[0].id, 'status': 'already_saved'},
+            {'event_id': self.events[1].id, 'status': 'saved'},
+            {'event_id': 999999, 'status': 'not_found'},
+        ])
+        self.assertEqual(SavedEvent.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_unsave_reports_each_id(self):
+        SavedEvent.objects.create(user=self.user, event=self.events[0])
+        ids = [self.events[0].id, self.events[1].id]
+        response = self.client.post('/api/events/unsave/bulk/', {'event_ids': ids}, format='json')
+        self.assertEqual(response.json()['summary'], {'removed': 1, 'not_saved': 1})
+        self.assertFalse(SavedEvent.objects.filter(user=self.user).exists())
+
+    def test_unsave_is_a_single_query(self):
+        SavedEvent.objects.create(user=self.user, event=self.events[0])
+        with self.assertNumQueries(1):
+            response = self.client.delete(f'/api/events/unsave/{self.events[0].id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/events/unsave/{self.events[0].id}/').status_code, 404)
+
+
+class BulkEventUpsertTests(TestCase):
+    """Bulk uploads upsert on (platform, link) and report rejected rows"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('crawler', password='password'))
+
+    def row(self, index, **fields):
+        return {
+            'name': f'Crawled {index}', 'description': 'From the crawler', 'event_type': 'online',
+            'platform': 'twitter', 'link': f'https://crawler.example.com/{index}',
+            'start_date': '2030-01-01T10:00:00Z', 'end_date': '2030-01-01T12:00:00Z',
+            'keywords': 'python, crawling', **fields,
+        }
+
+    def test_json_array_upserts_and_reports_rejected_rows(self):
+        self.client.post('/api/events/bulk/', [self.row(1)], format='json')
+        rows = [
+            self.row(1, name='Renamed'),
+            self.row(2),
+            self.row(3, end_date='2029-01-01T00:00:00Z'),
+            'not an event',
+        ]
+        # Plus the vocabulary lookup, 3 queries adding the new word 'renamed'
+        # and the data version bump
+        with self.assertNumQueries(14):
+            response = self.client.post('/api/events/bulk/', rows, format='json')
+        body = response.json()
+        self.assertEqual((body['created'], body['updated'], body['rejected']), (1, 1, 2))
+        self.assertEqual([error['index'] for error in body['errors']], [2, 3])
+        self.assertEqual(Event.objects.get(link='https://crawler.example.com/1').name, 'Renamed')
+        self.assertEqual(
+            set(Event.objects.filter(keyword_tags__name='crawling').values_list('name', flat=True)),
+            {'Renamed', 'Crawled 2'},
+        )
+
+    def test_repeated_keys_in_a_batch_are_counted_as_duplicates(self):
+        self.client.post('/api/events/bulk/', [self.row(1)], format='json')
+        rows = [self.row(1), self.row(2), self.row(2, name='Second'), self.row(1, name='Last')]
+        body = self.client.post('/api/events/bulk/', rows, format='json').json()
+        self.assertEqual(
+            (body['created'], body['updated'], body['duplicates'], body['rejected']), (1, 1, 2, 0)
+        )
+        self.assertEqual(Event.objects.get(link='https://crawler.example.com/1').name, 'Last')
+        self.assertEqual(Event.objects.get(link='https://crawler.example.com/2').name, 'Second')
+
+    def test_ndjson_body_is_accepted(self):
+        body = '\n'.join(json.dumps(self.row(index)) for index in range(3)) + '\n'
+        response = self.client.generic(
+            'POST', '/api/events/bulk/', body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.json()['created'], 3)
+
+    def test_malformed_body_keeps_earlier_batches(self):
+        response = self.client.generic(
+            'POST', '/api/events/bulk/', json.dumps(self.row(1)) + '\n{oops',
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 2', response.json()['error'])
+
+
+def raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class StreamingParserTests(TestCase):
+    """Request bodies are decoded and parsed incrementally, whatever the chunk boundaries"""
+
+    def chunks(self, body, encoding='', read_size=1):
+        return decompressed_chunks(io.BytesIO(body), encoding, read_size=read_size)
+
+    def test_content_encodings(self):
+        items = [{'name': 'Caf\u00e9 \u2713', 'n': index} for index in range(50)]
+        body = json.dumps(items).encode()
+        for encoding, compressed in (
+            ('gzip', gzip.compress(body)),
+            ('deflate', zlib.compress(body)),
+            ('deflate', raw_deflate(body)),
+            ('identity', body),
+        ):
+            for read_size in (1, 7, 4096):
+                parsed = list(iter_json_array(self.chunks(compressed, encoding, read_size)))
+                self.assertEqual(parsed, items, (encoding, read_size))
+
+        for encoding, compressed in (
+            ('br', body),
+            ('gzip', body),  # not compressed
+            ('gzip', gzip.compress(body)[:-20]),  # truncated
+            ('deflate', raw_deflate(body)[:40]),
+        ):
+            with self.assertRaises(ParseError, msg=encoding):
+                list(iter_json_array(self.chunks(compressed, encoding, 64)))
+
+    def test_values_split_across_chunks(self):
+        items = [
+            'plain', 'esc\\aped \"quotes\" \n\t/', '\u00e9\u2713\U0001f600', '',
+            0, -0.0, 12345678901234567890, 3.14159, -2.5e-7, 1e22,
+            True, False, None, [], {}, {'nested': [1, {'a': 'b'}], 'k': 'v'},
+        ]
+        body = json.dumps(items).encode()
+        self.assertEqual(list(iter_json_array(self.chunks(body))), items)
+        unescaped = json.dumps(items, ensure_ascii=False).encode()
+        self.assertEqual(list(iter_json_array(self.chunks(unescaped))), items)
+        # Every split point of an escape sequence and a number
+        for text in ('["a\\u00e9b", 123.5e3]', '[  -12 , "x\\"y"  ]'):
+            for read_size in range(1, len(text)):
+                chunks = self.chunks(text.encode(), read_size=read_size)
+                self.assertEqual(list(iter_json_array(chunks)), json.loads(text))
+
+    def test_malformed_input(self):
+        for text in (
+            '', '{"a": 1}', '[1, 2', '[1 2]', '[1,]', '["unterminated', '[tru]', '[1] [2]', '[1] x',
+            '[{"a": 1,}]', '[{1: 2}]',
+        ):
+            with self.assertRaises(ParseError, msg=text):
+                list(iter_json_array(self.chunks(text.encode(), read_size=3)))
+        with self.assertRaises(ParseError):
+            list(iter_json_array(self.chunks(b'["\xff\xfe"]')))  # not UTF-8
+
+    def test_extension_payload(self):
+        body = json.dumps({
+            'source': 'ext',
+            'data': {
+                'contentType': 'feed_posts', 'results': [{'id': 1}, {'id': 2}], 'searchKeywords': 'ai',
+            },
+            'timestamp': 't',
+        }).encode()
+        payload = StreamedExtensionPayload(self.chunks(body, read_size=5))
+        self.assertEqual(list(payload.iter_results()), [{'id': 1}, {'id': 2}])
+        self.assertEqual(payload.get('data'), {'contentType': 'feed_posts', 'searchKeywords': 'ai'})
+        self.assertEqual((payload.get('source'), payload.get('timestamp')), ('ext', 't'))
+
+        for body in (
+            b'{"data": {"results": {}}}', b'{"data": {"results": [1]}} {}', b'{"data": {"results": [1',
+        ):
+            with self.assertRaises(ParseError, msg=body):
+                list(StreamedExtensionPayload(self.chunks(body, read_size=4)).iter_results())
+
+    def test_ndjson(self):
+        body = b'{"a": 1}\n\n  \r\n{"b": "x\\ny"}\r\n[3]'
+        self.assertEqual(
+            list(iter_ndjson(self.chunks(body, read_size=2))), [{'a': 1}, {'b': 'x\ny'}, [3]]
+        )
+        with self.assertRaisesMessage(ParseError, 'line 3'):
+            list(iter_ndjson(self.chunks(b'1\n\n{"broken"\n4', read_size=2)))
+
+    def test_bad_bodies_are_400s(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('uploader'))
+        for body, headers in (
+            (b'[{"name": "x"', {}),
+            (b'not json', {}),
+            (b'[] trailing', {}),
+            (gzip.compress(b'[{"name": "x"}]')[:-10], {'HTTP_CONTENT_ENCODING': 'gzip'}),
+            (b'[]', {'HTTP_CONTENT_ENCODING': 'br'}),
+        ):
+            response = client.post(
+                '/api/events/bulk/', body, content_type='application/json', **headers
+            )
+            self.assertEqual(response.status_code, 400, body)
+        response = client.post(
+            '/api/events/bulk/', gzip.compress(b'\n\n'), content_type='application/x-ndjson',
+            HTTP_CONTENT_ENCODING='gzip',
+        )
+        self.assertEqual(response.status_code, 200)
+        for body in (b'{"source": "x", "data": {"results": [{"id": 1}', b'{"data": 5}'):
+            with self.assertLogs('events.views', 'ERROR'):
+                response = APIClient().post(
+                    '/api/events/results/', body, content_type='application/json'
+                )
+            self.assertEqual(response.status_code, 400, body)
+
+
+class ConditionalGetTests(TestCase):
+    """Event reads answer 304 from the data version row without running the view"""
+
+    @classmethod
+    def setUpTestData(cls):
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        cls.event = Event.objects.create(
+            name='Polled', description='', event_type='online', platform='linkedin',
+            link='https://example.com/polled', keywords='python',
+            start_date=start, end_date=start + timedelta(hours=1),
+        )
+
+    def test_matching_etag_returns_304_without_queries(self):
+        client = APIClient()
+        search = (
+            '/api/events/search/?keywords=python&platform=linkedin'
+            '&start_date=2029-01-01T00:00:00Z&end_date=2031-01-01T00:00:00Z'
+        )
+        for url in ('/api/events/', f'/api/events/{self.event.pk}/', search):
+            etag = client.get(url)['ETag']
+            with self.assertNumQueries(1):  # the data version
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+
+    async def test_async_views_read_the_version_off_the_event_loop(self):
+        etag = (await self.async_client.get('/api/async/events/'))['ETag']
+        response = await self.async_client.get('/api/async/events/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_event_write_changes_the_validators(self):
+        client = APIClient()
+        url = f'/api/events/{self.event.pk}/'
+        first = client.get(url)
+        self.event.name = 'Renamed'
+        self.event.save()
+        response = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Renamed')
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+    def test_writes_seen_by_other_processes(self):
+        # A write made by another process does not touch this process's cache
+        client = APIClient()
+        first = client.get('/api/events/')
+        generation = search_cache.get_cache().get(search_cache.GENERATION_KEY)
+        Event.objects.create(
+            name='Loaded elsewhere', description='', event_type='online', platform='twitter',
+            link='https://example.com/elsewhere', keywords='python',
+            start_date=self.event.start_date, end_date=self.event.end_date,
+        )
+        search_cache.get_cache().set(search_cache.GENERATION_KEY, generation, timeout=None)
+        response = client.get('/api/events/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+
+class FastSerializationTests(TestCase):
+    """The .values() list path and FastJSONRenderer match DRF byte for byte"""
+
+    def test_fast_path_renders_the_same_bytes(self):
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        Event.objects.create(
+            name='Café \u2028 \U0001F600', description='"quoted" \\ text', event_type='onsite',
+            platform='facebook', link='https://example.com/cafe', keywords='Café, AI',
+            start_date=start, end_date=start + timedelta(hours=2, microseconds=5),
+        )
+        Event.objects.create(
+            name='No tags', description='', event_type='online', platform='linkedin',
+            link='https://example.com/no-tags', keywords='',
+            start_date=start, end_date=start,
+        )
+        queryset = Event.objects.order_by('-created_at', '-id')
+        expected = JSONRenderer().render(
+            {'results': EventSerializer(queryset.prefetch_related('keyword_tags'), many=True).data}
+        )
+        fast = FastJSONRenderer().render(
+            {'results': serialize_event_values(event_values(queryset))}
+        )
+        self.assertEqual(fast, expected)
+        self.assertEqual(APIClient().get('/api/events/').json()['results'], json.loads(expected)['results'])
+
+
+@override_settings(EVENTSCOPE_SEARCH_HISTORY_ENABLED=False)  # count only the reads
+class SparseFieldsetTests(TestCase):
+    """?fields= and ?exclude= narrow both the response and the SELECT"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='password')
+        start = datetime(2030, 3, 1, tzinfo=timezone.utc)
+        cls.events = [
+            Event.objects.create(
+                name=f'Sparse {index}', description='A long description', event_type='online',
+                platform='linkedin', link=f'https://example.com/sparse/{index}', keywords='python',
+                start_date=start, end_date=start + timedelta(hours=1),
+            )
+            for index in range(3)
+        ]
+        for event in cls.events:
+            SavedEvent.objects.create(user=cls.user, event=event)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, queries):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        selects = [query['sql'] for query in captured if 'events_event' in query['sql']]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertNotIn('"description"', sql)
+        self.assertEqual(len(captured), queries, selects)
+        return response.json()
+
+    def test_list_and_search(self):
+        # Plus the data version read for the conditional GET validators
+        body = self.get('/api/events/?fields=id,name,start_date&count=none', 2)
+        self.assertEqual(set(body['results'][0]), {'id', 'name', 'start_date'})
+        search = (
+            '/api/events/search/?keywords=python&platform=linkedin&count=none'
+            '&start_date=2030-01-01T00:00:00Z&end_date=2030-12-31T00:00:00Z&exclude=description'
+        )
+        # Ranked ids, their rows and keyword tags
+        body = self.get(search, 4)
+        self.assertEqual(len(body['results']), 3)
+        self.assertIn('keyword_tags', body['results'][0])
+
+    def test_detail_and_saved_do_not_load_deferred_fields(self):
+        body = self.get(f'/api/events/{self.events[0].pk}/?fields=name,keyword_tags', 3)
+        self.assertEqual(body, {'name': 'Sparse 0', 'keyword_tags': ['python']})
+        body = self.get('/api/events/saved/?fields=id,name', 2)
+        self.assertEqual(set(body['results'][0]['event']), {'id', 'name'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/events/?fields=name,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+
+
+class AsyncViewTests(TestCase):
+    """The /api/async/events/ views answer exactly like their sync counterparts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        for index in range(3):
+            Event.objects.create(
+                name=f'Async {index}', description='', event_type='online', platform='linkedin',
+                link=f'https://example.com/async-{index}', keywords='python, ai',
+                start_date=start + timedelta(days=index), end_date=start + timedelta(days=index + 1),
+            )
+        cls.user = User.objects.create_user('async-reader')
+        cls.batch_id = uuid.uuid4()
+        IngestionJob.objects.create(
+            batch_id=cls.batch_id, status=IngestionJob.STATUS_DONE, client=f'user:{cls.user.pk}'
+        )
+        for index in range(3):
+            ScrapedResult.objects.create(
+                external_id=f'async-{index}', batch_id=cls.batch_id, result_type='profile',
+                name=f'Profile {index}', source='test',
+            )
+
+    def assertSameResponse(self, sync_response, async_response):
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        body = sync_response.json()
+        for link in ('next', 'previous'):
+            if isinstance(body, dict) and body.get(link):
+                body[link] = body[link].replace('/api/events/', '/api/async/events/')
+        self.assertEqual(async_response.json(), body)
+
+    async def test_event_list_pages(self):
+        for query in ('?limit=2', '?limit=2&fields=id,name,keyword_tags&count=exact', '?fields=bogus'):
+            sync_response = await sync_to_async(APIClient().get)(f'/api/events/{query}')
+            async_response = await self.async_client.get(f'/api/async/events/{query}')
+            self.assertSameResponse(sync_response, async_response)
+
+    async def test_search(self):
+        criteria = {
+            'keywords': 'python', 'platform': 'linkedin', 'limit': 2,
+            'start_date': '2029-12-31T00:00:00Z', 'end_date': '2030-01-10T00:00:00Z',
+        }
+        for body in (criteria, {**criteria, 'date_mode': 'overlap'}, {**criteria, 'platform': 'myspace'}):
+            sync_response = await sync_to_async(APIClient().post)(
+                '/api/events/search/', body, format='json'
+            )
+            # Make the async view run the search instead of hitting the cache
+            search_cache.get_cache().clear()
+            async_response = await self.async_client.post(
+                '/api/async/events/search/', body, content_type='application/json'
+            )
+            self.assertSameResponse(sync_response, async_response)
+
+    async def test_signed_in_search_is_recorded(self):
+        await self.async_client.aforce_login(self.user)
+        with self.assertNoLogs('events.history', 'ERROR'):
+            response = await self.async_client.get('/api/async/events/search/', {
+                'keywords': 'python', 'platform': 'linkedin,twitter',
+                'start_date': '2029-12-31T00:00:00Z', 'end_date': '2030-01-10T00:00:00Z',
+            })
+        self.assertEqual(response.status_code, 200)
+        platforms = SearchHistory.objects.filter(user=self.user).values_list('platform', flat=True)
+        self.assertEqual(sorted([platform async for platform in platforms]), ['linkedin', 'twitter'])
+
+    async def test_extension_results_pages(self):
+        client = APIClient()
+        await sync_to_async(client.force_login)(self.user)
+        await self.async_client.aforce_login(self.user)
+        for query in (f'?batch={self.batch_id}&page_size=2', f'?batch={self.batch_id}&page=9', '?batch=nope'):
+            sync_response = await sync_to_async(client.get)(
+                f'/api/events/results/get/{query}'
+            )
+            async_response = await self.async_client.get(
+                f'/api/async/events/results/get/{query}'
+            )
+            self.assertSameResponse(sync_response, async_response)
+            if 'page_size' in query:
+                self.assertEqual(len(sync_response.json()['results']), 2)
+
+
+@override_settings(
+    EVENTSCOPE_RESULTS_BROKER='events.pubsub.InProcessBroker',
+    EVENTSCOPE_RESULTS_STREAM_HEARTBEAT=0.05,
+)
+class ResultsStreamTests(TestCase):
+    """results/stream/ pushes finished batches as Server-Sent Events"""
+
+    def setUp(self):
+        pubsub.reset_broker()
+        self.addCleanup(pubsub.reset_broker)
+        self.user = User.objects.create_user('streamer')
+        self.client_key = f'user:{self.user.pk}'
+
+    def finish_job(self, name, minutes_ago=0, client=None):
+        batch_id = uuid.uuid4()
+        ScrapedResult.objects.create(
+            external_id=f'stream-{name}', batch_id=batch_id, result_type='profile', name=name,
+        )
+        return IngestionJob.objects.create(
+            batch_id=batch_id, status=IngestionJob.STATUS_DONE, processed_count=1,
+            finished_at=datetime.now(timezone.utc) - timedelta(minutes=minutes_ago),
+            client=client or self.client_key,
+        )
+
+    def open_stream(self, user=None, **headers):
+        client = Client()
+        client.force_login(user or self.user)
+        response = client.get('/api/events/results/stream/', headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.addCleanup(response.close)
+        return response, iter(response.streaming_content)
+
+    def parse(self, frame):
+        fields = dict(line.split(': ', 1) for line in frame.decode().splitlines() if line)
+        return fields['id'], json.loads(fields['data'])
+
+    def test_latest_batch_then_pushed_batches(self):
+        self.finish_job('Old', minutes_ago=5)
+        latest = self.finish_job('Latest', minutes_ago=1)
+        response, frames = self.open_stream()
+        self.assertEqual(next(frames), b'retry: 3000\n\n')
+        _, data = self.parse(next(frames))
+        self.assertEqual(data['batch_id'], str(latest.batch_id))
+        self.assertEqual([result['name'] for result in data['results']], ['Latest'])
+
+        self.assertEqual(next(frames), b': heartbeat\n\n')
+        pubsub.publish(latest)  # already sent
+        pushed = self.finish_job('Pushed')
+        pubsub.publish(pushed)
+        _, data = self.parse(next(frames))
+        self.assertEqual((data['batch_id'], data['count']), (str(pushed.batch_id), 1))
+
+    def test_last_event_id_replays_missed_batches(self):
+        seen = self.finish_job('Seen', minutes_ago=5)
+        missed = [self.finish_job('Missed 1', minutes_ago=3), self.finish_job('Missed 2', minutes_ago=1)]
+        last_event_id = pubsub.batch_event(seen).id
+        response, frames = self.open_stream(**{'Last-Event-ID': last_event_id})
+        next(frames)
+        replayed = [self.parse(next(frames)) for _ in missed]
+        self.assertEqual(
+            [data['batch_id'] for _, data in replayed], [str(job.batch_id) for job in missed]
+        )
+        self.assertEqual(replayed[-1][0], pubsub.batch_event(missed[-1]).id)
+        self.assertEqual(next(frames), b': heartbeat\n\n')
+
+    def test_streams_carry_only_their_clients_batches(self):
+        other = User.objects.create_user('other-streamer')
+        other_key = f'user:{other.pk}'
+        theirs = self.finish_job('Theirs', minutes_ago=1, client=other_key)
+        response, frames = self.open_stream()
+        next(frames)
+        # No backlog: the only finished batch belongs to the other client
+        self.assertEqual(next(frames), b': heartbeat\n\n')
+        pubsub.publish(theirs)
+        pubsub.publish(self.finish_job('Also theirs', client=other_key))
+        self.assertEqual(next(frames), b': heartbeat\n\n')
+        mine = self.finish_job('Mine')
+        pubsub.publish(mine)
+        _, data = self.parse(next(frames))
+        self.assertEqual(data['batch_id'], str(mine.batch_id))
+
+        # Replays are filtered too, and anonymous clients without a session get nothing
+        replay_from = pubsub.BatchEvent(0, theirs.finished_at - timedelta(minutes=1), '', {}).id
+        response, frames = self.open_stream(**{'Last-Event-ID': replay_from})
+        next(frames)
+        _, data = self.parse(next(frames))
+        self.assertEqual(data['batch_id'], str(mine.batch_id))
+        self.assertEqual(pubsub.latest_event(None), None)
+        self.assertEqual(pubsub.events_after(replay_from, None), [])
+
+    def test_database_broker_delivers_each_finished_job_once(self):
+        broker = pubsub.DatabaseBroker()
+        broker._since = datetime.now(timezone.utc) - timedelta(seconds=1)
+        # Subscribe without starting the polling thread; the test polls itself
+        subscription = pubsub.InProcessBroker.subscribe(broker, self.client_key)
+        job = self.finish_job('Elsewhere')
+        self.finish_job('Nobody subscribed', client='session:other')
+        self.assertEqual(broker.poll(), 1)
+        self.assertEqual(broker.poll(), 0)
+        broker.publish(job)
+        self.assertEqual(subscription.get(0).job_id, job.id)
+        self.assertIsNone(subscription.get(0))
+
+
+@override_settings(EVENTSCOPE_RESULTS_BROKER='events.pubsub.InProcessBroker')
+class IngestionQueueTests(TestCase):
+    """Queued extension batches are claimed once, retried, and recovered from dead workers"""
+
+    def queue(self, name):
+        payload = {'source': 'test', 'data': {'results': [{'id': name, 'name': name}]}}
+        return ingestion.enqueue(payload, client='session:queue')
+
+    def test_claims_skip_jobs_taken_by_another_worker(self):
+        first, second = self.queue('first'), self.queue('second')
+        real_update = QuerySet.update
+
+        def racing_update(queryset, **kwargs):
+            # Another worker claims the first job between our read and our update
+            QuerySet.update = real_update
+            IngestionJob.objects.filter(id=first.id).update(
+                status=IngestionJob.STATUS_PROCESSING, worker='other'
+            )
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            claimed = ingestion.claim_next_job(worker='me')
+        self.assertEqual((claimed.id, claimed.worker, claimed.attempts), (second.id, 'me', 1))
+        self.assertEqual(IngestionJob.objects.get(id=first.id).worker, 'other')
+        self.assertIsNone(ingestion.claim_next_job(worker='me'))
+
+    def test_admin_shows_counts_and_pending_chunks(self):
+        job = self.queue('admin')
+        client = Client()
+        client.force_login(User.objects.create_superuser('queue-admin'))
+        for url in ('/admin/events/ingestionjob/', f'/admin/events/ingestionjob/{job.id}/change/'):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'Pending chunks')
+        self.assertEqual(response.context['adminform'].form.fields.keys() & {
+            'received_count', 'processed_count', 'batch_id',
+        }, set())
+
+    def test_failed_jobs_are_retried_then_failed(self):
+        job = self.queue('flaky')
+        with mock.patch.object(ingestion, 'ingest_results', side_effect=RuntimeError('boom')):
+            for attempt in range(1, ingestion.MAX_ATTEMPTS + 1):
+                job = ingestion.process_job(ingestion.claim_next_job())
+                self.assertEqual(job.attempts, attempt)
+                expected = 'failed' if attempt == ingestion.MAX_ATTEMPTS else 'queued'
+                self.assertEqual((job.status, job.error), (expected, 'boom'))
+        self.assertIsNone(ingestion.claim_next_job())
+
+        retried = self.queue('retried')
+        with mock.patch.object(ingestion, 'ingest_results', side_effect=RuntimeError('once')):
+            ingestion.process_job(ingestion.claim_next_job())
+        job = ingestion.process_job(ingestion.claim_next_job())
+        self.assertEqual((job.id, job.status, job.attempts, job.error), (retried.id, 'done', 2, ''))
+        self.assertEqual(ScrapedResult.objects.filter(batch_id=job.batch_id).count(), 1)
+
+    def test_stale_jobs_are_requeued_until_out_of_attempts(self):
+        crashed, exhausted, running = (self.queue(name) for name in ('crashed', 'exhausted', 'running'))
+        long_ago = datetime.now(timezone.utc) - timedelta(minutes=10)
+        IngestionJob.objects.filter(id__in=[crashed.id, exhausted.id]).update(
+            status=IngestionJob.STATUS_PROCESSING, started_at=long_ago, attempts=1
+        )
+        IngestionJob.objects.filter(id=exhausted.id).update(attempts=ingestion.MAX_ATTEMPTS)
+        IngestionJob.objects.filter(id=running.id).update(
+            status=IngestionJob.STATUS_PROCESSING, started_at=datetime.now(timezone.utc), attempts=1
+        )
+        self.assertEqual(ingestion.requeue_stale_jobs(timedelta(minutes=5)), (1, 1))
+        statuses = dict(IngestionJob.objects.values_list('id', 'status'))
+        self.assertEqual(
+            [statuses[job.id] for job in (crashed, exhausted, running)],
+            ['queued', 'failed', 'processing'],
+        )
+        self.assertIsNotNone(IngestionJob.objects.get(id=exhausted.id).finished_at)
+
+    def test_worker_loop_recovers_stale_jobs(self):
+        job = self.queue('orphaned')
+        IngestionJob.objects.filter(id=job.id).update(
+            status=IngestionJob.STATUS_PROCESSING, attempts=1,
+            started_at=datetime.now(timezone.utc) - timedelta(minutes=10),
+        )
+        self.assertEqual(ingestion.run_worker('test', stale_after=timedelta(minutes=5), once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.worker), ('done', 2, 'test'))
+
+
+@override_settings(
+    EVENTSCOPE_RESULTS_BROKER='events.pubsub.InProcessBroker',
+    EVENTSCOPE_RESULTS_MAX_BATCHES_PER_CLIENT=2,
+    EVENTSCOPE_RESULTS_MAX_STORED=0,
+    EVENTSCOPE_RESULTS_TTL_DAYS=7,
+)
+class ResultStoreTests(TestCase):
+    """Stored extension batches are evicted by quota, size cap and TTL, least recently read first"""
+
+    def setUp(self):
+        result_store._touched.clear()
+        self.user = User.objects.create_user('pusher')
+        self.reader = APIClient()
+        self.reader.force_authenticate(self.user)
+
+    def push(self, name, client='session:a', results=1):
+        payload = {'source': 'test', 'data': {'results': [
+            {'id': f'{name}-{index}', 'name': name} for index in range(results)
+        ]}}
+        ingestion.enqueue(payload, client=client)
+        return ingestion.process_job(ingestion.claim_next_job())
+
+    def statuses(self, *jobs):
+        return [IngestionJob.objects.get(id=job.id).status for job in jobs]
+
+    def test_client_quota_expires_its_oldest_batch(self):
+        client = f'user:{self.user.pk}'
+        first, second = self.push('first', client), self.push('second', client)
+        other = self.push('other')
+        third = self.push('third', client)
+        self.assertEqual(self.statuses(first, second, third, other), ['expired', 'done', 'done', 'done'])
+        self.assertFalse(ScrapedResult.objects.filter(batch_id=first.batch_id).exists())
+
+        body = self.reader.get(f'/api/events/results/get/?batch={first.batch_id}').json()
+        self.assertEqual((body['results'], body['status']), ([], 'expired'))
+        body = self.reader.get(f'/api/events/results/batches/{first.batch_id}/').json()
+        self.assertEqual(body['status'], 'expired')
+
+    def test_only_the_pushing_client_reads_a_batch(self):
+        mine = self.push('mine', client=f'user:{self.user.pk}')
+        theirs = self.push('theirs')
+        body = self.reader.get(f'/api/events/results/get/?batch={mine.batch_id}').json()
+        self.assertEqual([result['name'] for result in body['results']], ['mine'])
+        for client, query in (
+            (self.reader, f'?batch={theirs.batch_id}'),
+            (APIClient(), f'?batch={mine.batch_id}'),
+            (APIClient(), ''),  # no session batch: nothing, not the latest push
+        ):
+            for prefix in ('/api/events', '/api/async/events'):
+                body = client.get(f'{prefix}/results/get/{query}').json()
+                self.assertEqual(body, {'results': [], 'message': 'No extension data available'})
+
+    def test_batches_sharing_a_result_expire_independently(self):
+        mine = self.push('shared', client=f'user:{self.user.pk}', results=2)
+        theirs = self.push('shared', results=2)
+        self.assertEqual(ScrapedResult.objects.filter(batch_id=mine.batch_id).count(), 2)
+        self.assertEqual(ScrapedResult.objects.filter(batch_id=theirs.batch_id).count(), 2)
+
+        self.assertEqual(result_store.expire([theirs.id]), 1)
+        body = self.reader.get(f'/api/events/results/get/?batch={mine.batch_id}').json()
+        self.assertEqual(sorted(result['id'] for result in body['results']), ['shared-0', 'shared-1'])
+
+    def test_anonymous_clients_are_keyed_by_session(self):
+        payload = {'source': 'test', 'data': {'results': [{'id': 'anon', 'name': 'Anon'}]}}
+        first, second = APIClient(REMOTE_ADDR='10.0.0.1'), APIClient(REMOTE_ADDR='10.0.0.1')
+        for client in (first, first, second):
+            self.assertEqual(client.post('/api/events/results/', payload, format='json').status_code, 202)
+        clients = list(IngestionJob.objects.order_by('id').values_list('client', flat=True))
+        self.assertTrue(clients[0].startswith('session:'))
+        self.assertEqual(clients[0], clients[1])
+        self.assertNotEqual(clients[1], clients[2])
+
+    def test_extension_push_reaches_the_results_page(self):
+        # One cookie jar: the extension and the results page both send the
+        # localhost session cookie (credentials: 'include')
+        browser = APIClient()
+        payload = {'source': 'linkedin_extension', 'data': {'results': [{'id': 'e2e', 'name': 'Pushed'}]}}
+        response = browser.post(
+            '/api/events/results/', payload, format='json', HTTP_ORIGIN='chrome-extension://abcdef',
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Access-Control-Allow-Origin'], 'chrome-extension://abcdef')
+        self.assertEqual(response['Access-Control-Allow-Credentials'], 'true')
+        ingestion.process_job(ingestion.claim_next_job())
+
+        for prefix in ('/api/events', '/api/async/events'):
+            response = browser.get(f'{prefix}/results/get/', HTTP_ORIGIN='http://localhost:5173')
+            self.assertEqual(response['Access-Control-Allow-Credentials'], 'true')
+            self.assertEqual([result['name'] for result in response.json()['results']], ['Pushed'])
+        body = APIClient().get('/api/events/results/get/').json()
+        self.assertEqual(body['results'], [])
+
+    def test_size_cap_and_ttl_evict_least_recently_read(self):
+        read = self.push('read', client=f'user:{self.user.pk}', results=2)
+        unread = self.push('unread', client='b', results=2)
+        newest = self.push('newest', client='c', results=2)
+        later = datetime.now(timezone.utc) + timedelta(seconds=1)
+        IngestionJob.objects.filter(id=read.id).update(last_accessed_at=later - timedelta(minutes=5))
+        self.reader.get(f'/api/events/results/get/?batch={read.batch_id}')
+
+        with self.settings(EVENTSCOPE_RESULTS_MAX_STORED=4):
+            self.assertEqual(result_store.evict(), 1)
+        self.assertEqual(self.statuses(read, unread, newest), ['done', 'expired', 'done'])
+
+        self.assertEqual(result_store.evict(now=later + timedelta(days=6)), 0)
+        self.assertEqual(result_store.evict(now=later + timedelta(days=8)), 2)
+        self.assertEqual(ScrapedResult.objects.count(), 0)
+
+
+class SyntheticDataTests(TestCase):
+    """Generated events depend on the seed and batch size, not the process count"""
+
+    def load(self, **options):
+        synthetic.clear_events()
+        now = datetime(2030, 1, 1, 12, tzinfo=timezone.utc)
+        with mock.patch.object(synthetic, '_database_now', return_value=now):
+            synthetic.load_events(50, batch_size=7, **options)
+        return (
+            list(Event.objects.order_by('id').values_list(*synthetic.EVENT_COLUMNS)),
+            list(EventKeyword.objects.order_by('event_id', 'keyword__name')
+                 .values_list('event_id', 'keyword__name')),
+        )
+
+    def indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name IN ('events_event', 'events_eventkeyword') ORDER BY name"
+            )
+            return cursor.fetchall()
+
+    def test_same_seed_same_events_in_any_number_of_processes(self):
+        indexes = self.indexes()
+        events, keywords = self.load()
+        self.assertEqual(len(events), 50)
+        self.assertEqual(self.indexes(), indexes)
+        self.assertEqual(self.load(processes=2), (events, keywords))
+        self.assertNotEqual(self.load(seed=7)[0], events)
+
+    def test_keyword_rows_and_vocabulary_follow_the_events(self):
+        events, keywords = self.load()
+        name_at, keywords_at = (synthetic.EVENT_COLUMNS.index(column) for column in ('name', 'keywords'))
+        self.assertEqual(keywords, sorted(
+            (row[0], topic) for row in events for topic in row[keywords_at].split(', ')
+        ))
+        terms = set()
+        for row in events:
+            terms |= spelling.text_terms(f'{row[name_at]} {row[keywords_at]}')
+        self.assertEqual(set(SearchTerm.objects.values_list('term', flat=True)), terms)
+        self.assertEqual(
+            list(Event.objects.filter(keyword_filter('python')).order_by('id')),
+            list(Event.objects.filter(event_keywords__keyword__name='python').order_by('id')),
+        )
+
+
+class BenchmarkSmokeTests(TestCase):
+    """The benchmark suite keeps working as search criteria change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        synthetic.load_events(200, batch_size=50)
+
+    def test_rank(self):
+        from benchmarks import ranking
+
+        stdout = io.StringIO()
+        results = ranking.run(keywords=('ai', 'gaming, music'), limit=5, repeat=1, stdout=stdout)
+        self.assertGreater(results['ai']['matches'], 5)
+        self.assertEqual(
+            set(results['ai']), {'matches', 'date', 'relevance', 'relevance_full_sort'}
+        )
+        self.assertIn('relevance_full_sort', stdout.getvalue())
+
+
+class DatabaseRoutingTests(TestCase):
+    """Connections get the SQLite pragmas, and only marked events reads use the replica"""
+
+    def test_connection_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -64000)
+
+    def test_replica_reads(self):
+        router = ReplicaRouter()
+        databases = {**settings.DATABASES, 'replica': settings.DATABASES['default']}
+        with self.settings(DATABASES=databases):
+            self.assertEqual(router.db_for_read(Event), 'default')
+            with replica_reads():
+                self.assertEqual(router.db_for_read(Event), 'replica')
+                self.assertEqual(router.db_for_read(SavedEvent), 'replica')
+                # Auth and sessions always read the primary
+                self.assertEqual(router.db_for_read(User), 'default')
+                self.assertEqual(router.db_for_write(Event), 'default')
+            self.assertEqual(read_from_replica(lambda: router.db_for_read(Event))(), 'replica')
+        with replica_reads():
+            # No replica configured
+            self.assertEqual(router.db_for_read(Event), 'default')
+
+    async def test_async_views_read_from_replica(self):
+        router = ReplicaRouter()
+
+        @read_from_replica
+        async def view():
+            return await sync_to_async(router.db_for_read)(Event)
+
+        databases = {**settings.DATABASES, 'replica': settings.DATABASES['default']}
+        with self.settings(DATABASES=databases):
+            self.assertEqual(await view(), 'replica')
+
+
+class RequestMetricsTests(TestCase):
+    """Sampled requests get a Server-Timing header and feed /metrics"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Event.objects.create(
+            name='Metrics meetup', description='', event_type='online', platform='linkedin',
+            link='https://example.com/metrics', keywords='metrics',
+            start_date=datetime(2030, 9, 1, tzinfo=timezone.utc),
+            end_date=datetime(2030, 9, 2, tzinfo=timezone.utc),
+        )
+
+    def setUp(self):
+        metrics.registry.reset()
+
+    def timing(self, response):
+        return {
+            entry.split(';')[0]: entry for entry in response.headers['Server-Timing'].split(', ')
+        }
+
+    def test_server_timing_and_histograms(self):
+        response = APIClient().get('/api/events/')
+        self.assertEqual(response.status_code, 200)
+        timing = self.timing(response)
+        self.assertRegex(timing['db'], r'^db;dur=[\d.]+;desc="[1-9]\d* queries"$')
+        self.assertIn('serialize', timing)
+        self.assertIn('total', timing)
+
+        exported = Client().get('/metrics')
+        self.assertEqual(exported['Content-Type'], metrics.PROMETHEUS_CONTENT_TYPE)
+        text = exported.content.decode()
+        view = 'view="events:event-list-create"'
+        self.assertIn(f'eventscope_requests_total{{{view},method="GET",status="200"}} 1', text)
+        self.assertIn(f'eventscope_request_duration_seconds_count{{{view}}} 1', text)
+        self.assertIn(f'eventscope_request_queries_bucket{{{view},le="0"}} 0', text)
+        self.assertIn(f'eventscope_response_size_bytes_count{{{view}}} 1', text)
+
+    async def test_async_view_queries_are_counted(self):
+        response = await AsyncClient().get('/api/async/events/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('"0 queries"', self.timing(response)['db'])
+
+    @override_settings(EVENTSCOPE_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests(self):
+        self.assertNotIn('Server-Timing', APIClient().get('/api/events/').headers)
+        self.assertNotIn('eventscope_request_duration_seconds_count', Client().get('/metrics').content.decode())
+
+    @override_settings(EVENTSCOPE_METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(Client().get('/metrics').status_code, 404)
+
+    @override_settings(EVENTSCOPE_METRICS_ALLOWED_IPS=[], EVENTSCOPE_METRICS_TOKEN='s3cret')
+    def test_scraping_needs_an_allowed_address_token_or_staff(self):
+        self.assertEqual(Client().get('/metrics').status_code, 403)
+        self.assertEqual(Client(headers={'Authorization': 'Bearer wrong'}).get('/metrics').status_code, 403)
+        self.assertEqual(Client(headers={'Authorization': 'Bearer s3cret'}).get('/metrics').status_code, 200)
+        with self.settings(EVENTSCOPE_METRICS_ALLOWED_IPS=['10.0.0.5']):
+            self.assertEqual(Client(REMOTE_ADDR='10.0.0.5').get('/metrics').status_code, 200)
+
+        client = Client()
+        user = User.objects.create_user('operator', password='password')
+        client.force_login(user)
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        user.is_staff = True
+        user.save()
+        self.assertEqual(client.get('/metrics').status_code, 200)
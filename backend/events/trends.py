@@ -0,0 +1,193 @@
+"""
+Trending searches, rolled up incrementally from ``SearchHistory``.
+
+``rollup()`` reads only the history rows with an id above the
+``RollupWatermark`` and adds them to per-hour and per-day ``SearchTrend``
+counters keyed by normalized keyword and platform. Counters are
+incremented with ``INSERT ... ON CONFLICT DO UPDATE`` in the same
+transaction that advances the watermark, so every history row is counted
+exactly once even if the rollup is interrupted or run twice at the same
+time. ``top_keywords()`` then answers top-k queries from the small
+rollup table instead of scanning the history.
+
+Ids are handed out when rows are inserted, not when they commit, so a row
+can become visible after a higher id was already rolled up. The ids the
+watermark passes without seeing are kept on it and looked up again on
+every run for ``LATE_ROW_WINDOW``; after that they are taken to belong to
+rolled back or deleted rows. At most ``MAX_SKIPPED`` ids are kept, so a
+large gap left by deleted history does not grow the watermark.
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import RollupWatermark, SearchHistory, SearchTrend
+from .search import parse_keywords
+
+
+WATERMARK_NAME = 'search_trends'
+
+HOUR = SearchTrend.GRANULARITY_HOUR
+DAY = SearchTrend.GRANULARITY_DAY
+BUCKET_SIZES = {HOUR: timedelta(hours=1), DAY: timedelta(days=1)}
+
+# How long an id skipped by the watermark may still commit, and how many are kept
+LATE_ROW_WINDOW = timedelta(minutes=10)
+MAX_SKIPPED = 1000
+
+# Trending windows: the rollup granularity they read and how far back they go
+WINDOWS = {
+    '1h': (HOUR, timedelta(hours=1)),
+    '24h': (HOUR, timedelta(hours=24)),
+    '7d': (DAY, timedelta(days=7)),
+    '30d': (DAY, timedelta(days=30)),
+}
+DEFAULT_WINDOW = '24h'
+
+
+def bucket_start(value, granularity):
+    """Truncate a datetime to the start of its UTC hour or day"""
+    value = value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity == DAY:
+        value = value.replace(hour=0)
+    return value
+
+
+def _increment(counts):
+    """Add ``counts`` ({(granularity, platform, bucket, keyword): n}) to SearchTrend"""
+    table = connection.ops.quote_name(SearchTrend._meta.db_table)
+    sql = (
+        f'INSERT INTO {table} (granularity, platform, bucket, keyword, count) '
+        f'VALUES (%s, %s, %s, %s, %s) '
+        f'ON CONFLICT (granularity, platform, bucket, keyword) '
+        f'DO UPDATE SET count = {table}.count + excluded.count'
+    )
+    rows = [
+        (granularity, platform, connection.ops.adapt_datetimefield_value(bucket), keyword, count)
+        for (granularity, platform, bucket, keyword), count in counts.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _count(rows):
+    """Searches per (granularity, platform, bucket, keyword) in history ``rows``"""
+    counts = Counter()
+    for _, keywords, platform, searched_at in rows:
+        hour, day = bucket_start(searched_at, HOUR), bucket_start(searched_at, DAY)
+        for keyword in parse_keywords(keywords):
+            counts[(HOUR, platform, hour, keyword)] += 1
+            counts[(DAY, platform, day, keyword)] += 1
+    return counts
+
+
+def _skipped_ids(last_id, rows, skipped, now):
+    """``skipped`` plus the ids between ``last_id`` and ``rows`` that are missing"""
+    skipped = dict(skipped)
+    seen = last_id
+    for row_id, *_ in rows:
+        missing = range(seen + 1, row_id)
+        if len(skipped) + len(missing) <= MAX_SKIPPED:
+            skipped.update((str(missing_id), now.isoformat()) for missing_id in missing)
+        seen = row_id
+    return skipped
+
+
+def rollup_batch(batch_size=5000, now=None):
+    """
+    Fold the next ``batch_size`` unprocessed history rows into SearchTrend,
+    with any rows that committed late below the watermark.
+
+    Returns the number of history rows processed, 0 when there is nothing
+    new or another rollup advanced the watermark first.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.get_or_create(name=WATERMARK_NAME)
+        fields = ('id', 'keywords', 'platform', 'searched_at')
+        late = list(
+            SearchHistory.objects.filter(id__in=[int(key) for key in watermark.skipped])
+            .values_list(*fields)
+        ) if watermark.skipped else []
+        rows = list(
+            SearchHistory.objects.filter(id__gt=watermark.last_id)
+            .order_by('id')
+            .values_list(*fields)[:batch_size]
+        )
+
+        found = {str(row[0]) for row in late}
+        skipped = {
+            key: when for key, when in watermark.skipped.items()
+            if key not in found and now - datetime.fromisoformat(when) < LATE_ROW_WINDOW
+        }
+        skipped = _skipped_ids(watermark.last_id, rows, skipped, now)
+        if not rows and skipped == watermark.skipped:
+            return 0
+
+        counts = _count(late + rows)
+        if counts:
+            _increment(counts)
+
+        advanced = RollupWatermark.objects.filter(
+            pk=watermark.pk, last_id=watermark.last_id, updated_at=watermark.updated_at
+        ).update(
+            last_id=rows[-1][0] if rows else watermark.last_id,
+            skipped=skipped,
+            updated_at=timezone.now(),
+        )
+        if not advanced:
+            # A concurrent rollup already counted these rows
+            transaction.set_rollback(True)
+            return 0
+    return len(late) + len(rows)
+
+
+def rollup(batch_size=5000, now=None):
+    """Process every history row not yet counted. Returns the row count"""
+    processed = 0
+    while True:
+        count = rollup_batch(batch_size, now)
+        if not count:
+            return processed
+        processed += count
+
+
+def prune(granularity, older_than):
+    """Delete rollup buckets of ``granularity`` that start before ``older_than``"""
+    deleted, _ = SearchTrend.objects.filter(
+        granularity=granularity, bucket__lt=older_than
+    ).delete()
+    return deleted
+
+
+def window_start(window, now=None):
+    """First bucket included in a trending window, counting the current one"""
+    granularity, span = WINDOWS[window]
+    current = bucket_start(now or timezone.now(), granularity)
+    return current - span + BUCKET_SIZES[granularity]
+
+
+def top_keywords(window=DEFAULT_WINDOW, platform=None, limit=10, now=None):
+    """The ``limit`` most searched keywords in ``window``, on one or all platforms"""
+    granularity = WINDOWS[window][0]
+    trends = SearchTrend.objects.filter(
+        granularity=granularity, bucket__gte=window_start(window, now)
+    )
+    if platform:
+        trends = trends.filter(platform=platform)
+    return list(
+        trends.values('keyword')
+        .annotate(searches=Sum('count'))
+        .order_by('-searches', 'keyword')[:limit]
+    )
+
+
+def last_rollup():
+    """When the rollup last advanced, or None if it has never run"""
+    return (
+        RollupWatermark.objects.filter(name=WATERMARK_NAME)
+        .values_list('updated_at', flat=True)
+        .first()
+    )
@@ -1,17 +1,25 @@
 from django.urls import path
-from . import views
+from . import streams, views
 
 app_name = 'events'
 
 urlpatterns = [
     path('', views.EventListCreateView.as_view(), name='event-list-create'),
     path('<int:pk>/', views.EventDetailView.as_view(), name='event-detail'),
+    path('bulk/', views.bulk_upsert_events, name='event-bulk-upsert'),
     path('search/', views.search_events, name='search-events'),
+    path('search/cache-stats/', views.search_cache_stats, name='search-cache-stats'),
+    path('trending/', views.trending_searches, name='trending-searches'),
     path('saved/', views.SavedEventListView.as_view(), name='saved-events'),
     path('save/', views.save_event, name='save-event'),
+    path('save/bulk/', views.bulk_save_events, name='bulk-save-events'),
+    path('unsave/bulk/', views.bulk_unsave_events, name='bulk-unsave-events'),
     path('unsave/<int:event_id>/', views.unsave_event, name='unsave-event'),
     path('search-history/', views.SearchHistoryListView.as_view(), name='search-history'),
     # Chrome extension endpoints
     path('results/', views.receive_extension_data, name='extension-results'),
     path('results/get/', views.get_extension_results, name='get-extension-results'),
+    path('results/stream/', streams.extension_results_stream, name='extension-results-stream'),
+    path('results/batches/<uuid:batch_id>/', views.ingestion_batch_status, name='ingestion-batch-status'),
+    path('results/queue/', views.ingestion_queue_stats, name='ingestion-queue-stats'),
 ]
\ No newline at end of file
@@ -1,87 +1,290 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.exceptions import APIException, ParseError
 from rest_framework.response import Response
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils.decorators import method_decorator
 from datetime import datetime
-from .models import Event, SavedEvent, SearchHistory
+import logging
+from .models import Event, SavedEvent, SearchHistory, ScrapedResult, IngestionJob
+from . import cache as search_cache
+from . import history as search_history
+from . import result_store
+from . import spelling
+from . import trends
+from .bulk import EventUpsert
+from .conditional import conditional_read, request_data_version
+from .ingestion import enqueue, queue_stats
+from .pagination import ExtensionResultsPagination, KeysetPagination, RelevancePagination
+from .routers import read_from_replica
+from .parsers import NDJSONParser, StreamingExtensionParser, StreamingJSONArrayParser
+from .search import (
+    LOOK_UP, SORT_RELEVANCE, can_rank, date_range_filter, keyword_filter, parse_keywords
+)
 from .serializers import (
-    EventSerializer, SavedEventSerializer, 
-    SearchHistorySerializer, EventSearchSerializer
+    EventSerializer, SavedEventSerializer, SavedEventBulkSerializer,
+    SearchHistorySerializer, EventSearchSerializer, ScrapedResultSerializer,
+    TrendingSearchSerializer, event_columns, event_fieldset, event_values,
+    serialize_event_values
 )
 
 
-class EventListCreateView(generics.ListCreateAPIView):
+logger = logging.getLogger(__name__)
+
+
+class EventFieldsetMixin:
+    """Narrows GET responses and their SQL to ``?fields=`` / ``?exclude=``"""
+    
+    def get_fieldset(self):
+        if self.request.method not in ('GET', 'HEAD'):
+            return None
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = event_fieldset(self.request.query_params)
+        return self._fieldset
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_fieldset()
+        if fields is None:
+            return queryset
+        queryset = queryset.only(*event_columns(fields))
+        if 'keyword_tags' not in fields:
+            queryset = queryset.prefetch_related(None)
+        return queryset
+    
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fieldset())
+        return super().get_serializer(*args, **kwargs)
+
+
+@method_decorator(read_from_replica, name='get')
+@method_decorator(conditional_read, name='get')
+class EventListCreateView(EventFieldsetMixin, generics.ListCreateAPIView):
     """List all events or create a new event"""
-    queryset = Event.objects.all()
+    queryset = Event.objects.prefetch_related('keyword_tags')
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    
+    def list(self, request, *args, **kwargs):
+        # Read-only fast path; same output as EventSerializer(many=True)
+        fields = self.get_fieldset()
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(event_values(queryset, fields))
+        return self.get_paginated_response(serialize_event_values(page, fields))
 
 
-class EventDetailView(generics.RetrieveUpdateDestroyAPIView):
+@method_decorator(conditional_read, name='get')
+class EventDetailView(EventFieldsetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete an event"""
-    queryset = Event.objects.all()
+    queryset = Event.objects.prefetch_related('keyword_tags')
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
 @api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@parser_classes([StreamingJSONArrayParser, NDJSONParser])
+def bulk_upsert_events(request):
+    """Create or update events keyed on (platform, link) from a JSON array or NDJSON"""
+    upsert = EventUpsert()
+    try:
+        upsert.run(request.data)
+    except ParseError as exc:
+        # Batches before the error are already saved; report them too
+        return Response(
+            {**upsert.summary(), 'error': exc.detail}, status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(upsert.summary())
+
+
+def search_cache_key(data, fields, version):
+    """Search cache key for validated ``EventSearchSerializer`` data at data ``version``"""
+    return search_cache.make_key(
+        version,
+        data['keywords'], ','.join(data['platforms']), data['start_date'], data['end_date'],
+        data['date_mode'], data.get('cursor') or '', data.get('limit'),
+        data.get('count', 'estimate'), fields, data.get('sort', SORT_RELEVANCE)
+    )
+
+
+def record_search(user, data):
+    """Queue a search history entry per searched platform, so trends stay per platform"""
+    for platform in data['platforms']:
+        search_history.record(
+            user, data['keywords'], platform, data['start_date'], data['end_date']
+        )
+
+
+def search_queryset(data, fields, longest=LOOK_UP):
+    """
+    ``event_values()`` rows matching validated search criteria, unordered.
+    Every searched platform is covered by one query.
+    """
+    return event_values(Event.objects.filter(
+        keyword_filter(data['keywords']),
+        date_range_filter(data['start_date'], data['end_date'], data['date_mode'], longest),
+        platform__in=data['platforms']
+    ), fields)
+
+
+def search_paginator(data):
+    """Paginator for the requested sort; searches that cannot be ranked are sorted by date"""
+    if data.get('sort', SORT_RELEVANCE) == SORT_RELEVANCE and can_rank(data['keywords']):
+        return RelevancePagination(data['keywords'])
+    return KeysetPagination()
+
+
+def search_count_by(data):
+    """Count matches per platform when more than one is searched"""
+    return 'platform' if len(data['platforms']) > 1 else None
+
+
+def paginate_search(data, fields):
+    """The paginator and page of results for validated search criteria"""
+    paginator = search_paginator(data)
+    page = paginator.paginate(
+        search_queryset(data, fields), cursor=data.get('cursor') or '',
+        limit=data.get('limit'), count=data.get('count', 'estimate'),
+        count_by=search_count_by(data)
+    )
+    return paginator, page
+
+
+def search_page_payload(data, paginator, results, corrected=None):
+    """Payload for a page of search results and its metadata"""
+    payload = paginator.get_page_metadata()
+    if paginator.counts is not None:
+        payload['platform_counts'] = {
+            platform: paginator.counts.get(platform, 0) for platform in data['platforms']
+        }
+    if corrected:
+        payload['corrected_keywords'] = corrected
+    payload['results'] = results
+    return payload
+
+
+def sample_search_payload(data, fields):
+    """Payload for a search with no matches: dummy events for demonstration"""
+    dummy_events = get_dummy_events(
+        data['platforms'], data['keywords'], data['start_date'], data['end_date']
+    )
+    if fields is not None:
+        dummy_events = [
+            {name: event[name] for name in fields if name in event}
+            for event in dummy_events
+        ]
+    return {
+        'results': dummy_events,
+        'count': len(dummy_events),
+        'next_cursor': None,
+        'message': 'Showing sample results for demonstration'
+    }
+
+
+@api_view(['GET', 'POST'])
 @permission_classes([permissions.AllowAny])
+@read_from_replica
+@conditional_read
 def search_events(request):
-    """Search for events based on criteria"""
-    serializer = EventSearchSerializer(data=request.data)
+    """Search for events based on criteria, sent as a JSON body or GET query parameters"""
+    params = request.query_params if request.method == 'GET' else request.data
+    serializer = EventSearchSerializer(data=params)
     
     if serializer.is_valid():
         data = serializer.validated_data
-        keywords = data['keywords']
-        platform = data['platform']
-        start_date = data['start_date']
-        end_date = data['end_date']
+        fields = event_fieldset(request.query_params)
+        cursor = data.get('cursor') or ''
         
-        # Save search history (optional - for anonymous users)
+        # Record search history (buffered, written in the background)
         if request.user.is_authenticated:
-            SearchHistory.objects.create(
-                user=request.user,
-                keywords=keywords,
-                platform=platform,
-                start_date=start_date,
-                end_date=end_date
-            )
+            record_search(request.user, data)
         
-        # Search for events
-        events = Event.objects.filter(
-            Q(keywords__icontains=keywords) | Q(name__icontains=keywords) | Q(description__icontains=keywords),
-            platform=platform,
-            start_date__gte=start_date,
-            end_date__lte=end_date
-        )
+        cache_key = search_cache_key(data, fields, request_data_version(request))
+        payload = search_cache.get(cache_key)
+        if payload is not None:
+            return Response(payload)
+        
+        # Search for events using the full-text index
+        paginator, page = paginate_search(data, fields)
+        
+        # Nothing matched: search again with misspelled words corrected
+        corrected = None if page else spelling.correct(data['keywords'])
+        if corrected:
+            paginator, page = paginate_search({**data, 'keywords': corrected}, fields)
         
         # For demo purposes, if no events found, return dummy data
-        if not events.exists():
-            # Return dummy events that match the search criteria
-            dummy_events = get_dummy_events(platform, keywords, start_date, end_date)
-            return Response({
-                'results': dummy_events,
-                'count': len(dummy_events),
-                'message': 'Showing sample results for demonstration'
-            })
+        if not page and not cursor:
+            payload = sample_search_payload(data, fields)
+        else:
+            payload = search_page_payload(
+                data, paginator, serialize_event_values(page, fields), corrected if page else None
+            )
         
-        event_serializer = EventSerializer(events, many=True)
-        return Response({
-            'results': event_serializer.data,
-            'count': events.count()
-        })
+        search_cache.set(cache_key, payload)
+        return Response(payload)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def search_cache_stats(request):
+    """Hit/miss counters for the search result cache"""
+    return Response(search_cache.stats())
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def trending_searches(request):
+    """Most searched keywords in a recent window, from the search trend rollup"""
+    serializer = TrendingSearchSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    platform = data.get('platform')
+    window = data['window']
+    
+    results = trends.top_keywords(window=window, platform=platform, limit=data['limit'])
+    return Response({
+        'window': window,
+        'platform': platform,
+        'since': trends.window_start(window),
+        'rolled_up_at': trends.last_rollup(),
+        'results': [
+            {'keyword': row['keyword'], 'count': row['searches']} for row in results
+        ],
+    })
+
+
 class SavedEventListView(generics.ListAPIView):
-    """List user's saved events"""
+    """List user's saved events, from the primary so fresh saves show up"""
     serializer_class = SavedEventSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_event_fieldset(self):
+        if not hasattr(self, '_event_fieldset'):
+            self._event_fieldset = event_fieldset(self.request.query_params)
+        return self._event_fieldset
+    
     def get_queryset(self):
-        return SavedEvent.objects.filter(user=self.request.user)
+        # Count, page and keyword tags: three queries whatever the page size
+        queryset = SavedEvent.objects.filter(user=self.request.user).select_related('event')
+        fields = self.get_event_fieldset()
+        if fields is not None:
+            queryset = queryset.only(
+                'saved_at', *[f'event__{name}' for name in event_columns(fields)]
+            )
+        if fields is None or 'keyword_tags' in fields:
+            queryset = queryset.prefetch_related('event__keyword_tags')
+        return queryset
+    
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('event_fields', self.get_event_fieldset())
+        return super().get_serializer(*args, **kwargs)
 
 
 @api_view(['POST'])
@@ -93,33 +296,89 @@ def save_event(request):
     if not event_id:
         return Response({'error': 'event_id is required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    try:
-        event = Event.objects.get(id=event_id)
-    except Event.DoesNotExist:
+    event = Event.objects.filter(id=event_id).prefetch_related('keyword_tags').first()
+    if event is None:
         return Response({'error': 'Event not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    saved_event, created = SavedEvent.objects.get_or_create(
-        user=request.user,
-        event=event
-    )
-    
-    if created:
-        serializer = SavedEventSerializer(saved_event)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-    else:
+    # Insert first and let the unique constraint catch repeats
+    try:
+        with transaction.atomic():
+            saved_event = SavedEvent.objects.create(user=request.user, event=event)
+    except IntegrityError:
         return Response({'message': 'Event already saved'}, status=status.HTTP_200_OK)
+    
+    serializer = SavedEventSerializer(saved_event)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAuthenticated])
 def unsave_event(request, event_id):
     """Remove an event from user's saved events"""
-    try:
-        saved_event = SavedEvent.objects.get(user=request.user, event_id=event_id)
-        saved_event.delete()
-        return Response({'message': 'Event removed from saved'}, status=status.HTTP_200_OK)
-    except SavedEvent.DoesNotExist:
+    deleted, _ = SavedEvent.objects.filter(user=request.user, event_id=event_id).delete()
+    if not deleted:
         return Response({'error': 'Saved event not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'message': 'Event removed from saved'}, status=status.HTTP_200_OK)
+
+
+def _bulk_outcomes(event_ids, statuses):
+    """Per-id results in request order, plus a count per status"""
+    results = [{'event_id': event_id, 'status': statuses[event_id]} for event_id in event_ids]
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return {'results': results, 'summary': summary}
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_save_events(request):
+    """Save several events at once; each id is 'saved', 'already_saved' or 'not_found'"""
+    serializer = SavedEventBulkSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    event_ids = list(dict.fromkeys(serializer.validated_data['event_ids']))
+    with transaction.atomic():
+        existing = set(Event.objects.filter(id__in=event_ids).values_list('id', flat=True))
+        already_saved = set(
+            SavedEvent.objects.filter(user=request.user, event_id__in=existing)
+            .values_list('event_id', flat=True)
+        )
+        statuses = {}
+        to_save = []
+        for event_id in event_ids:
+            if event_id not in existing:
+                statuses[event_id] = 'not_found'
+            elif event_id in already_saved:
+                statuses[event_id] = 'already_saved'
+            else:
+                statuses[event_id] = 'saved'
+                to_save.append(SavedEvent(user=request.user, event_id=event_id))
+        # A concurrent save of the same event is skipped, not an error
+        SavedEvent.objects.bulk_create(to_save, ignore_conflicts=True)
+    
+    return Response(_bulk_outcomes(event_ids, statuses))
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_unsave_events(request):
+    """Unsave several events at once; each id is 'removed' or 'not_saved'"""
+    serializer = SavedEventBulkSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    event_ids = list(dict.fromkeys(serializer.validated_data['event_ids']))
+    with transaction.atomic():
+        saved = SavedEvent.objects.filter(user=request.user, event_id__in=event_ids)
+        removed = set(saved.values_list('event_id', flat=True))
+        saved.delete()
+    
+    statuses = {
+        event_id: 'removed' if event_id in removed else 'not_saved' for event_id in event_ids
+    }
+    return Response(_bulk_outcomes(event_ids, statuses))
 
 
 class SearchHistoryListView(generics.ListAPIView):
@@ -133,118 +392,131 @@ class SearchHistoryListView(generics.ListAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])  # Allow Chrome extension without auth
+@parser_classes([StreamingExtensionParser])
 def receive_extension_data(request):
-    """Receive scraped data from Chrome extension and store/forward it"""
+    """Queue scraped data from Chrome extension for background ingestion"""
     try:
+        # The payload is streamed: results are read and queued in chunks
         data = request.data
-        source = data.get('source', 'unknown')
-        timestamp = data.get('timestamp', datetime.now().isoformat())
-        scraped_data = data.get('data', {})
+        job = enqueue(data, client=result_store.client_key(request, create=True))
         
-        print(f"Received data from {source} at {timestamp}")
-        print(f"Data contains {len(scraped_data.get('results', []))} results")
-        
-        # Process the scraped data
-        results = scraped_data.get('results', [])
-        content_type = scraped_data.get('contentType', 'search_results')
-        processed_results = []
-        
-        for result in results:
-            if content_type == 'feed_posts' and result.get('type') == 'feed_post':
-                # Handle LinkedIn feed posts
-                processed_result = {
-                    'id': result.get('id'),
-                    'type': 'feed_post',
-                    'name': 'Feed Post',  # Generic title for posts
-                    'author': result.get('author', 'Unknown'),
-                    'description': result.get('description', ''),
-                    'event_type': 'feed_post',
-                    'platform': 'linkedin',
-                    'urn': result.get('urn', ''),
-                    'likes': result.get('likes', 0),
-                    'comments': result.get('comments', 0),
-                    'reposts': result.get('reposts', 0),
-                    'extractedAt': result.get('extractedAt'),
-                    'source': 'chrome_extension'
-                }
-            else:
-                # Handle LinkedIn profile search results (existing logic)
-                processed_result = {
-                    'id': result.get('id'),
-                    'name': result.get('name', 'Unknown'),
-                    'description': result.get('description', ''),
-                    'event_type': 'profile',
-                    'platform': 'linkedin',
-                    'link': result.get('profileUrl', '#'),
-                    'location': result.get('location', ''),
-                    'image_url': result.get('imageUrl', ''),
-                    'extractedAt': result.get('extractedAt'),
-                    'keywords': scraped_data.get('searchKeywords', ''),
-                    'source': 'chrome_extension'
-                }
-            processed_results.append(processed_result)
+        timestamp = data.get('timestamp', datetime.now().isoformat())
+        logger.info(
+            'Queued %d results from %s at %s as batch %s',
+            job.received_count, job.source, timestamp, job.batch_id,
+        )
         
-        # Store in a way that can be retrieved by frontend
-        # For now, we'll use session storage or a simple cache
-        # In production, you might want to store this in the database
+        # Only remember which batch belongs to this session
+        request.session['extension_batch_id'] = str(job.batch_id)
         
-        # Return success response to extension
+        # Return accepted response to extension; run_ingest_workers does the rest
         response_data = {
             'success': True,
-            'message': f'Received {len(processed_results)} results',
-            'processed_count': len(processed_results),
+            'message': f'Queued {job.received_count} results',
+            'received_count': job.received_count,
+            'batch_id': str(job.batch_id),
+            'status': job.status,
+            'status_url': reverse('events:ingestion-batch-status', args=[job.batch_id]),
             'redirect_url': 'http://localhost:5173/results',  # Frontend results page
         }
         
-        # Store processed data in request session or cache for frontend retrieval
-        request.session['extension_results'] = {
-            'data': processed_results,
-            'timestamp': timestamp,
-            'source': source,
-            'original_data': scraped_data
-        }
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+        return Response(response_data, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
-        print(f"Error processing extension data: {str(e)}")
+        logger.exception('Could not queue extension data')
         return Response(
             {'success': False, 'error': str(e)}, 
             status=status.HTTP_400_BAD_REQUEST
         )
 
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def ingestion_batch_status(request, batch_id):
+    """Get the processing status of a queued extension batch"""
+    job = IngestionJob.objects.filter(batch_id=batch_id).first()
+    if job is None:
+        return Response({'error': 'Batch not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'batch_id': str(job.batch_id),
+        'status': job.status,
+        'received_count': job.received_count,
+        'processed_count': job.processed_count,
+        'attempts': job.attempts,
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def ingestion_queue_stats(request):
+    """Queue depth and processing latency for extension ingestion"""
+    return Response(queue_stats())
+
+
+def empty_extension_payload(batch_uuid, job_status):
+    """Payload for an empty results page, noting a batch still being ingested"""
+    if job_status in (IngestionJob.STATUS_QUEUED, IngestionJob.STATUS_PROCESSING):
+        return {'results': [], 'batch_id': str(batch_uuid), 'status': job_status,
+                'message': 'Extension data is still being processed'}
+    if job_status == IngestionJob.STATUS_EXPIRED:
+        return {'results': [], 'batch_id': str(batch_uuid), 'status': job_status,
+                'message': 'Extension data for this batch has expired'}
+    return {'results': [], 'message': 'No extension data available'}
+
+
+def extension_page_payload(page, batch_uuid, paginator):
+    """Payload for a page of one batch of extension results"""
+    return {
+        'results': ScrapedResultSerializer(page, many=True).data,
+        'batch_id': str(batch_uuid),
+        'timestamp': page[0].received_at.isoformat(),
+        'source': page[0].source,
+        'count': paginator.page.paginator.count,
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'message': 'Extension results retrieved successfully'
+    }
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def get_extension_results(request):
-    """Get the latest results from Chrome extension"""
+    """Get a page of the session's latest (or a given own ``batch``) Chrome extension results"""
     try:
-        # Retrieve stored extension results
-        results_data = request.session.get('extension_results', {})
+        try:
+            batch_uuid = result_store.readable_batch(request)
+        except ValueError:
+            return Response({'error': 'Invalid batch id'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not results_data:
-            return Response(
-                {'results': [], 'message': 'No extension data available'}, 
-                status=status.HTTP_200_OK
-            )
+        queryset = ScrapedResult.objects.filter(batch_id=batch_uuid).order_by('id')
+        paginator = ExtensionResultsPagination()
+        page = paginator.paginate_queryset(queryset, request) if batch_uuid else []
+        
+        if not page:
+            job_status = IngestionJob.objects.filter(batch_id=batch_uuid).values_list(
+                'status', flat=True
+            ).first() if batch_uuid else None
+            return Response(empty_extension_payload(batch_uuid, job_status), status=status.HTTP_200_OK)
         
-        return Response({
-            'results': results_data.get('data', []),
-            'timestamp': results_data.get('timestamp'),
-            'source': results_data.get('source'),
-            'count': len(results_data.get('data', [])),
-            'message': 'Extension results retrieved successfully'
-        }, status=status.HTTP_200_OK)
+        result_store.touch(batch_uuid)
+        return Response(extension_page_payload(page, batch_uuid, paginator), status=status.HTTP_200_OK)
         
+    except APIException:
+        raise
     except Exception as e:
-        print(f"Error retrieving extension results: {str(e)}")
+        logger.exception('Could not retrieve extension results')
         return Response(
             {'error': str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
-def get_dummy_events(platform, keywords, start_date, end_date):
+def get_dummy_events(platforms, keywords, start_date, end_date):
     """Generate dummy events for demonstration"""
     from datetime import timedelta
     import random
@@ -291,12 +563,13 @@ def get_dummy_events(platform, keywords, start_date, end_date):
     # Filter dummy data based on platform and add dates
     filtered_events = []
     for event in dummy_data:
-        if event['platform'] == platform:
+        if event['platform'] in platforms:
             # Add random dates within the search range
             event_start = start_date + timedelta(days=random.randint(0, 7))
             event_end = event_start + timedelta(hours=random.randint(2, 8))
             
             event.update({
+                'keyword_tags': parse_keywords(event['keywords']),
                 'start_date': event_start.isoformat(),
                 'end_date': event_end.isoformat(),
                 'created_at': datetime.now().isoformat(),
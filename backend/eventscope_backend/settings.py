@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'events.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -56,6 +57,9 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'eventscope_backend.urls'
 
+# Runs tests without background threads writing to the test database
+TEST_RUNNER = 'events.test_runner.TestRunner'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -77,11 +81,140 @@ WSGI_APPLICATION = 'eventscope_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+SQLITE_OPTIONS = {
+    # Run on every new connection. WAL lets readers work while a write is in
+    # progress; synchronous=NORMAL is durable in WAL mode except for the last
+    # commits before a power loss. mmap and a 64 MB page cache per connection
+    # serve hot pages without read() calls.
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA cache_size=-64000;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    # busy_timeout: wait up to this many seconds for a write lock
+    'timeout': 20,
+    # Take the write lock when a transaction starts, not when it first
+    # writes, so two transactions cannot deadlock upgrading their locks
+    'transaction_mode': 'IMMEDIATE',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': SQLITE_OPTIONS,
+        # Keep connections (one per thread) for a minute, checking them
+        # before reuse, instead of reconnecting on every request. Use 0
+        # under ASGI, where Django cannot reuse connections across requests.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+
+# Search and event list reads go to a 'replica' alias when
+# one is configured (see events/routers.py); everything else uses
+# 'default'. The replica must be kept in sync outside Django, e.g. with
+# litestream or `sqlite3 db.sqlite3 ".backup replica.sqlite3"`:
+#
+# DATABASES['replica'] = {
+#     **DATABASES['default'],
+#     'NAME': BASE_DIR / 'replica.sqlite3',
+#     'TEST': {'MIRROR': 'default'},
+# }
+DATABASE_ROUTERS = ['events.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# LocMemCache is per-process with LRU culling once MAX_ENTRIES is reached.
+# Use a shared backend (Redis, Memcached) when running several workers so
+# that invalidation on Event writes reaches every process.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'search': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eventscope-search',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+# Cache alias used for search_events results
+EVENTSCOPE_SEARCH_CACHE = 'search'
+
+# BM25 weight of a match in each searched column when search results are
+# sorted by relevance (the default, see events/search.py)
+EVENTSCOPE_SEARCH_FIELD_WEIGHTS = {'name': 3.0, 'keywords': 2.0, 'description': 1.0}
+
+# Searches that match nothing are retried with misspelled words corrected
+# from the vocabulary of event names and keywords (see events/spelling.py),
+# spending at most BUDGET_MS milliseconds looking for corrections
+EVENTSCOPE_SEARCH_SPELLING_BUDGET_MS = 50
+
+# Search history is buffered in memory and written in batches by a
+# background thread (see events/history.py). Entries are flushed once
+# FLUSH_SIZE are pending or FLUSH_INTERVAL seconds have passed, and on
+# shutdown. A crashed process loses at most MAX_PENDING entries. With
+# BACKGROUND off, the search that fills a batch writes it instead.
+EVENTSCOPE_SEARCH_HISTORY_ENABLED = True
+EVENTSCOPE_SEARCH_HISTORY_BACKGROUND = True
+EVENTSCOPE_SEARCH_HISTORY_SAMPLE_RATE = 1.0
+EVENTSCOPE_SEARCH_HISTORY_FLUSH_SIZE = 100
+EVENTSCOPE_SEARCH_HISTORY_FLUSH_INTERVAL = 5.0
+EVENTSCOPE_SEARCH_HISTORY_MAX_PENDING = 10000
+
+# Bulk event uploads (POST /api/events/bulk/) are upserted BATCH_SIZE rows
+# per transaction, and at most MAX_ROWS rows are accepted per request
+EVENTSCOPE_EVENT_BULK_BATCH_SIZE = 500
+EVENTSCOPE_EVENT_BULK_MAX_ROWS = 50000
+
+# Finished extension batches are pushed to /api/events/results/stream/
+# through this broker (see events/pubsub.py). DatabaseBroker polls for
+# batches finished by run_ingest_workers every POLL_INTERVAL seconds;
+# InProcessBroker only sees batches finished in the same process.
+# Streams send a heartbeat every HEARTBEAT seconds and end after MAX_AGE
+# seconds; clients reconnect after RETRY milliseconds and resume.
+EVENTSCOPE_RESULTS_BROKER = 'events.pubsub.DatabaseBroker'
+EVENTSCOPE_RESULTS_STREAM_POLL_INTERVAL = 1.0
+EVENTSCOPE_RESULTS_STREAM_HEARTBEAT = 15.0
+EVENTSCOPE_RESULTS_STREAM_MAX_AGE = 300.0
+EVENTSCOPE_RESULTS_STREAM_RETRY = 3000
+
+# Stored extension results (see events/result_store.py). Batches unread for
+# TTL_DAYS, beyond a client's MAX_BATCHES_PER_CLIENT, or the least recently
+# read ones once more than MAX_STORED result rows exist are deleted; 0
+# turns a limit off.
+EVENTSCOPE_RESULTS_TTL_DAYS = 7
+EVENTSCOPE_RESULTS_MAX_BATCHES_PER_CLIENT = 20
+EVENTSCOPE_RESULTS_MAX_STORED = 200000
+
+# Request metrics (see events/metrics.py): Server-Timing headers and
+# Prometheus histograms at /metrics for SAMPLE_RATE of requests.
+EVENTSCOPE_METRICS_ENABLED = True
+EVENTSCOPE_METRICS_SAMPLE_RATE = 1.0
+# Who may read /metrics besides staff users: these client addresses, and
+# requests sending `Authorization: Bearer <token>` when a token is set
+EVENTSCOPE_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+EVENTSCOPE_METRICS_TOKEN = ''
+
+# Send the events app's log records (ingestion, errors) to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'events': {'handlers': ['console'], 'level': 'INFO'},
+    },
 }
 
 
@@ -131,7 +264,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # orjson-backed when installed, identical output to JSONRenderer
+        'events.renderers.FastJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -160,6 +294,7 @@ CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
     'authorization',
+    'content-encoding',  # gzip/deflate extension payloads
     'content-type',
     'dnt',
     'origin',
@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework import permissions
 from django.http import JsonResponse
+from events.metrics import metrics_view
 
 
 def api_root(request):
@@ -27,15 +28,19 @@ def api_root(request):
         'version': '1.0.0',
         'endpoints': {
             'events': '/api/events/',
+            'events_async': '/api/async/events/',
             'authentication': '/api/auth/',
             'admin': '/admin/',
+            'metrics': '/metrics',
         }
     })
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/', api_root, name='api-root'),
     path('api/events/', include('events.urls')),
+    path('api/async/events/', include('events.async_urls')),
     path('api/auth/', include('authentication.urls')),
 ]
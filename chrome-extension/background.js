@@ -62,8 +62,11 @@ async function sendDataToEventScope(data) {
     
     console.log('Sending data to EventScope:', data);
     
+    // Send the localhost session cookie: results are only served to the
+    // session that pushed them, which the results page shares
     const response = await fetch(eventScopeUrl, {
       method: 'POST',
+      credentials: 'include',
       headers: {
         'Content-Type': 'application/json',
       },
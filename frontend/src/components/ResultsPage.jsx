@@ -16,7 +16,10 @@ const ResultsPage = () => {
   const fetchExtensionResults = async () => {
     try {
       setIsLoadingExtensionData(true);
-      const response = await fetch('http://localhost:8000/api/events/results/get/');
+      // Results are only served to the session (or user) that pushed them
+      const response = await fetch('http://localhost:8000/api/events/results/get/', {
+        credentials: 'include',
+      });
       if (response.ok) {
         const data = await response.json();
         if (data.results && data.results.length > 0) {
@@ -38,15 +41,36 @@ const ResultsPage = () => {
     }
   };
 
-  // Poll for new extension data
+  // Receive new extension data as the backend finishes ingesting it
   useEffect(() => {
-    // Initial check for extension data
-    fetchExtensionResults();
-    
-    // Poll every 3 seconds for new data (more frequent for better responsiveness)
-    const pollInterval = setInterval(fetchExtensionResults, 3000);
-    
-    return () => clearInterval(pollInterval);
+    if (typeof EventSource === 'undefined') {
+      // No Server-Sent Events support: fall back to polling every 3 seconds
+      fetchExtensionResults();
+      const pollInterval = setInterval(fetchExtensionResults, 3000);
+      return () => clearInterval(pollInterval);
+    }
+
+    // The stream starts with the latest batch, then pushes each new one.
+    // EventSource reconnects on its own and resumes with Last-Event-ID.
+    setIsLoadingExtensionData(true);
+    // Send cookies: the stream only carries this session's (or user's) batches
+    const stream = new EventSource('http://localhost:8000/api/events/results/stream/', {
+      withCredentials: true,
+    });
+    stream.addEventListener('batch', (event) => {
+      const data = JSON.parse(event.data);
+      setIsLoadingExtensionData(false);
+      if (data.status !== 'done' || !data.results || data.results.length === 0) {
+        return;
+      }
+      setExtensionResults(data.results);
+      setShowExtensionData(true);
+      setLastUpdated(new Date(data.timestamp));
+      console.log('Extension results received:', data.results.length, 'items');
+    });
+    stream.onopen = () => setIsLoadingExtensionData(false);
+
+    return () => stream.close();
   }, []);
 
   useEffect(() => {